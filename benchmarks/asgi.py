@@ -0,0 +1,93 @@
+"""
+네트워크 없이 ASGI 앱을 직접 호출하는 최소 클라이언트 (벤치마크용, 표준 라이브러리만 사용).
+소켓/HTTP 파싱 비용이 빠지므로 앱 안쪽(라우팅, 검증, 저장소, 직렬화) 비용만 잰다.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio, json, uuid
+
+
+class AsgiResponse:
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.status = status
+        self.headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in headers}
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+async def request(
+    app,
+    method: str,
+    url: str,
+    *,
+    body: bytes = b"",
+    headers: Optional[Dict[str, str]] = None,
+) -> AsgiResponse:
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": query.encode("utf-8"),
+        "root_path": "",
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    done = asyncio.Event()
+    sent_body = False
+    status = 500
+    resp_headers: List[Tuple[bytes, bytes]] = []
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # 본문을 다 보낸 뒤에는 응답이 끝날 때까지 기다렸다가 연결 종료를 알린다
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, resp_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            resp_headers = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    done.set()
+    return AsgiResponse(status, resp_headers, b"".join(chunks))
+
+
+async def request_json(app, method: str, url: str, payload, headers: Optional[Dict[str, str]] = None) -> AsgiResponse:
+    return await request(
+        app, method, url,
+        body=json.dumps(payload).encode("utf-8"),
+        headers={"content-type": "application/json", **(headers or {})},
+    )
+
+
+async def request_form(app, method: str, url: str, fields: Iterable[Tuple[str, str]], headers: Optional[Dict[str, str]] = None) -> AsgiResponse:
+    """multipart/form-data (텍스트 필드만)"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields:
+        parts.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode("utf-8")
+        )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return await request(
+        app, method, url,
+        body=b"".join(parts),
+        headers={"content-type": f"multipart/form-data; boundary={boundary}", **(headers or {})},
+    )
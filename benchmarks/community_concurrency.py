@@ -0,0 +1,82 @@
+"""
+커뮤니티 백엔드 동시성 벤치마크 (읽기/쓰기 혼합 부하에서 꼬리 지연 측정).
+
+실행 중인 서버에 대해 동시 클라이언트 수를 올려가며
+- 읽기: GET /community/posts, GET /community/posts/{id}
+- 쓰기: POST /community/posts/{id}/comments  (uid 호환 경로라 토큰 불필요)
+를 섞어서 보내고, 동시성 단계별 p50/p95/p99 를 출력한다.
+이벤트 루프가 막히지 않으면 동시성이 올라가도 읽기 p99 가 거의 평평하게 유지된다.
+
+    uvicorn community.backend.main:app --port 8000
+    python -m benchmarks.community_concurrency --base http://127.0.0.1:8000
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse, json, random, time, urllib.request
+
+from .report import percentile
+
+
+def _request(method: str, url: str, payload: dict | None = None) -> None:
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(url, data=data, method=method)
+    if data is not None:
+        req.add_header("Content-Type", "application/json")
+    with urllib.request.urlopen(req, timeout=30) as res:
+        res.read()
+
+
+def run_level(base: str, post_ids: list, concurrency: int, requests: int, write_ratio: float) -> dict:
+    lat = {"read": [], "write": []}
+    errors = 0
+
+    def one(i: int):
+        post_id = random.choice(post_ids)
+        is_write = random.random() < write_ratio
+        t0 = time.perf_counter()
+        try:
+            if is_write:
+                _request("POST", f"{base}/community/posts/{post_id}/comments",
+                         {"uid": "bench", "nickname": "bench", "body": f"bench comment {i}"})
+            elif i % 2:
+                _request("GET", f"{base}/community/posts?page=1&page_size=20")
+            else:
+                _request("GET", f"{base}/community/posts/{post_id}")
+        except Exception:
+            return None
+        return ("write" if is_write else "read", time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for res in pool.map(one, range(requests)):
+            if res is None:
+                errors += 1
+            else:
+                lat[res[0]].append(res[1] * 1000)
+    elapsed = time.perf_counter() - t0
+
+    out = {"concurrency": concurrency, "rps": round(requests / elapsed, 1), "errors": errors}
+    for kind, samples in lat.items():
+        for q in (50, 95, 99):
+            out[f"{kind}_p{q}_ms"] = round(percentile(samples, q), 2)
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://127.0.0.1:8000")
+    ap.add_argument("--levels", default="1,8,32,64")
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--write-ratio", type=float, default=0.2)
+    args = ap.parse_args()
+
+    with urllib.request.urlopen(f"{args.base}/community/posts?page=1&page_size=50", timeout=30) as res:
+        post_ids = [p["postId"] for p in json.loads(res.read())["items"]]
+    if not post_ids:
+        raise SystemExit("게시글이 하나 이상 있어야 합니다")
+
+    for level in (int(x) for x in args.levels.split(",")):
+        print(json.dumps(run_level(args.base, post_ids, level, args.requests, args.write_ratio)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+게임 통계 FirestoreWriter 를 shared.firebase_fake 의 FakeFirestore 로 확인한다.
+
+- 같은 문서에 대한 set(merge) 여러 번 → 큐 안에서 하나로 합쳐져 쓰기 한 번, 결과는 필드 단위로 합친 값
+- batch 하나에 batch_size(최대 500)개까지만 실어 보낸다
+- close() 하면 flush 주기를 기다리지 않고 큐에 남은 것을 모두 보낸다
+- commit 이 실패하면 재시도하고, add 는 재시도해도 문서가 하나만 생긴다
+다르면 첫 실패를 출력하고 종료 코드 1.
+
+    python -m benchmarks.firestore_writer_check
+"""
+from typing import List
+import json
+
+from game.backend.firestore_writer import BATCH_LIMIT, FirestoreWriter
+from shared.firebase_fake import FakeFirestore, FakeWriteBatch
+
+
+class RecordingBatch(FakeWriteBatch):
+    def commit(self) -> None:
+        self._client.batch_sizes.append(len(self._ops))
+        if self._client.fail_next:
+            # 서버에는 반영됐는데 응답을 못 받은 경우 (재시도가 중복을 만들면 안 됨)
+            self._client.fail_next -= 1
+            super().commit()
+            raise TimeoutError("deadline exceeded after commit")
+        super().commit()
+
+
+class RecordingFirestore(FakeFirestore):
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes: List[int] = []
+        self.fail_next = 0
+
+    def batch(self) -> RecordingBatch:
+        return RecordingBatch(self)
+
+    def docs(self, collection: str) -> dict:
+        prefix = collection + "/"
+        return {p[len(prefix):]: d for p, d in self.data.items() if p.startswith(prefix)}
+
+
+def expect(cond: bool, what: str) -> None:
+    if not cond:
+        raise SystemExit(f"firestore writer check failed: {what}")
+
+
+def check_coalescing() -> None:
+    db = RecordingFirestore()
+    writer = FirestoreWriter(db, batch_size=100)
+    for i in range(50):
+        writer.set("player_stats", "alice", {"cases": {f"c{i % 5}": {"playCount": i}}, "last": i}, merge=True)
+    writer.set("case_stats", "c1", {"playCount": 1}, merge=True)
+    writer.drain()
+    m = writer.metrics()
+    expect(db.batch_sizes == [2], f"50 merges to one doc sent as {db.batch_sizes}")
+    expect(m["coalesced"] == 49 and m["written"] == 2, f"coalesce counters {m}")
+    alice = db.docs("player_stats")["alice"]
+    expect(alice["last"] == 49, f"last write wins per field: {alice}")
+    expect(sorted(alice["cases"]) == [f"c{i}" for i in range(5)], f"nested fields merged: {alice}")
+    expect(alice["cases"]["c4"] == {"playCount": 49}, f"nested value: {alice}")
+
+
+def check_batch_limit() -> None:
+    db = RecordingFirestore()
+    writer = FirestoreWriter(db, batch_size=50)
+    for i in range(230):
+        writer.set("case_stats", f"c{i}", {"playCount": i})
+    for i in range(20):
+        writer.add("session_logs", {"i": i})
+    writer.drain()
+    expect(db.batch_sizes == [50] * 5, f"batch_size=50 sent as {db.batch_sizes}")
+    expect(len(db.docs("case_stats")) == 230 and len(db.docs("session_logs")) == 20, "all documents written")
+
+    db = RecordingFirestore()
+    writer = FirestoreWriter(db, batch_size=10_000, max_queue=2_000)
+    for i in range(1_200):
+        writer.set("case_stats", f"c{i}", {"playCount": i})
+    writer.drain()
+    expect(max(db.batch_sizes) == BATCH_LIMIT and sum(db.batch_sizes) == 1_200,
+           f"batch_size above the Firestore limit sent as {db.batch_sizes}")
+
+
+def check_flush_on_close() -> None:
+    db = RecordingFirestore()
+    # flush 주기가 길고 batch_size 에도 못 미쳐서, close 가 없으면 아무것도 안 나간다
+    writer = FirestoreWriter(db, batch_size=400, flush_interval=3600)
+    writer.start()
+    for i in range(120):
+        writer.set("player_stats", f"u{i}", {"n": i}, merge=True)
+        writer.add("session_logs", {"i": i})
+    writer.close(timeout=5)
+    m = writer.metrics()
+    expect(m["queueDepth"] == 0 and m["inflight"] == 0, f"queue left after close: {m}")
+    expect(len(db.docs("player_stats")) == 120 and len(db.docs("session_logs")) == 120,
+           f"written after close: {m}")
+
+
+def check_retry_idempotent() -> None:
+    db = RecordingFirestore()
+    db.fail_next = 1
+    writer = FirestoreWriter(db, backoff_base=0)
+    for i in range(10):
+        writer.add("session_logs", {"i": i})
+    writer.drain()
+    m = writer.metrics()
+    expect(m["retries"] == 1 and m["failed"] == 0, f"retry counters {m}")
+    expect(len(db.docs("session_logs")) == 10, f"{len(db.docs('session_logs'))} session_logs after a retried batch")
+
+
+def main() -> None:
+    check_coalescing()
+    check_batch_limit()
+    check_flush_on_close()
+    check_retry_idempotent()
+    print(json.dumps({"ok": True}))
+
+
+if __name__ == "__main__":
+    main()
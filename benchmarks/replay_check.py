@@ -0,0 +1,93 @@
+"""
+replay 결과가 StatsAggregator 가 한 판씩 쌓은 결과와 같은지 확인한다.
+
+같은 무작위 세션을 한쪽은 StatsAggregator.record (WAL → 주기적 내려쓰기) 로,
+다른 쪽은 session_logs 형태로 만들어 replay.rebuild → write 로 넣은 뒤
+플레이어 × 케이스 행, 케이스 통계, 스케치를 그대로(==, 부동소수점 포함) 비교한다.
+다르면 첫 차이를 출력하고 종료 코드 1.
+
+    python -m benchmarks.replay_check --sessions 5000 --seed 1
+"""
+from pathlib import Path
+import argparse, json, random, tempfile
+
+from game.backend.player_store import PlayerStore
+from game.backend.replay import SessionColumns, rebuild, write
+from game.backend.stats import StatsAggregator
+
+
+def make_sessions(n: int, players: int, cases: int, seed: int) -> list:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        # endTime 이 같은 판도 섞이도록 초 단위를 좁게 잡는다
+        end = 1_700_000_000 + rng.randrange(n // 2 + 1)
+        elapsed = rng.choice([0, 1, 7, rng.randrange(1, 4000)])
+        out.append({
+            "uid": f"u{rng.randrange(players)}",
+            "caseid": str(rng.randrange(cases)),
+            "judge": rng.random() < 0.4,
+            "elapsed": elapsed,
+            "startTime": f"{end - elapsed:012d}",
+            "endTime": f"{end:012d}",
+        })
+    # 같은 endTime 이면 나중에 기록된 판이 "마지막 판" → 로그 순서와 기록 순서를 맞춘다
+    out.sort(key=lambda r: r["endTime"])
+    return out
+
+
+def snapshot(store: PlayerStore, uids: list, caseids: list) -> dict:
+    return {
+        "players": store.get_players(uids),
+        "player_sketches": {u: sk.to_dict() for u, sk in store.get_sketches(uids).items()},
+        "cases": {c: store.get_case(c) for c in caseids},
+        "case_sketches": {c: store.get_case_sketch(c).to_dict() for c in caseids},
+    }
+
+
+def first_diff(a, b, path: str = ""):
+    if isinstance(a, dict) and isinstance(b, dict):
+        for k in sorted(set(a) | set(b), key=str):
+            if k not in a or k not in b:
+                return f"{path}/{k}: only in {'aggregator' if k in a else 'replay'}"
+            d = first_diff(a[k], b[k], f"{path}/{k}")
+            if d:
+                return d
+        return None
+    if a != b or type(a) is float and a.hex() != float(b).hex():
+        return f"{path}: aggregator={a!r} replay={b!r}"
+    return None
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=5000)
+    ap.add_argument("--players", type=int, default=200)
+    ap.add_argument("--cases", type=int, default=12)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    sessions = make_sessions(args.sessions, args.players, args.cases, args.seed)
+    uids = sorted({s["uid"] for s in sessions})
+    caseids = sorted({s["caseid"] for s in sessions})
+
+    with tempfile.TemporaryDirectory(prefix="replay-check-") as tmp:
+        live_dir = Path(tmp) / "live"
+        live_dir.mkdir()
+        live = PlayerStore(live_dir / "players.sqlite3")
+        agg = StatsAggregator(live, live_dir, flush_every=37, fsync=False)
+        for s in sessions:
+            agg.record(s["uid"], s["caseid"], s["judge"], s["elapsed"], s["startTime"], s["endTime"])
+        agg.close()
+
+        replayed = PlayerStore(Path(tmp) / "replayed.sqlite3")
+        write(rebuild(SessionColumns.from_records(sessions)), replayed)
+
+        diff = first_diff(snapshot(live, uids, caseids), snapshot(replayed, uids, caseids))
+    print(json.dumps({"sessions": len(sessions), "players": len(uids), "cases": len(caseids), "equal": diff is None}))
+    if diff:
+        raise SystemExit(diff)
+
+
+if __name__ == "__main__":
+    main()
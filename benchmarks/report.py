@@ -0,0 +1,23 @@
+"""벤치마크 결과 집계 (처리량 + 지연 분위수)."""
+from typing import Dict, List
+
+
+def percentile(samples: list, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def summarize(name: str, latencies_ms: List[float], elapsed: float, errors: int = 0, **extra) -> Dict:
+    out = {
+        "scenario": name,
+        **extra,
+        "requests": len(latencies_ms) + errors,
+        "errors": errors,
+        "rps": round(len(latencies_ms) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    for q in (50, 95, 99):
+        out[f"p{q}_ms"] = round(percentile(latencies_ms, q), 3)
+    return out
@@ -0,0 +1,268 @@
+"""
+세 백엔드(커뮤니티 / 게임 / SSO) 오프라인 벤치마크.
+
+실제 Firebase 없이(shared.firebase_client 대역 모드) 앱을 프로세스 안에서 직접 호출하고(benchmarks.asgi),
+데이터셋 크기(게시글 수, 세션/플레이어 수, SSO 코드 수)를 바꿔 가며 시나리오별
+처리량(rps)과 p50/p95/p99 지연을 JSON 한 줄씩 출력한다.
+배포 전에 저장소/집계 경로(예전 load_db, end_session 같은 곳)가 느려진 걸 잡는 용도.
+
+    python -m benchmarks.scenarios --scenario all --size 1000
+    python -m benchmarks.scenarios --scenario community --size 1000000 --requests 5000 --concurrency 32
+    python -m benchmarks.scenarios --scenario game --size 100000 --firestore-latency-ms 20
+    python -m benchmarks.scenarios --scenario all --gateway      # 세 백엔드를 gateway.main 앱 하나로
+
+시나리오
+- community.browse  : 목록 1페이지 / 임의 페이지 / 글 상세 / 검색 섞어서
+- community.post    : 글 작성 (multipart, 이미지 없음)
+- community.comment : 댓글 작성
+- game.start, game.end : 세션 시작 / (미리 만들어 둔 세션) 종료
+- sso.consume       : 1회용 SSO 코드 교환
+"""
+from pathlib import Path
+from typing import Awaitable, Callable, List
+import argparse, asyncio, json, os, random, tempfile, time
+
+from shared import firebase_client
+from shared.firebase_fake import FakeFirestore
+
+from . import asgi
+from .report import summarize
+
+WORDS = ["사건", "증거", "범인", "알리바이", "목격자", "추리", "단서", "현장", "탐정", "진술",
+         "case", "clue", "stage", "hint", "공략", "질문", "후기", "버그", "업데이트", "랭킹"]
+SEED_CHUNK = 50_000
+USE_GATEWAY = False
+
+
+def load_app(backend: str):
+    """시나리오가 요청을 보낼 앱. --gateway 면 모두 gateway.main 의 앱 하나로."""
+    if USE_GATEWAY:
+        from gateway.main import app
+    elif backend == "game":
+        from game.backend.main import app
+    else:
+        from community.backend.main import app
+    return app
+
+
+def prepare_env(workdir: Path, firestore_latency: float, auth_latency: float) -> FakeFirestore:
+    """백엔드 import 전에: 저장 경로를 임시 폴더로 돌리고 Firebase 를 대역 모드로 바꾼다."""
+    os.environ["COMMUNITY_DB_PATH"] = str(workdir / "community.sqlite3")
+    os.environ["COMMUNITY_UPLOAD_DIR"] = str(workdir / "uploads")
+    os.environ["GAME_DATA_DIR"] = str(workdir / "game")
+    # 한 IP / 몇 안 되는 uid 로 몰아서 보내므로 입장 제어는 끄고 잰다
+    for name in ("COMMUNITY_POST_RATE", "COMMUNITY_COMMENT_RATE", "COMMUNITY_WRITE_RATE_IP",
+                 "COMMUNITY_UPLOAD_CONCURRENCY", "GAME_START_RATE", "GAME_EVENTS_RATE_IP", "GAME_EVENTS_CONCURRENCY"):
+        os.environ.setdefault(name, "0")
+    (workdir / "game").mkdir(parents=True, exist_ok=True)
+    return firebase_client.use_fake(firestore_latency=firestore_latency, auth_latency=auth_latency)
+
+
+def _text(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def post_id(i: int) -> str:
+    return f"bench-{i:07d}"
+
+
+# ----- 데이터셋 -----
+def seed_community(workdir: Path, size: int) -> None:
+    from community.backend.storage import open_store
+
+    store = open_store(workdir / "community.sqlite3")
+    rng = random.Random(1)
+    base = time.time() - size
+    for start in range(0, size, SEED_CHUNK):
+        posts = []
+        for i in range(start, min(size, start + SEED_CHUNK)):
+            created = time.strftime("%Y-%m-%dT%H:%M:%S+09:00", time.gmtime(base + i + 9 * 3600))
+            posts.append({
+                "postId": post_id(i),
+                "uid": f"user{i % 1000}",
+                "nickname": f"닉네임{i % 1000}",
+                "title": _text(rng, 3),
+                "body": _text(rng, 20),
+                "createdAt": created,
+                "comments": [
+                    {"commentId": f"{post_id(i)}-c{j}", "uid": "bench", "nickname": "bench",
+                     "body": _text(rng, 5), "createdAt": created}
+                    for j in range(3 if i % 10 == 0 else 0)
+                ],
+            })
+        chunk = workdir / f"seed-{start}.json"
+        chunk.write_text(json.dumps({"posts": posts}, ensure_ascii=False), encoding="utf-8")
+        store.migrate_from_json(chunk)
+        chunk.unlink()
+
+
+def seed_players(workdir: Path, size: int) -> None:
+    from game.backend.player_store import open_player_store
+
+    store = open_player_store(workdir / "game" / "players.sqlite3", json_path=workdir / "game" / "players.json")
+    # replay 가 쓰는 것과 같은 경로로 한 번에 채운다
+    rows = (
+        (f"player{i}", str(i % 10), {
+            "uid": f"player{i}", "caseid": str(i % 10), "startTime": "", "endTime": "",
+            "judge": True, "avgTimeSeconds": 60.0, "totalTimeSeconds": 60, "playCount": 1, "clearCount": 1,
+        })
+        for i in range(size)
+    )
+    store.replace_all(rows, [], {}, {})
+
+
+def seed_sso(client: FakeFirestore, size: int) -> None:
+    expires = int(time.time()) + 3600
+    client.seed("sso_codes", {f"code{i}": {"uid": f"user{i}", "used": False, "expiresAt": expires} for i in range(size)})
+
+
+# ----- 실행 -----
+async def drive(
+    name: str, n: int, concurrency: int, fn: Callable[[int], Awaitable[int]], **extra
+) -> dict:
+    """fn(i) 를 n 번, 동시에 concurrency 개씩 실행. fn 은 HTTP 상태 코드를 돌려준다."""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(n))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            t0 = time.perf_counter()
+            try:
+                status = await fn(i)
+            except Exception:
+                status = 599
+            if status >= 400:
+                errors += 1
+            else:
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, time.perf_counter() - t0, errors, concurrency=concurrency, **extra)
+
+
+async def community_scenarios(size: int, requests: int, concurrency: int) -> List[dict]:
+    app = load_app("community")
+
+    rng = random.Random(2)
+    pages = max(1, size // 20)
+
+    async def browse(i: int) -> int:
+        r = rng.random()
+        if r < 0.25:
+            res = await asgi.request(app, "GET", "/community/posts?page=1&page_size=20")
+        elif r < 0.5:
+            res = await asgi.request(app, "GET", f"/community/posts?page={rng.randint(1, pages)}&page_size=20")
+        elif r < 0.9:
+            res = await asgi.request(app, "GET", f"/community/posts/{post_id(rng.randrange(size))}")
+        else:
+            res = await asgi.request(app, "GET", f"/community/search?q={rng.choice(WORDS)}")
+        return res.status
+
+    async def post(i: int) -> int:
+        res = await asgi.request_form(
+            app, "POST", "/community/posts",
+            [("nickname", "bench"), ("title", _text(rng, 3)), ("body", _text(rng, 20))],
+            headers={"authorization": f"Bearer bench{i % 100}"},
+        )
+        return res.status
+
+    async def comment(i: int) -> int:
+        res = await asgi.request_json(
+            app, "POST", f"/community/posts/{post_id(rng.randrange(size))}/comments",
+            {"uid": "bench", "nickname": "bench", "body": _text(rng, 5)},
+        )
+        return res.status
+
+    extra = {"size": size}
+    return [
+        await drive("community.browse", requests, concurrency, browse, **extra),
+        await drive("community.post", requests, concurrency, post, **extra),
+        await drive("community.comment", requests, concurrency, comment, **extra),
+    ]
+
+
+async def game_scenarios(size: int, requests: int, concurrency: int) -> List[dict]:
+    import game.backend.game as game
+    app = load_app("game")
+
+    # 진행 중인 세션 size 개를 미리 만들어 두고, 그 중 일부를 끝낸다
+    started = int(time.time()) - 60
+    for i in range(size):
+        game.sessions.put(f"seed-{i}", f"player{i}", str(i % 10), started, "")
+    rng = random.Random(3)
+    to_end = rng.sample(range(size), min(size, requests))
+
+    async def start(i: int) -> int:
+        res = await asgi.request_json(app, "POST", "/events/start", {"uid": f"player{i % size}", "caseid": str(i % 10)})
+        return res.status
+
+    async def end(i: int) -> int:
+        res = await asgi.request_json(app, "POST", "/events/end", {"session_id": f"seed-{to_end[i]}", "judge": i % 2 == 0})
+        return res.status
+
+    extra = {"size": size}
+    try:
+        return [
+            await drive("game.start", requests, concurrency, start, **extra),
+            await drive("game.end", len(to_end), concurrency, end, **extra),
+        ]
+    finally:
+        game.stats.close()
+        if game.fs_writer is not None:
+            game.fs_writer.close()
+
+
+async def sso_scenarios(size: int, requests: int, concurrency: int) -> List[dict]:
+    app = load_app("community")
+
+    async def consume(i: int) -> int:
+        res = await asgi.request_json(app, "POST", "/community/sso/consume", {"code": f"code{i}"})
+        return res.status
+
+    return [await drive("sso.consume", min(size, requests), concurrency, consume, size=size)]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenario", choices=["community", "game", "sso", "all"], default="all")
+    ap.add_argument("--size", type=int, default=1000, help="게시글 / 세션·플레이어 / SSO 코드 수")
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--firestore-latency-ms", type=float, default=0.0)
+    ap.add_argument("--auth-latency-ms", type=float, default=0.0)
+    ap.add_argument("--workdir", default=None, help="기본은 임시 폴더")
+    ap.add_argument("--gateway", action="store_true", help="백엔드별 앱 대신 gateway.main 앱으로")
+    args = ap.parse_args()
+
+    global USE_GATEWAY
+    USE_GATEWAY = args.gateway
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    client = prepare_env(workdir, args.firestore_latency_ms / 1000, args.auth_latency_ms / 1000)
+
+    wanted = ["community", "game", "sso"] if args.scenario == "all" else [args.scenario]
+    t0 = time.perf_counter()
+    if "community" in wanted:
+        seed_community(workdir, args.size)
+    if "game" in wanted:
+        seed_players(workdir, args.size)
+    if "sso" in wanted:
+        seed_sso(client, args.size)
+    print(json.dumps({"seeded": wanted, "size": args.size, "seconds": round(time.perf_counter() - t0, 2), "workdir": str(workdir)}))
+
+    runners = {"community": community_scenarios, "game": game_scenarios, "sso": sso_scenarios}
+
+    async def run() -> None:
+        for name in wanted:
+            for result in await runners[name](args.size, args.requests, args.concurrency):
+                print(json.dumps(result, ensure_ascii=False))
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+VerifiedTokenCache 를 로컬 서명 키로 확인한다 (네트워크 / firebase_admin 없이).
+
+구글 공개키 대신 이 파일에서 만든 RSA 키로 RS256 토큰을 서명하고,
+kid → 공개키 목록을 가진 검증 함수(verify_id_token 대역)를 캐시에 끼운다.
+- 같은 토큰을 다시 보내면 서명 검증 없이 캐시에서 (hits / misses)
+- exp 가 지난 토큰은 캐시에 있어도 다시 검증하고, 검증에서 거절된다
+- 키를 폐기하면(공개키 목록에서 뺌) 그 키로 서명한 새 토큰은 거절되고, clear() 뒤에는 캐시된 것도 거절
+- 다른 키로 서명한(위조) 토큰은 거절되고, 실패는 캐시하지 않는다
+다르면 첫 실패를 출력하고 종료 코드 1.
+
+    python -m benchmarks.token_cache_check
+"""
+from typing import Dict
+import json
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from community.backend.token_cache import VerifiedTokenCache
+
+ISSUER = "https://securetoken.google.com/local-check"
+AUDIENCE = "local-check"
+
+
+class Clock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class LocalSigner:
+    """kid 별 RSA 키. 공개키 목록(keys)이 verify_id_token 이 받아 오는 구글 인증서 역할."""
+
+    def __init__(self, clock: Clock):
+        self.clock = clock
+        self.private: Dict[str, rsa.RSAPrivateKey] = {}
+        self.keys: Dict[str, rsa.RSAPublicKey] = {}
+        self.verify_calls = 0
+
+    def add_key(self, kid: str) -> None:
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private[kid] = key
+        self.keys[kid] = key.public_key()
+
+    def revoke(self, kid: str) -> None:
+        self.keys.pop(kid, None)
+
+    def sign(self, uid: str, kid: str, ttl: float = 3600, key: rsa.RSAPrivateKey | None = None) -> str:
+        """key 를 주면 kid 는 그대로 두고 다른 키로 서명 (위조 토큰)."""
+        now = int(self.clock())
+        claims = {"uid": uid, "sub": uid, "iss": ISSUER, "aud": AUDIENCE, "iat": now, "exp": now + int(ttl)}
+        return jwt.encode(claims, key or self.private[kid], algorithm="RS256", headers={"kid": kid})
+
+    def verify_id_token(self, token: str) -> dict:
+        self.verify_calls += 1
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.keys.get(kid)
+        if key is None:
+            raise ValueError(f"unknown key id: {kid}")
+        # 시계는 jwt 가 아니라 여기서 (가짜 시계로 만료를 확인)
+        claims = jwt.decode(token, key, algorithms=["RS256"], audience=AUDIENCE, issuer=ISSUER,
+                            options={"verify_exp": False, "verify_iat": False})
+        if claims["exp"] <= self.clock():
+            raise ValueError("token expired")
+        return claims
+
+
+def expect(cond: bool, what: str) -> None:
+    if not cond:
+        raise SystemExit(f"token cache check failed: {what}")
+
+
+def rejected(cache: VerifiedTokenCache, token: str) -> bool:
+    try:
+        cache.verify(token)
+    except Exception:
+        return True
+    return False
+
+
+def main() -> None:
+    clock = Clock()
+    signer = LocalSigner(clock)
+    signer.add_key("k1")
+    signer.add_key("k2")
+    cache = VerifiedTokenCache(signer.verify_id_token, maxsize=100, clock=clock)
+
+    # 1. 같은 토큰은 한 번만 검증
+    token = signer.sign("alice", "k1")
+    for _ in range(5):
+        expect(cache.verify(token)["uid"] == "alice", "uid from cached token")
+    expect(signer.verify_calls == 1, f"signature checked {signer.verify_calls} times for one token")
+    expect(cache.stats()["hits"] == 4 and cache.stats()["misses"] == 1, f"hit/miss counters {cache.stats()}")
+
+    # 2. exp 가 지나면 캐시에서 빠지고 다시 검증 → 거절
+    short = signer.sign("bob", "k1", ttl=60)
+    cache.verify(short)
+    clock.now += 61
+    calls = signer.verify_calls
+    expect(rejected(cache, short), "expired token accepted")
+    expect(signer.verify_calls == calls + 1, "expired token served from cache")
+    expect(cache.stats()["expirations"] == 1, f"expirations {cache.stats()}")
+
+    # 3. 위조(kid 는 진짜, 서명은 다른 키) 토큰은 거절, 실패는 캐시하지 않음
+    rogue = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    forged = signer.sign("alice", "k1", key=rogue)
+    calls = signer.verify_calls
+    expect(rejected(cache, forged) and rejected(cache, forged), "forged token accepted")
+    expect(signer.verify_calls == calls + 2, "failed verification was cached")
+
+    # 4. 키 폐기: 그 키로 서명한 새 토큰은 거절, 다른 키 토큰은 그대로
+    cached_k1 = signer.sign("carol", "k1")
+    cache.verify(cached_k1)
+    fresh_k1 = signer.sign("dave", "k1")
+    k2_token = signer.sign("erin", "k2")
+    signer.revoke("k1")
+    expect(rejected(cache, fresh_k1), "token signed with a revoked key accepted")
+    expect(cache.verify(k2_token)["uid"] == "erin", "token signed with a live key rejected")
+    # 캐시된 토큰은 exp 까지 살아 있으므로, 키를 폐기했으면 clear() 로 비운다
+    cache.clear()
+    expect(rejected(cache, cached_k1), "cached token signed with a revoked key accepted after clear()")
+
+    # 5. 크기 제한 (LRU)
+    small = VerifiedTokenCache(signer.verify_id_token, maxsize=3, clock=clock)
+    for i in range(5):
+        small.verify(signer.sign(f"user{i}", "k2"))
+    expect(small.stats()["size"] == 3 and small.stats()["evictions"] == 2, f"LRU bound {small.stats()}")
+
+    print(json.dumps({"ok": True, **cache.stats()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+
+router = APIRouter()
+
+# CORS 설정 (프론트엔드에서 오는 요청 허용)
+# 배포 후에는 allow_origins에 실제 도메인 주소를 넣어야 합니다
+CORS = dict(
+    allow_origins=[
+        "http://localhost:5173", # 로컬 React 주소
+        "http://127.0.0.1:5173",
+    ],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+@router.get("/login_check")
+def login_check():
+    # 나중에 여기서 DB랑 통신하는 로직을 짭니다.
+    return {"status": "로그인 기능 준비 완료"}
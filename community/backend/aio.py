@@ -0,0 +1,128 @@
+"""
+커뮤니티 라우터용 논블로킹 I/O 계층.
+
+async 엔드포인트 안에서 Firestore / 토큰 검증 / SQLite / 파일 쓰기를 그대로 부르면
+그 동안 uvicorn 워커의 이벤트 루프 전체가 멈춘다. 그래서
+- Firestore, 인증, 읽기 쿼리  → 앱 전체가 같이 쓰는 anyio 워커 스레드에서, 동시에 IO_THREADS 개까지(run_io)
+                              (동기 엔드포인트를 돌리는 스레드와 같은 풀이라 게이트웨이에서도 스레드가 한 벌뿐)
+- 저장소 쓰기              → 단일 writer 태스크가 큐에서 하나씩 꺼내 순서대로 실행(storage_writer)
+                              큐가 가득 차면 기다리지 않고 바로 Overloaded(503)
+- 업로드 파일 저장          → 청크 단위로 스레드풀에서 쓰기(uploads.UploadStore.save)
+- CPU 작업(커스텀 토큰 RSA 서명) → 대기 수에 상한이 있는 풀(BoundedPool), 넘치면 바로 Overloaded
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Iterator, Optional
+import asyncio, os
+
+from anyio import CapacityLimiter, to_thread
+from fastapi import HTTPException
+
+IO_THREADS = int(os.environ.get("COMMUNITY_IO_THREADS", "16"))
+
+io_limiter = CapacityLimiter(IO_THREADS)
+
+
+async def run_io(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """블로킹 함수를 워커 스레드에서 실행하고 결과를 기다린다 (동시에 IO_THREADS 개까지)."""
+    return await to_thread.run_sync(partial(fn, *args, **kwargs), limiter=io_limiter)
+
+
+class Overloaded(HTTPException):
+    """대기열이 가득 차서 받지 않은 작업 → 그대로 503 + Retry-After 응답이 된다."""
+
+    def __init__(self, what: str, retry_after: int = 1):
+        super().__init__(status_code=503, detail=f"{what} overloaded", headers={"Retry-After": str(retry_after)})
+        self.retry_after = retry_after
+
+
+class StorageWriter:
+    """
+    저장소 쓰기를 한 줄로 세우는 writer 태스크.
+    쓰기가 한 스레드/한 연결에서만 일어나므로 워커 안에서는 잠금 경합이 없고,
+    쓰기가 몰려도 읽기 요청은 run_io 로 계속 처리된다.
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self._maxsize = maxsize
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="community-writer")
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_started(self) -> asyncio.Queue:
+        # 큐/태스크는 실제 이벤트 루프 위에서 처음 쓸 때 만든다 (import 시점엔 루프가 없음)
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(self._maxsize)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._queue
+
+    async def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        queue = self._ensure_started()
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            queue.put_nowait((partial(fn, *args, **kwargs), fut))
+        except asyncio.QueueFull:
+            # 쓰기가 밀려 있으면 요청을 붙잡아 두지 않고 바로 돌려보낸다
+            raise Overloaded("storage writes")
+        return await fut
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job, fut = await self._queue.get()
+            try:
+                result = await loop.run_in_executor(self._executor, job)
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+            else:
+                if not fut.done():
+                    fut.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+
+storage_writer = StorageWriter(maxsize=int(os.environ.get("COMMUNITY_WRITE_QUEUE", "1000")))
+
+
+class BoundedPool:
+    """
+    작은 전용 스레드풀 + 대기 수 상한.
+    로그인이 한꺼번에 몰려도 서명 작업이 run_io 자리를 다 차지하거나 끝없이 쌓이지 않고,
+    상한을 넘는 요청은 기다리게 하지 않고 바로 거절한다 (클라이언트가 Retry-After 뒤 재시도).
+    """
+
+    def __init__(self, name: str, workers: int, max_pending: int):
+        self.name = name
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"community-{name}")
+        self._pending = 0   # 이벤트 루프에서만 바꾸므로 잠금 불필요
+        self.rejected = 0
+
+    @contextmanager
+    def reserve(self) -> Iterator[None]:
+        """자리를 먼저 잡는다. 자리가 없으면 Overloaded (앞 단계 작업을 하기 전에 거절하고 싶을 때)."""
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded(self.name)
+        self._pending += 1
+        try:
+            yield
+        finally:
+            self._pending -= 1
+
+    async def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """reserve() 안에서 부른다."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self.reserve():
+            return await self.submit(fn, *args, **kwargs)
+
+    def depth(self) -> int:
+        return self._pending
@@ -1,46 +1,167 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Header
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Optional
 from datetime import datetime, timezone, timedelta
-import json, uuid
-
-from .firebase import get_uid, get_user_profile, consume_sso_code
+import hashlib, os, re, uuid
+
+from .firebase import get_uid, get_user_profiles, invalidate_user_profile, redeem_sso_code, create_custom_token
+from .storage import open_store
+from .aio import BoundedPool, run_io, storage_writer
+from .images import VariantPipeline
+from .uploads import UploadStore
+from .search import query_terms
+from .response_cache import EncodedResponse, ResponseCache
+from .events import BOARD, EventHub, post_topic
+from shared.metrics import gauge, instrument
+from shared.ratelimit import AdmissionRule, ConcurrencyLimit, RateLimit, open_buckets
 
 router = APIRouter()
 
 class SSOConsume(BaseModel):
     code: str
 
+# ✅ 커스텀 토큰 서명(RSA)은 작은 전용 풀에서, 밀려 있으면 바로 503
+sign_pool = BoundedPool(
+    "sign",
+    workers=int(os.environ.get("COMMUNITY_SIGN_THREADS", str(min(4, os.cpu_count() or 1)))),
+    max_pending=int(os.environ.get("COMMUNITY_SIGN_QUEUE", "256")),
+)
+gauge("community_sign_pool_pending", "Custom token signings queued or running", fn=sign_pool.depth)
+gauge("community_sign_pool_rejected", "Custom token signings rejected as overloaded", fn=lambda: sign_pool.rejected)
+
 @router.post("/sso/consume")
-def sso_consume(body: SSOConsume):
-    token = consume_sso_code(body.code.strip())
+async def sso_consume(body: SSOConsume):
+    # 서명 자리를 먼저 잡고 나서 코드를 소비한다 (밀려서 503 이 날 때 코드가 날아가지 않도록)
+    with sign_pool.reserve():
+        uid = await run_io(redeem_sso_code, body.code.strip())
+        token = await sign_pool.submit(create_custom_token, uid)
     return {"customToken": token}
 
 # ✅ 파일 위치 기준으로 경로 고정 (배포에서 꼬임 방지)
 BASE_DIR = Path(__file__).resolve().parent
-DB = BASE_DIR / "community.json"
-UPLOAD_DIR = BASE_DIR / "uploads"
+LEGACY_JSON_DB = BASE_DIR / "community.json"   # 예전 저장 파일 (최초 1회 마이그레이션 용)
+DB = Path(os.environ.get("COMMUNITY_DB_PATH", BASE_DIR / "community.sqlite3"))
+UPLOAD_DIR = Path(os.environ.get("COMMUNITY_UPLOAD_DIR", BASE_DIR / "uploads"))
+
+# ✅ 요청마다 JSON 전체를 읽고 쓰지 않고, 인덱스 있는 저장소를 통해 필요한 행만 다룬다
+# ✅ 저장소 메서드 호출 시간은 /metrics 의 app_operation_seconds{op="storage.*"} 로
+store = instrument(open_store(DB, json_path=LEGACY_JSON_DB), "storage")
+
+# ✅ 썸네일/중간 크기 이미지는 요청이 끝난 뒤 백그라운드에서 생성
+image_variants = VariantPipeline(
+    store, UPLOAD_DIR, workers=int(os.environ.get("COMMUNITY_IMAGE_THREADS", "2"))
+)
+image_variants.backfill()
+
+# ✅ 업로드는 내용(sha256) 기준으로 한 번만 저장, 안 쓰는 파일은 백그라운드 GC
+upload_store = instrument(UploadStore(
+    store,
+    UPLOAD_DIR,
+    grace_seconds=float(os.environ.get("COMMUNITY_UPLOAD_GC_GRACE", "3600")),
+    gc_interval=float(os.environ.get("COMMUNITY_UPLOAD_GC_INTERVAL", "600")),
+), "upload")
+upload_store.start_gc()
+
+gauge("community_write_queue_depth", "Storage writes waiting in the writer queue", fn=storage_writer.depth)
+
+# ✅ 게시판 앞쪽 페이지 / 많이 보는 글 상세는 인코딩·압축된 바이트를 캐시 (쓰기 API 가 비움)
+response_cache = ResponseCache(
+    max_pages=int(os.environ.get("COMMUNITY_CACHE_PAGES", "5")),
+    max_posts=int(os.environ.get("COMMUNITY_CACHE_POSTS", "256")),
+)
+gauge("community_response_cache_hits", "Pre-encoded response cache hits", fn=lambda: response_cache.stats()["hits"])
+gauge("community_response_cache_misses", "Pre-encoded response cache misses", fn=lambda: response_cache.stats()["misses"])
+
+# ✅ 쓰기 API 입장 제어: uid/IP 별 토큰 버킷(429) + 업로드 동시 처리 상한(503)
+# 한도 형식은 "횟수/초" (예: 5/60 → 60초에 5번), 0 이면 끔
+rate_buckets = open_buckets(BASE_DIR / "ratelimit.sqlite3")
+post_limit = RateLimit("community.post", os.environ.get("COMMUNITY_POST_RATE", "5/60"), rate_buckets)
+comment_limit = RateLimit("community.comment", os.environ.get("COMMUNITY_COMMENT_RATE", "20/60"), rate_buckets)
+write_ip_limit = RateLimit("community.ip", os.environ.get("COMMUNITY_WRITE_RATE_IP", "60/60"), rate_buckets)
+upload_slots = ConcurrencyLimit("community.upload", int(os.environ.get("COMMUNITY_UPLOAD_CONCURRENCY", "8")))
+
+def admission_rules(prefix: str = "/community") -> list:
+    """AdmissionMiddleware 용 규칙 (라우터를 붙인 prefix 기준). 본문을 읽기 전에 적용된다."""
+    p = re.escape(prefix)
+    return [
+        # 글 작성/수정은 multipart 업로드 → IP 한도 + 동시에 받는 업로드 수 상한
+        AdmissionRule(("POST", "PUT"), rf"{p}/posts(/[^/]+)?$", ip_limit=write_ip_limit, concurrency=upload_slots),
+        AdmissionRule(("POST", "DELETE"), rf"{p}/posts/", ip_limit=write_ip_limit),
+    ]
 
-# ----- 시간 & JSON 유틸 -----
+# ✅ CORS: 커뮤니티 프론트만 (Bearer 토큰이라 credentials 는 안 씀)
+CORS = dict(
+    allow_origins=["https://please-community-frontend.onrender.com"],
+    allow_credentials=False,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# ✅ 새 글/댓글은 /community/stream (SSE) 으로 바로 알림 → 프론트가 폴링하지 않아도 됨
+event_hub = EventHub(
+    queue_size=int(os.environ.get("COMMUNITY_STREAM_QUEUE", "100")),
+    max_clients=int(os.environ.get("COMMUNITY_STREAM_MAX_CLIENTS", "1000")),
+)
+gauge("community_stream_clients", "Connected SSE clients", fn=event_hub.clients)
+gauge("community_stream_dropped", "SSE clients cut off for falling behind", fn=lambda: event_hub.dropped)
+
+# ----- 시간 유틸 -----
 TZ_KST = timezone(timedelta(hours=9), name="KST")
 
 def now_kst_iso() -> str:
     return datetime.now(TZ_KST).isoformat()
 
-def load_db() -> Dict[str, Any]:
-    if not DB.exists():
-        return {"posts": []}
-    try:
-        return json.loads(DB.read_text(encoding="utf-8"))
-    except Exception:
-        return {"posts": []}
-
-def save_db(data: Dict[str, Any]) -> None:
-    DB.write_text(
-        json.dumps(data, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+# ----- 조건부 GET (ETag / 304) -----
+# 목록은 짧게만 캐시하고 매번 ETag 로 재검증, 상세도 같은 방식
+BOARD_CACHE_CONTROL = f"public, max-age={int(os.environ.get('COMMUNITY_BOARD_MAX_AGE', '0'))}, must-revalidate"
+POST_CACHE_CONTROL = f"public, max-age={int(os.environ.get('COMMUNITY_POST_MAX_AGE', '0'))}, must-revalidate"
+
+COMMENTS_DEFAULT_LIMIT = 20
+COMMENTS_MAX_LIMIT = 100
+
+# 목록/검색 page_size 상한 (목록은 page_size 가 캐시 키에 들어가므로 종류가 무한히 늘지 않게)
+POSTS_DEFAULT_PAGE_SIZE = 10
+POSTS_MAX_PAGE_SIZE = 50
+# page 상한 (OFFSET 이 SQLite 정수 범위를 넘지 않게, 넘어가는 페이지는 어차피 빈 페이지)
+POSTS_MAX_PAGE = 1_000_000
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+def _conditional(request: Request, response: Response, etag: str, cache_control: str) -> Response | None:
+    """If-None-Match 가 맞으면 본문 없이 304 를, 아니면 None (헤더만 세팅)"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def _display_name(profile: dict | None) -> str:
+    return (profile or {}).get("nickname") or (profile or {}).get("name") or "익명"
+
+def profile_nickname(uid: str) -> str:
+    # users 프로필(캐시 + 배치 조회)에서 표시 이름을 고른다
+    return _display_name(get_user_profiles([uid]).get(uid))
+
+def fill_nicknames(rows: list) -> list:
+    # 닉네임 없이 저장된 글/댓글(예전 데이터)은 작성자 프로필을 한 번에(get_all 1회) 읽어서 채운다
+    profiles = get_user_profiles([r.get("uid") for r in rows if not r.get("nickname")])
+    for r in rows:
+        if not r.get("nickname"):
+            r["nickname"] = _display_name(profiles.get(r.get("uid")))
+    return rows
+
+async def with_nicknames(rows: list) -> list:
+    # 다 채워져 있으면(대부분) 스레드풀까지 갈 필요 없음
+    if any(not r.get("nickname") for r in rows):
+        await run_io(fill_nicknames, rows)
+    return rows
 
 class CommentCreate(BaseModel):
     # ✅ 호환성 위해 uid/nickname은 optional로 두고,
@@ -63,16 +184,12 @@ async def create_post(
     - Authorization: Bearer <firebase id token>
     - nickname, title, body, image(옵션)
     """
-    uid = get_uid(authorization)
+    # ✅ 토큰 검증/Firestore/DB 는 전부 스레드풀·writer 로 넘겨서 이벤트 루프를 막지 않음
+    uid = await run_io(get_uid, authorization)
+    await post_limit.check_async(uid)
 
     # nickname이 비어있으면 users 컬렉션에서 보정(있을 때만)
-    nick = (nickname or "").strip()
-    if not nick:
-        profile = get_user_profile(uid)
-        nick = (profile or {}).get("nickname") or (profile or {}).get("name") or "익명"
-
-    db = load_db()
-    posts = db.setdefault("posts", [])
+    nick = (nickname or "").strip() or await run_io(profile_nickname, uid)
 
     post_id = str(uuid.uuid4())
     now = now_kst_iso()
@@ -80,20 +197,8 @@ async def create_post(
 
     # 이미지 저장
     if image and image.filename:
-        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-        ext = Path(image.filename).suffix.lower()
-        filename = f"{post_id}{ext}"
-        dest = UPLOAD_DIR / filename
-
-        with dest.open("wb") as f:
-            while True:
-                chunk = await image.read(1024 * 1024)
-                if not chunk:
-                    break
-                f.write(chunk)
-
         # ✅ 상대경로로 저장(프론트에서 API_BASE_URL 붙여서 사용)
-        image_url = f"/uploads/{filename}"
+        image_url = await upload_store.save(image)
 
     post = {
         "postId": post_id,
@@ -104,76 +209,222 @@ async def create_post(
         "createdAt": now,
         "updatedAt": now,
         "imageUrl": image_url,
-        "comments": [],
     }
-    posts.append(post)
-    save_db(db)
-    return post
+    created = await storage_writer.submit(store.create_post, post)
+    response_cache.invalidate_board()
+    event_hub.publish(BOARD, "post.created", _list_item(created))
+    image_variants.schedule(post_id, image_url)
+    return created
 
 # ========== 2) 글 목록 ==========
-@router.get("/posts")
-def list_posts(page: int = 1, page_size: int = 10):
-    db = load_db()
-    posts = sorted(
-        db.get("posts", []),
-        key=lambda p: p.get("createdAt", ""),
-        reverse=True,
-    )
+def _list_item(p: dict) -> dict:
+    return {
+        "postId": p["postId"],
+        "title": p["title"],
+        "nickname": p.get("nickname", ""),
+        "createdAt": p.get("createdAt", ""),
+        "commentCount": p.get("commentCount", 0),
+        # 목록은 미리보기만 필요하므로 썸네일 우선 (아직 없으면 원본)
+        "imageUrl": p.get("thumbnailUrl") or p.get("imageUrl"),
+    }
+
+def _detail(p: dict) -> dict:
+    out = {
+        "postId": p["postId"],
+        "title": p["title"],
+        "body": p["body"],
+        "uid": p["uid"],
+        "nickname": p.get("nickname", ""),
+        "createdAt": p.get("createdAt", ""),
+        "updatedAt": p.get("updatedAt", ""),
+        # 상세는 중간 크기 우선, 원본 주소는 따로 내려줌
+        "imageUrl": p.get("mediumUrl") or p.get("imageUrl"),
+        "originalImageUrl": p.get("imageUrl"),
+        "commentCount": p.get("commentCount", 0),
+        "comments": p.get("comments", []),
+    }
+    # comments_limit 로 일부만 실었으면 나머지를 이어 받을 커서
+    if "commentsCursor" in p:
+        out["nextCommentsCursor"] = _encode_comment_cursor(p["commentsCursor"])
+    return out
+
+def _encode_comment_cursor(cursor: int | None) -> str | None:
+    return str(cursor) if cursor is not None else None
 
-    total_items = len(posts)
-    if page < 1:
-        page = 1
+def _parse_comment_cursor(cursor: str | None) -> int | None:
+    if not cursor:
+        return None
+    # 댓글 id 는 SQLite INTEGER(64비트) 범위 안
+    if not cursor.isdigit() or len(cursor) > 18:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return int(cursor)
+
+def _clamp_limit(limit: int) -> int:
+    return max(1, min(limit, COMMENTS_MAX_LIMIT))
+
+def _clamp_page(page: int) -> int:
+    return max(1, min(page, POSTS_MAX_PAGE))
+
+def _clamp_page_size(page_size: int) -> int:
     if page_size < 1:
-        page_size = 10
-
-    start = (page - 1) * page_size
-    end = start + page_size
-    slice_posts = posts[start:end]
-
-    items = [
-        {
-            "postId": p["postId"],
-            "title": p["title"],
-            "nickname": p.get("nickname", ""),
-            "createdAt": p.get("createdAt", ""),
-            "commentCount": len(p.get("comments", [])),
-            "imageUrl": p.get("imageUrl"),
+        return POSTS_DEFAULT_PAGE_SIZE
+    return min(page_size, POSTS_MAX_PAGE_SIZE)
+
+def _parse_cursor(after: str) -> Optional[tuple[str, str]]:
+    # after=<createdAt,postId>  (빈 문자열이면 첫 페이지)
+    if not after:
+        return None
+    created_at, sep, post_id = after.rpartition(",")
+    if not sep or not created_at or not post_id:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return created_at, post_id
+
+@router.get("/posts")
+async def list_posts(
+    request: Request,
+    response: Response,
+    page: int = 1,
+    page_size: int = POSTS_DEFAULT_PAGE_SIZE,
+    after: str | None = None,
+):
+    page = _clamp_page(page)
+    page_size = _clamp_page_size(page_size)
+
+    # ✅ 게시판 버전 + 요청 파라미터로 ETag → 바뀐 게 없으면 목록을 다시 만들지 않음
+    board_version = await run_io(store.board_version)
+    query_key = hashlib.sha1(f"{page}|{page_size}|{after}".encode("utf-8")).hexdigest()[:12]
+    etag = f'"b{board_version}-{query_key}"'
+    not_modified = _conditional(request, response, etag, BOARD_CACHE_CONTROL)
+    if not_modified is not None:
+        return not_modified
+
+    # ✅ 커서 모드: ?after=<createdAt,postId> → 인덱스에서 바로 다음 위치부터 읽는다
+    if after is not None:
+        slice_posts = await with_nicknames(await run_io(store.list_posts_after, _parse_cursor(after), page_size))
+        items = [_list_item(p) for p in slice_posts]
+        next_cursor = None
+        if len(items) == page_size:
+            last = items[-1]
+            next_cursor = f"{last['createdAt']},{last['postId']}"
+        return {
+            "pageSize": page_size,
+            "items": items,
+            "nextCursor": next_cursor,
         }
-        for p in slice_posts
-    ]
+
+    # ✅ 앞쪽 페이지는 같은 게시판 버전이면 미리 인코딩해 둔 바이트를 그대로
+    cacheable = response_cache.cacheable_page(page)
+    if cacheable:
+        cached = response_cache.get_board((page, page_size), board_version)
+        if cached is not None:
+            return cached.response(request, BOARD_CACHE_CONTROL)
+
+    total_items = await run_io(store.count_posts)
+    slice_posts = await with_nicknames(await run_io(store.list_posts, (page - 1) * page_size, page_size))
+    items = [_list_item(p) for p in slice_posts]
 
     total_pages = (total_items + page_size - 1) // page_size if page_size else 1
 
-    return {
+    payload = {
         "page": page,
         "pageSize": page_size,
         "totalPages": total_pages,
         "totalItems": total_items,
         "items": items,
     }
+    if not cacheable:
+        return payload
+    entry = EncodedResponse(payload, board_version, etag)
+    response_cache.put_board((page, page_size), entry)
+    return entry.response(request, BOARD_CACHE_CONTROL)
+
+# ========== 2-1) 검색 ==========
+@router.get("/search")
+async def search_posts(q: str = "", page: int = 1, page_size: int = POSTS_DEFAULT_PAGE_SIZE):
+    """제목/본문/댓글 검색 (한국어는 글자 바이그램). 모든 검색어를 포함하는 글만 관련도 순으로."""
+    page = _clamp_page(page)
+    page_size = _clamp_page_size(page_size)
+
+    terms = query_terms(q)
+    hits, total_items = await run_io(store.search, terms, (page - 1) * page_size, page_size)
+    await with_nicknames(hits)
+    return {
+        "query": q,
+        "page": page,
+        "pageSize": page_size,
+        "totalPages": (total_items + page_size - 1) // page_size,
+        "totalItems": total_items,
+        "items": [{**_list_item(p), "score": p["score"]} for p in hits],
+    }
 
 # ========== 3) 글 상세 ==========
 @router.get("/posts/{post_id}")
-def get_post_detail(post_id: str):
-    db = load_db()
-    for p in db.get("posts", []):
-        if p.get("postId") == post_id:
-            comments = sorted(
-                p.get("comments", []),
-                key=lambda c: c.get("createdAt", ""),
-            )
-            return {
-                "postId": p["postId"],
-                "title": p["title"],
-                "body": p["body"],
-                "uid": p["uid"],
-                "nickname": p.get("nickname", ""),
-                "createdAt": p.get("createdAt", ""),
-                "updatedAt": p.get("updatedAt", ""),
-                "imageUrl": p.get("imageUrl"),
-                "comments": comments,
-            }
-    raise HTTPException(status_code=404, detail="post not found")
+async def get_post_detail(
+    post_id: str,
+    request: Request,
+    response: Response,
+    comments_limit: int | None = None,
+):
+    """comments_limit=N 이면 댓글은 앞쪽 N개만 싣고 나머지는 /comments?cursor= 로 이어 받는다."""
+    if comments_limit is not None:
+        comments_limit = _clamp_limit(comments_limit)
+    variant = f"-c{comments_limit}" if comments_limit is not None else ""
+
+    # ✅ 버전만 먼저 확인해서 안 바뀌었으면 댓글까지 읽지 않고 304
+    version = await run_io(store.post_version, post_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="post not found")
+    not_modified = _conditional(request, response, f'"p{post_id}-v{version}{variant}"', POST_CACHE_CONTROL)
+    if not_modified is not None:
+        return not_modified
+
+    # ✅ 최근에 읽힌 글은 인코딩·압축된 바이트를 그대로 (댓글까지 다시 읽지 않음)
+    cache_key = (post_id, comments_limit)
+    cached = response_cache.get_post(cache_key, version)
+    if cached is not None:
+        return cached.response(request, POST_CACHE_CONTROL)
+
+    p = await run_io(store.get_post, post_id, comments_limit=comments_limit)
+    if p is None:
+        raise HTTPException(status_code=404, detail="post not found")
+    # 글 작성자 + 댓글 작성자들을 한 번에
+    await with_nicknames([p, *p.get("comments", [])])
+    # 두 조회 사이에 바뀌었을 수 있으므로 실제 내려주는 버전으로 ETag 를 맞춘다
+    entry = EncodedResponse(_detail(p), p["version"], f'"p{post_id}-v{p["version"]}{variant}"')
+    response_cache.put_post(cache_key, entry)
+    return entry.response(request, POST_CACHE_CONTROL)
+
+# ========== 3-1) 댓글 목록 (커서 페이지네이션) ==========
+@router.get("/posts/{post_id}/comments")
+async def list_comments(
+    post_id: str,
+    request: Request,
+    response: Response,
+    cursor: str | None = None,
+    limit: int = COMMENTS_DEFAULT_LIMIT,
+):
+    """
+    댓글을 작성 순서대로 limit 개씩.
+    - cursor: 이전 응답의 nextCursor (없으면 처음부터)
+    """
+    after = _parse_comment_cursor(cursor)
+    limit = _clamp_limit(limit)
+
+    version = await run_io(store.post_version, post_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="post not found")
+    etag = f'"p{post_id}-v{version}-after{after or 0}-l{limit}"'
+    not_modified = _conditional(request, response, etag, POST_CACHE_CONTROL)
+    if not_modified is not None:
+        return not_modified
+
+    comments, next_cursor = await run_io(store.page_comments, post_id, after, limit)
+    await with_nicknames(comments)
+    return {
+        "postId": post_id,
+        "items": comments,
+        "nextCursor": _encode_comment_cursor(next_cursor),
+    }
 
 # ========== 4) 글 수정 ==========
 @router.put("/posts/{post_id}")
@@ -184,75 +435,48 @@ async def update_post(
     body: str | None = Form(None),
     image: UploadFile | None = File(None),
 ):
-    uid = get_uid(authorization)
-
-    db = load_db()
-    posts = db.get("posts", [])
-
-    for p in posts:
-        if p.get("postId") == post_id:
-            # ✅ 작성자만 수정 가능
-            if p.get("uid") != uid:
-                raise HTTPException(status_code=403, detail="forbidden")
-
-            if title is not None:
-                p["title"] = title
-            if body is not None:
-                p["body"] = body
-
-            if image and image.filename:
-                UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-                ext = Path(image.filename).suffix.lower()
-                filename = f"{post_id}{ext}"
-                dest = UPLOAD_DIR / filename
-
-                with dest.open("wb") as f:
-                    while True:
-                        chunk = await image.read(1024 * 1024)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-
-                p["imageUrl"] = f"/uploads/{filename}"
-
-            p["updatedAt"] = now_kst_iso()
-            save_db(db)
-
-            comments = sorted(
-                p.get("comments", []),
-                key=lambda c: c.get("createdAt", ""),
-            )
-            return {
-                "postId": p["postId"],
-                "title": p["title"],
-                "body": p["body"],
-                "uid": p["uid"],
-                "nickname": p.get("nickname", ""),
-                "createdAt": p.get("createdAt", ""),
-                "updatedAt": p.get("updatedAt", ""),
-                "imageUrl": p.get("imageUrl"),
-                "comments": comments,
-            }
-
-    raise HTTPException(status_code=404, detail="post not found")
+    uid = await run_io(get_uid, authorization)
+    await post_limit.check_async(uid)
+
+    p = await run_io(store.get_post, post_id, with_comments=False)
+    if p is None:
+        raise HTTPException(status_code=404, detail="post not found")
+
+    # ✅ 작성자만 수정 가능
+    if p.get("uid") != uid:
+        raise HTTPException(status_code=403, detail="forbidden")
+
+    fields = {}
+    if title is not None:
+        fields["title"] = title
+    if body is not None:
+        fields["body"] = body
+
+    if image and image.filename:
+        fields["imageUrl"] = await upload_store.save(image)
+
+    fields["updatedAt"] = now_kst_iso()
+    updated = await storage_writer.submit(store.update_post, post_id, fields)
+    response_cache.invalidate_board()
+    response_cache.invalidate_post(post_id)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="post not found")
+    if "imageUrl" in fields:
+        image_variants.schedule(post_id, fields["imageUrl"])
+    detail = _detail(updated)
+    event_hub.publish(BOARD, "post.updated", _list_item(updated))
+    event_hub.publish(post_topic(post_id), "post.updated", {k: v for k, v in detail.items() if k not in ("comments", "nextCommentsCursor")})
+    return detail
 
 # ========== 5) 글 삭제 ==========
 @router.delete("/posts/{post_id}")
-def delete_post(
+async def delete_post(
     post_id: str,
     authorization: str | None = Header(default=None),
 ):
-    uid = get_uid(authorization)
-
-    db = load_db()
-    posts = db.get("posts", [])
-
-    target = None
-    for p in posts:
-        if p.get("postId") == post_id:
-            target = p
-            break
+    uid = await run_io(get_uid, authorization)
 
+    target = await run_io(store.get_post, post_id, with_comments=False)
     if not target:
         raise HTTPException(status_code=404, detail="post not found")
 
@@ -260,22 +484,27 @@ def delete_post(
     if target.get("uid") != uid:
         raise HTTPException(status_code=403, detail="forbidden")
 
-    db["posts"] = [p for p in posts if p.get("postId") != post_id]
-    save_db(db)
+    deleted = await storage_writer.submit(store.delete_post, post_id)
+    response_cache.invalidate_board()
+    response_cache.invalidate_post(post_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="post not found")
+    event_hub.publish(BOARD, "post.deleted", {"postId": post_id})
+    event_hub.publish(post_topic(post_id), "post.deleted", {"postId": post_id})
     return {"ok": True}
 
 # ========== 6) 댓글 작성 ==========
 @router.post("/posts/{post_id}/comments")
-def add_comment(
+async def add_comment(
     post_id: str,
     body: CommentCreate,
     authorization: str | None = Header(default=None),
 ):
     # ✅ 토큰 있으면 토큰 우선, 없으면(호환) body.uid를 요구
     if authorization and authorization.startswith("Bearer "):
-        uid = get_uid(authorization)
-        profile = get_user_profile(uid)
-        nickname = (body.nickname or "").strip() or (profile or {}).get("nickname") or (profile or {}).get("name") or "익명"
+        uid = await run_io(get_uid, authorization)
+        # ✅ 닉네임을 직접 보냈으면 프로필 조회 자체를 건너뜀
+        nickname = (body.nickname or "").strip() or await run_io(profile_nickname, uid)
     else:
         if not body.uid:
             raise HTTPException(status_code=401, detail="Missing token")
@@ -284,22 +513,63 @@ def add_comment(
 
     if not body.body.strip():
         raise HTTPException(status_code=400, detail="comment body is empty")
+    await comment_limit.check_async(uid)
+
+    comment = {
+        "commentId": str(uuid.uuid4()),
+        "uid": uid,
+        "nickname": nickname,
+        "body": body.body,
+        "createdAt": now_kst_iso(),
+    }
+    added = await storage_writer.submit(store.add_comment, post_id, comment)
+    # 목록의 commentCount 도 바뀐다
+    response_cache.invalidate_board()
+    response_cache.invalidate_post(post_id)
+    if not added:
+        raise HTTPException(status_code=404, detail="post not found")
+    # 목록은 댓글 수만 +1, 글을 보고 있는 쪽에는 댓글 전체
+    event_hub.publish(BOARD, "comment.added", {"postId": post_id, "commentId": comment["commentId"]})
+    event_hub.publish(post_topic(post_id), "comment.added", {"postId": post_id, **comment})
+    return comment
+
+# ========== 6-1) 프로필 캐시 비우기 ==========
+@router.post("/profile/refresh")
+async def refresh_profile(authorization: str | None = Header(default=None)):
+    """
+    users/{uid} 프로필(닉네임 등)을 고친 뒤 부른다.
+    프로필은 이 서버가 쓰지 않고 프론트가 Firestore 에 직접 쓰므로, 이걸 부르지 않으면 TTL 동안 예전 값이 보인다.
+    """
+    uid = await run_io(get_uid, authorization)
+    invalidate_user_profile(uid)
+    return {"ok": True}
+
+# ========== 7) 실시간 알림 (SSE) ==========
+STREAM_MAX_POSTS = 20
 
-    db = load_db()
-    posts = db.get("posts", [])
-
-    for p in posts:
-        if p.get("postId") == post_id:
-            comment = {
-                "commentId": str(uuid.uuid4()),
-                "uid": uid,
-                "nickname": nickname,
-                "body": body.body,
-                "createdAt": now_kst_iso(),
-            }
-            p.setdefault("comments", []).append(comment)
-            p["updatedAt"] = now_kst_iso()
-            save_db(db)
-            return comment
-
-    raise HTTPException(status_code=404, detail="post not found")
+@router.get("/stream")
+async def stream(
+    request: Request,
+    board: bool = True,
+    post_id: list[str] | None = Query(None),
+):
+    """
+    Server-Sent Events. 구독할 토픽:
+    - board=true (기본): post.created / post.updated / post.deleted / comment.added (목록용 요약)
+    - post_id=<id> (여러 개 가능): 그 글의 post.updated / post.deleted / comment.added (댓글 전체)
+    resync 이벤트를 받으면 놓친 게 있다는 뜻이니 목록/상세를 다시 받고 재접속한다.
+    """
+    topics = [BOARD] if board else []
+    topics += [post_topic(pid) for pid in dict.fromkeys(post_id or [])][:STREAM_MAX_POSTS]
+    if not topics:
+        raise HTTPException(status_code=400, detail="no topics")
+    if event_hub.full():
+        raise HTTPException(status_code=503, detail="too many stream clients", headers={"Retry-After": "10"})
+
+    last_event_id = request.headers.get("last-event-id", "")
+    return StreamingResponse(
+        event_hub.stream(topics, int(last_event_id) if last_event_id.isdigit() else None),
+        media_type="text/event-stream",
+        # 프록시(nginx 등)가 모아서 보내지 않도록
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,136 @@
+"""
+커뮤니티 실시간 알림 (Server-Sent Events).
+
+예전에는 새 댓글을 보려면 프론트가 몇 초마다 글 상세/목록을 다시 받아야 했다.
+이제는 GET /community/stream 에 붙어 있으면 쓰기 API 가 보내는 작은 변경 이벤트를 바로 받는다.
+- 토픽: "board" (목록에 보이는 변화), "post:<postId>" (그 글의 수정/삭제/댓글)
+- 이벤트는 발행할 때 한 번만 SSE 프레임 바이트로 만들고, 구독자 큐에는 같은 바이트를 넣는다
+- 구독자 큐는 크기가 정해져 있고, 못 따라오는 클라이언트는 resync 이벤트를 받고 끊긴다
+  (다시 붙어서 목록/상세를 새로 받으면 됨) → 느린 클라이언트 하나가 메모리를 잡아먹지 않는다
+- 최근 이벤트는 링 버퍼에 남겨 두고, 재접속할 때 Last-Event-ID 이후 것을 다시 보내 준다
+  (id 는 프로세스가 뜬 시각(µs)부터 세므로, 재시작 전의 id 로 붙으면 이어 보내지 않고 resync)
+
+허브는 프로세스 안에만 있으므로 워커가 여러 개면 같은 워커에서 일어난 쓰기만 전달된다.
+발행(publish)은 이벤트 루프 스레드(엔드포인트 안)에서만 부른다.
+"""
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Optional, Set, Tuple
+import asyncio, itertools, time
+
+from .response_cache import dumps
+
+BOARD = "board"
+
+
+def post_topic(post_id: str) -> str:
+    return f"post:{post_id}"
+
+
+def _frame(event_id: int, topic: str, event: str, data: Dict[str, Any]) -> bytes:
+    # 여러 토픽을 같이 구독해도 구분되도록 data 에 topic 을 넣는다
+    payload = dumps({"topic": topic, **data})
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event.encode("utf-8"), payload)
+
+
+RESYNC = b"event: resync\ndata: {}\n\n"
+
+
+class Subscriber:
+    __slots__ = ("topics", "queue", "overflowed")
+
+    def __init__(self, topics: Set[str], maxsize: int):
+        self.topics = topics
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+
+class EventHub:
+    def __init__(self, queue_size: int = 100, max_clients: int = 1000, backlog: int = 1000, first_id: Optional[int] = None):
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self._subs: Dict[str, Set[Subscriber]] = {}
+        self._count = 0
+        # 재시작하면 id 가 1부터 다시 시작해 예전 Last-Event-ID 와 겹치지 않도록 부팅 시각에서 시작
+        self._first_id = first_id if first_id is not None else time.time_ns() // 1000
+        self._ids = itertools.count(self._first_id)
+        self._last_id = self._first_id - 1
+        # (id, topic, frame) 최근 이벤트 (재접속 시 이어 보내기용)
+        self._recent: Deque[Tuple[int, str, bytes]] = deque(maxlen=backlog)
+        self.published = 0
+        self.dropped = 0
+
+    def clients(self) -> int:
+        return self._count
+
+    def full(self) -> bool:
+        return self._count >= self.max_clients
+
+    def subscribe(self, topics: Iterable[str], last_event_id: Optional[int] = None) -> Subscriber:
+        sub = Subscriber(set(topics), self.queue_size)
+        if last_event_id is not None:
+            self._replay(sub, last_event_id)
+        for topic in sub.topics:
+            self._subs.setdefault(topic, set()).add(sub)
+        self._count += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        for topic in sub.topics:
+            subs = self._subs.get(topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[topic]
+        self._count -= 1
+
+    def _replay(self, sub: Subscriber, last_event_id: int) -> None:
+        # 버퍼보다 오래된 지점이거나, 아직 발행한 적 없는 id(다른/이전 프로세스의 id)면
+        # 빠진 게 있을 수 있으니 처음부터 다시 받게 한다
+        oldest = self._recent[0][0] if self._recent else self._last_id + 1
+        if last_event_id + 1 < oldest or last_event_id > self._last_id:
+            self._offer(sub, RESYNC)
+            return
+        for event_id, topic, frame in self._recent:
+            if event_id > last_event_id and topic in sub.topics:
+                self._offer(sub, frame)
+
+    def _offer(self, sub: Subscriber, frame: bytes) -> None:
+        if sub.overflowed:
+            return
+        try:
+            sub.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            sub.overflowed = True
+            self.dropped += 1
+
+    def publish(self, topic: str, event: str, data: Dict[str, Any]) -> None:
+        event_id = self._last_id = next(self._ids)
+        frame = _frame(event_id, topic, event, data)
+        self._recent.append((event_id, topic, frame))
+        self.published += 1
+        for sub in list(self._subs.get(topic, ())):
+            self._offer(sub, frame)
+
+    async def stream(
+        self, topics: Iterable[str], last_event_id: Optional[int] = None, heartbeat: float = 15.0
+    ) -> AsyncIterator[bytes]:
+        """SSE 본문. 본문을 실제로 보내기 시작할 때 구독하고, 연결이 끊기면(태스크 취소) 해제한다."""
+        sub = self.subscribe(topics, last_event_id)
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                if sub.overflowed and sub.queue.empty():
+                    yield RESYNC
+                    return
+                try:
+                    frame = await asyncio.wait_for(sub.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    # 프록시가 유휴 연결을 끊지 않도록
+                    yield b": ping\n\n"
+                    continue
+                yield frame
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self) -> Dict[str, int]:
+        return {"clients": self._count, "topics": len(self._subs), "published": self.published, "dropped": self.dropped}
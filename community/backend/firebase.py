@@ -1,16 +1,25 @@
-import os, json
-import firebase_admin
-from firebase_admin import credentials, auth as fb_auth, firestore
+import os
 from fastapi import HTTPException
 import time
 
-def consume_sso_code(code: str) -> str:
+from .token_cache import VerifiedTokenCache
+from .ttl_cache import TTLCache
+from shared import firebase_client
+from shared.firebase_client import auth as fb_auth, db
+from shared.metrics import gauge, timed, timer
+
+def redeem_sso_code(code: str) -> str:
     """
-    sso_codes/{code} 문서에서 uid를 꺼내서
-    Firebase Custom Token을 발급해 반환한다.
+    sso_codes/{code} 문서를 1회용으로 소비하고 uid 를 돌려준다.
+    읽은 뒤 update 는 "읽은 시점 이후 안 바뀌었을 때만"(last_update_time 조건) 쓰므로
+    같은 코드를 동시에 두 번 보내도 한쪽만 성공한다. (트랜잭션보다 왕복이 하나 적음: BeginTransaction 없음)
+    왕복은 get + 조건부 update 두 번이다 (요청은 한 번이었지만 못 맞춤).
+    uid / expiresAt 은 문서를 읽어야 알 수 있고, Firestore 에는 "쓰면서 이전 값을 돌려주는" 호출이 없어
+    읽기 없이 한 번에 소비하려면 코드를 발급하는 쪽의 문서 형식부터 바꿔야 한다.
     """
     ref = db.collection("sso_codes").document(code)
-    doc = ref.get()
+    with timer("firestore.sso_codes.get"):
+        doc = ref.get()
     if not doc.exists:
         raise HTTPException(status_code=400, detail="Invalid code")
 
@@ -26,32 +35,33 @@ def consume_sso_code(code: str) -> str:
     if not uid:
         raise HTTPException(status_code=400, detail="Code has no uid")
 
-    # 1회용 처리
-    ref.update({"used": True})
-
-    # Custom token 발급
-    custom_token = fb_auth.create_custom_token(uid).decode("utf-8")
-    return custom_token
-
+    # 1회용 처리 (조건부 쓰기 한 번)
+    try:
+        with timer("firestore.sso_codes.consume"):
+            ref.update({"used": True}, option=db.write_option(last_update_time=doc.update_time))
+    except Exception as e:
+        if firebase_client.precondition_failed(e):
+            # 그 사이 다른 요청이 먼저 썼다
+            raise HTTPException(status_code=400, detail="Code already used")
+        raise
+    return uid
 
-def _init_firebase():
-    if firebase_admin._apps:
-        return
 
-    cred_json = os.environ.get("FIREBASE_CREDENTIALS")
-    if not cred_json:
-        raise RuntimeError("FIREBASE_CREDENTIALS env not set")
+def create_custom_token(uid: str) -> str:
+    """Firebase Custom Token 발급 (RSA 서명, CPU 작업 → community.sign_pool 에서 실행)."""
+    with timer("auth.create_custom_token"):
+        return fb_auth.create_custom_token(uid).decode("utf-8")
 
-    try:
-        cred_dict = json.loads(cred_json)
-    except Exception as e:
-        raise RuntimeError(f"FIREBASE_CREDENTIALS is not valid JSON: {e}")
 
-    cred = credentials.Certificate(cred_dict)
-    firebase_admin.initialize_app(cred)
+# ✅ Firebase 초기화는 shared.firebase_client 가 처음 쓸 때 한 번만 (import 시점엔 안 함)
 
-_init_firebase()
-db = firestore.client()
+# ✅ 같은 토큰은 exp 까지 서명 검증을 다시 하지 않는다
+token_cache = VerifiedTokenCache(
+    timed("auth.verify_id_token", lambda token: fb_auth.verify_id_token(token)),
+    maxsize=int(os.environ.get("ID_TOKEN_CACHE_SIZE", "10000")),
+)
+gauge("community_token_cache_hits", "Verified ID token cache hits", fn=lambda: token_cache.stats()["hits"])
+gauge("community_token_cache_misses", "Verified ID token cache misses", fn=lambda: token_cache.stats()["misses"])
 
 def get_uid(authorization: str | None) -> str:
     if not authorization or not authorization.startswith("Bearer "):
@@ -59,14 +69,38 @@ def get_uid(authorization: str | None) -> str:
 
     token = authorization.split(" ", 1)[1].strip()
     try:
-        decoded = fb_auth.verify_id_token(token)
+        decoded = token_cache.verify(token)
         return decoded["uid"]
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# ✅ users/{uid} 프로필은 잠깐 캐시 (닉네임 보정용이라 몇 분 늦게 반영돼도 괜찮음)
+profile_cache = TTLCache(
+    ttl=float(os.environ.get("PROFILE_CACHE_TTL", "300")),
+    maxsize=int(os.environ.get("PROFILE_CACHE_SIZE", "10000")),
+)
+
+def get_user_profiles(uids) -> dict:
+    """
+    여러 uid 의 프로필을 한 번에 가져온다. {uid: dict | None}
+    캐시에 없는 것만 모아서 get_all 한 번(1 round trip)으로 읽는다.
+    """
+    uids = list(dict.fromkeys(u for u in uids if u))
+    found, missing = profile_cache.get_many(uids)
+    if missing:
+        refs = [db.collection("users").document(uid) for uid in missing]
+        fetched = {uid: None for uid in missing}
+        with timer("firestore.users.get_all"):
+            snaps = list(db.get_all(refs))
+        for snap in snaps:
+            if snap.exists:
+                fetched[snap.id] = snap.to_dict()
+        profile_cache.set_many(fetched)
+        found.update(fetched)
+    return found
+
 def get_user_profile(uid: str) -> dict | None:
-    user_ref = db.collection("users").document(uid)
-    user_doc = user_ref.get()
-    if user_doc.exists:
-        return user_doc.to_dict()
-    return None
+    return get_user_profiles([uid]).get(uid)
+
+def invalidate_user_profile(uid: str) -> None:
+    profile_cache.invalidate(uid)
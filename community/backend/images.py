@@ -0,0 +1,89 @@
+"""
+업로드 이미지 변형(썸네일 / 중간 크기) 백그라운드 생성.
+
+원본은 그대로 두고, 업로드 요청이 끝난 뒤 별도 스레드풀에서
+- thumb  : 목록(list_posts) 미리보기용 작은 이미지
+- medium : 상세(get_post_detail) 표시용 이미지
+를 WebP(불가하면 JPEG)로 만든다. 다시 인코딩하면서 EXIF(위치 정보 등)는 버리고,
+회전 정보만 먼저 픽셀에 반영한다.
+Pillow 가 없으면 변형 없이 원본만 쓴다.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict
+import os, uuid
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow 미설치 → 변형 생성 비활성화
+    Image = ImageOps = features = None
+
+VARIANT_SIZES = {
+    "thumb": (320, 320),
+    "medium": (1280, 1280),
+}
+VARIANT_QUALITY = 80
+
+
+def _output_format() -> tuple[str, str]:
+    if features is not None and features.check("webp"):
+        return "WEBP", "webp"
+    return "JPEG", "jpg"
+
+
+def build_variants(src: Path, out_dir: Path) -> Dict[str, str]:
+    """src 로 변형 파일들을 만들고 {variant: 파일명} 을 반환한다."""
+    fmt, ext = _output_format()
+    out = {variant: f"{src.stem}.{variant}.{ext}" for variant in VARIANT_SIZES}
+    # 같은 내용의 파일(중복 업로드)은 변형도 이미 있으므로 다시 만들지 않는다
+    if all((out_dir / name).exists() for name in out.values()):
+        return out
+
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if im.mode in ("LA", "P", "PA") else "RGB")
+
+        for variant, size in VARIANT_SIZES.items():
+            v = im.copy()
+            v.thumbnail(size, Image.LANCZOS)
+            if fmt == "JPEG" and v.mode != "RGB":
+                v = v.convert("RGB")
+
+            name = out[variant]
+            # 같은 원본을 두 작업이 동시에 처리해도 서로의 임시 파일을 건드리지 않게
+            tmp = out_dir / f"{name}.{uuid.uuid4().hex}.tmp"
+            # exif= 를 넘기지 않으므로 메타데이터 없이 저장됨
+            v.save(tmp, fmt, quality=VARIANT_QUALITY)
+            os.replace(tmp, out_dir / name)
+    return out
+
+
+class VariantPipeline:
+    def __init__(self, store, upload_dir: Path, workers: int = 2):
+        self.store = store
+        self.upload_dir = upload_dir
+        self.enabled = Image is not None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="community-images")
+
+    def schedule(self, post_id: str, source_url: str) -> None:
+        """업로드 요청은 기다리지 않고 바로 반환 (작업은 풀에서 처리)"""
+        if self.enabled and source_url:
+            self._pool.submit(self._run, post_id, source_url)
+
+    def backfill(self) -> None:
+        # 예전에 올라온 이미지 중 썸네일이 없는 것들도 채워 넣는다
+        if not self.enabled:
+            return
+        for post_id, url in self.store.originals_missing_variants():
+            self.schedule(post_id, url)
+
+    def _run(self, post_id: str, source_url: str) -> None:
+        src = self.upload_dir / source_url.removeprefix("/uploads/")
+        try:
+            names = build_variants(src, src.parent)
+        except Exception as e:
+            print("image variant failed:", post_id, e)
+            return
+        prefix = source_url[: len(source_url) - len(src.name)]
+        self.store.set_image_variants(post_id, source_url, {v: prefix + n for v, n in names.items()})
@@ -1,27 +1,30 @@
 from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
-from community.backend.community import router as community_router
+from community.backend.community import router as community_router, UPLOAD_DIR, CORS, admission_rules
+from community.backend.uploads import ImmutableStaticFiles
+from shared.metrics import MetricsMiddleware, metrics_endpoint
+from shared.ratelimit import AdmissionMiddleware
 
 app = FastAPI(title="Please Community API", version="0.1.0")
 
 BASE_DIR = Path(__file__).resolve().parent
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["https://please-community-frontend.onrender.com"],
-    allow_credentials=False,          # ✅ Bearer 토큰이면 보통 False
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# ✅ 쓰기 API 의 IP 한도 / 업로드 동시 처리 상한은 본문을 읽기 전에 (CORS 안쪽이라 429/503 에도 CORS 헤더가 붙음)
+app.add_middleware(AdmissionMiddleware, rules=admission_rules("/community"))
+
+app.add_middleware(CORSMiddleware, **CORS)
+
+# ✅ 라우트별 지연 히스토그램 + /metrics (Prometheus 텍스트 형식)
+app.add_middleware(MetricsMiddleware)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 app.include_router(community_router, prefix="/community", tags=["community"])
 
-UPLOAD_DIR = BASE_DIR / "uploads"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+# ✅ 업로드 파일은 내용 주소라 바뀌지 않음 → 장기 캐시
+app.mount("/uploads", ImmutableStaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,147 @@
+"""
+자주 읽는 커뮤니티 응답(게시판 앞쪽 몇 페이지, 많이 보는 글 상세)을 인코딩된 바이트로 캐시.
+
+예전에는 같은 목록/상세를 요청마다 dict 로 다시 만들고 JSON 인코딩을 했고, 압축 없이 내려보냈다.
+이제는
+- 처음 한 번만 JSON(orjson, 한글은 이스케이프 없이 UTF-8 그대로)으로 인코딩하고
+- gzip / brotli 로 미리 압축해 둔 바이트를 Accept-Encoding 에 맞춰 그대로 내려준다
+- 항목마다 게시판/글 버전을 같이 저장해서, 버전이 다르면 (다른 워커가 쓴 경우 포함) 쓰지 않는다
+- 쓰기 API 는 invalidate_board / invalidate_post 로 바로 비운다
+orjson / brotli 가 없으면 표준 json / gzip 만 쓴다.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import gzip, json, threading
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:  # orjson 미설치 → 표준 json
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli 미설치 → gzip 만
+    brotli = None
+
+# 이보다 작은 응답은 압축해 봐야 헤더 값도 안 나온다
+MIN_COMPRESS_BYTES = 512
+
+
+def dumps(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _accepts(header: str) -> set:
+    """Accept-Encoding 에서 q=0 이 아닌 인코딩 이름들."""
+    out = set()
+    for part in header.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if name:
+            out.add(name)
+    return out
+
+
+class EncodedResponse:
+    """인코딩 + 압축까지 끝난 응답 본문 한 벌."""
+
+    __slots__ = ("version", "etag", "raw", "gzip", "br")
+
+    def __init__(self, payload: Any, version: Hashable, etag: str):
+        self.version = version
+        self.etag = etag
+        self.raw = dumps(payload)
+        self.gzip: Optional[bytes] = None
+        self.br: Optional[bytes] = None
+        if len(self.raw) >= MIN_COMPRESS_BYTES:
+            self.gzip = gzip.compress(self.raw, compresslevel=6, mtime=0)
+            if brotli is not None:
+                self.br = brotli.compress(self.raw, quality=5)
+
+    def pick(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        if self.gzip is None or not accept_encoding:
+            return self.raw, None
+        accepted = _accepts(accept_encoding)
+        if self.br is not None and "br" in accepted:
+            return self.br, "br"
+        if "gzip" in accepted or "*" in accepted:
+            return self.gzip, "gzip"
+        return self.raw, None
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        body, encoding = self.pick(request.headers.get("accept-encoding", ""))
+        headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """
+    board: (page, page_size) → 게시판 앞쪽 max_pages 페이지만
+    posts: (post_id, comments_limit) → 최근에 읽힌 순서로 max_posts 개 (LRU)
+    """
+
+    def __init__(self, max_pages: int = 5, max_posts: int = 256):
+        self.max_pages = max_pages
+        self.max_posts = max_posts
+        self._board: Dict[Hashable, EncodedResponse] = {}
+        self._posts: "OrderedDict[Hashable, EncodedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cacheable_page(self, page: int) -> bool:
+        return page <= self.max_pages
+
+    # ----- 게시판 목록 -----
+    def get_board(self, key: Hashable, version: Hashable) -> Optional[EncodedResponse]:
+        with self._lock:
+            entry = self._board.get(key)
+            if entry is not None and entry.version == version:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put_board(self, key: Hashable, entry: EncodedResponse) -> None:
+        with self._lock:
+            self._board[key] = entry
+
+    def invalidate_board(self) -> None:
+        with self._lock:
+            self._board.clear()
+
+    # ----- 글 상세 -----
+    def get_post(self, key: Hashable, version: Hashable) -> Optional[EncodedResponse]:
+        with self._lock:
+            entry = self._posts.get(key)
+            if entry is not None and entry.version == version:
+                self._posts.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put_post(self, key: Hashable, entry: EncodedResponse) -> None:
+        with self._lock:
+            self._posts[key] = entry
+            self._posts.move_to_end(key)
+            while len(self._posts) > self.max_posts:
+                self._posts.popitem(last=False)
+
+    def invalidate_post(self, post_id: str) -> None:
+        # comments_limit 별로 여러 벌이 있을 수 있다
+        with self._lock:
+            for key in [k for k in self._posts if k[0] == post_id]:
+                del self._posts[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"board": len(self._board), "posts": len(self._posts), "hits": self.hits, "misses": self.misses}
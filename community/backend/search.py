@@ -0,0 +1,48 @@
+"""
+게시글/댓글 검색용 토큰화.
+
+한국어는 띄어쓰기/조사 때문에 단어 단위 색인이 잘 안 맞아서 글자 바이그램(2-gram)을 쓴다.
+- 한글/한자/가나 연속 구간 → 바이그램 + (한 글자 검색을 위해) 유니그램
+- 영문/숫자 연속 구간     → 단어 그대로
+- NFKC 정규화 + 소문자
+실제 색인(역색인 테이블)은 storage 에서 글/댓글 쓰기와 같은 트랜잭션으로 갱신한다.
+"""
+from collections import Counter
+from typing import Dict, List
+import re, unicodedata
+
+_RUN_RE = re.compile(r"[0-9a-z]+|[ㄱ-ㆎ가-힣]+|[぀-ヿ㐀-鿿]+")
+MAX_WORD_LEN = 40
+MAX_QUERY_TERMS = 32
+
+# 필드별 가중치: 제목 > 본문 > 댓글
+FIELD_WEIGHTS = {"t": 3.0, "b": 1.0, "c": 0.5}
+
+
+def _runs(text: str) -> List[str]:
+    return _RUN_RE.findall(unicodedata.normalize("NFKC", text or "").lower())
+
+
+def document_terms(text: str) -> Dict[str, int]:
+    """색인용: {term: 등장 횟수}"""
+    counts: Counter = Counter()
+    for run in _runs(text):
+        if run.isascii():
+            counts[run[:MAX_WORD_LEN]] += 1
+            continue
+        counts.update(run)
+        counts.update(run[i:i + 2] for i in range(len(run) - 1))
+    return counts
+
+
+def query_terms(q: str) -> List[str]:
+    """검색어용: 중복 없는 term 목록 (한 글자 구간만 유니그램, 나머지는 바이그램)"""
+    terms: List[str] = []
+    for run in _runs(q):
+        if run.isascii():
+            terms.append(run[:MAX_WORD_LEN])
+        elif len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return list(dict.fromkeys(terms))[:MAX_QUERY_TERMS]
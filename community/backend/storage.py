@@ -0,0 +1,678 @@
+"""
+커뮤니티 게시글 저장소.
+
+예전에는 요청마다 community.json 전체를 읽고 다시 썼지만,
+이제는 작은 저장소 인터페이스(PostRepository) 뒤에 SQLite(WAL) 구현을 둔다.
+- posts / comments / images 테이블 + 인덱스 → 조회/수정/삭제/댓글이 O(log n)
+- WAL + BEGIN IMMEDIATE → 여러 워커가 같은 파일을 써도 업데이트 유실 없음
+- 기존 community.json 은 최초 1회 자동 마이그레이션
+- 업로드 파일(blobs)은 참조 수를 글 변경과 같은 트랜잭션에서 관리 → 아무도 안 쓰는 파일은 GC 대상
+- 검색용 역색인(search_postings)도 글/댓글 쓰기와 같은 트랜잭션에서 증분 갱신
+"""
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+
+from .search import FIELD_WEIGHTS, document_terms
+import json, math, os, sqlite3, threading, time
+
+
+class PostRepository(ABC):
+    """라우터가 의존하는 최소 인터페이스 (다른 백엔드를 붙일 때 이것만 구현)"""
+
+    @abstractmethod
+    def create_post(self, post: Dict[str, Any]) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    def get_post(
+        self, post_id: str, *, with_comments: bool = True, comments_limit: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def list_posts(self, offset: int, limit: int) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def list_posts_after(self, cursor: Optional[Tuple[str, str]], limit: int) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def count_posts(self) -> int: ...
+
+    @abstractmethod
+    def post_version(self, post_id: str) -> Optional[int]: ...
+
+    @abstractmethod
+    def board_version(self) -> int: ...
+
+    @abstractmethod
+    def update_post(self, post_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    def delete_post(self, post_id: str) -> bool: ...
+
+    @abstractmethod
+    def add_comment(self, post_id: str, comment: Dict[str, Any]) -> bool: ...
+
+    @abstractmethod
+    def page_comments(
+        self, post_id: str, cursor: Optional[int], limit: int
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]: ...
+
+    @abstractmethod
+    def set_image_variants(self, post_id: str, source_url: str, variants: Dict[str, str]) -> bool: ...
+
+    @abstractmethod
+    def search(self, terms: List[str], offset: int, limit: int) -> Tuple[List[Dict[str, Any]], int]: ...
+
+    @abstractmethod
+    def find_blob(self, digest: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def touch_blob(self, path: str, digest: str) -> None: ...
+
+    @abstractmethod
+    def orphan_blobs(self, released_before: float) -> List[str]: ...
+
+    @abstractmethod
+    def drop_blob(self, path: str, released_before: float, remove: Callable[[], None]) -> bool: ...
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    post_id     TEXT PRIMARY KEY,
+    uid         TEXT NOT NULL,
+    nickname    TEXT NOT NULL DEFAULT '',
+    title       TEXT NOT NULL,
+    body        TEXT NOT NULL DEFAULT '',
+    created_at  TEXT NOT NULL,
+    updated_at  TEXT NOT NULL,
+    comment_count INTEGER NOT NULL DEFAULT 0,
+    version     INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_posts_created ON posts (created_at DESC, post_id DESC);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id          INTEGER PRIMARY KEY,
+    comment_id  TEXT NOT NULL UNIQUE,
+    post_id     TEXT NOT NULL REFERENCES posts (post_id) ON DELETE CASCADE,
+    uid         TEXT NOT NULL,
+    nickname    TEXT NOT NULL DEFAULT '',
+    body        TEXT NOT NULL,
+    created_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_comments_post ON comments (post_id, id);
+
+CREATE TABLE IF NOT EXISTS images (
+    post_id     TEXT NOT NULL REFERENCES posts (post_id) ON DELETE CASCADE,
+    variant     TEXT NOT NULL,
+    url         TEXT NOT NULL,
+    PRIMARY KEY (post_id, variant)
+) WITHOUT ROWID;
+
+-- 역색인: term 별 (글, 필드) 등장 횟수. field = t(제목) / b(본문) / c(댓글 전체)
+CREATE TABLE IF NOT EXISTS search_postings (
+    term        TEXT NOT NULL,
+    post_id     TEXT NOT NULL REFERENCES posts (post_id) ON DELETE CASCADE,
+    field       TEXT NOT NULL,
+    tf          INTEGER NOT NULL,
+    PRIMARY KEY (term, post_id, field)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_post ON search_postings (post_id, field);
+
+-- 업로드 파일: path 는 uploads/ 기준 상대경로, digest 는 내용 sha256
+-- ref_count 가 0 이 된 시각(released_at)부터 유예 시간이 지나면 GC 가 파일을 지운다
+CREATE TABLE IF NOT EXISTS blobs (
+    path        TEXT PRIMARY KEY,
+    digest      TEXT,
+    ref_count   INTEGER NOT NULL DEFAULT 0,
+    released_at REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_blobs_digest ON blobs (digest);
+CREATE INDEX IF NOT EXISTS idx_blobs_orphan ON blobs (released_at) WHERE ref_count <= 0;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key         TEXT PRIMARY KEY,
+    value       TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# 게시글 목록/상세 공통 SELECT (원본/썸네일/중간 크기 이미지는 images 테이블에서 PK로 조인)
+_POST_SELECT = """
+SELECT p.post_id, p.uid, p.nickname, p.title, p.body, p.created_at, p.updated_at,
+       p.comment_count, p.version, i.url AS image_url, t.url AS thumb_url, m.url AS medium_url
+FROM posts p
+LEFT JOIN images i ON i.post_id = p.post_id AND i.variant = 'original'
+LEFT JOIN images t ON t.post_id = p.post_id AND t.variant = 'thumb'
+LEFT JOIN images m ON m.post_id = p.post_id AND m.variant = 'medium'
+"""
+
+
+UPLOAD_URL_PREFIX = "/uploads/"
+
+
+def _post_row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "postId": row["post_id"],
+        "uid": row["uid"],
+        "nickname": row["nickname"],
+        "title": row["title"],
+        "body": row["body"],
+        "createdAt": row["created_at"],
+        "updatedAt": row["updated_at"],
+        "imageUrl": row["image_url"],
+        "thumbnailUrl": row["thumb_url"],
+        "mediumUrl": row["medium_url"],
+        "commentCount": row["comment_count"],
+        "version": row["version"],
+    }
+
+
+def _comment_row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "commentId": row["comment_id"],
+        "uid": row["uid"],
+        "nickname": row["nickname"],
+        "body": row["body"],
+        "createdAt": row["created_at"],
+    }
+
+
+class SqlitePostStore(PostRepository):
+    def __init__(self, path: Path | str):
+        self.path = str(path)
+        self._local = threading.local()
+        self._init_schema()
+
+    # ----- 연결 관리 (스레드마다 1개) -----
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        """쓰기 트랜잭션: 시작 시점에 쓰기 잠금을 잡아서 동시 쓰기끼리 덮어쓰지 않게 한다."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def _init_schema(self) -> None:
+        conn = self._conn()
+        # 예전 스키마로 만들어진 파일이면 새 컬럼을 추가하고 채운다
+        cols = {r["name"] for r in conn.execute("PRAGMA table_info(posts)")}
+        if cols and "comment_count" not in cols:
+            with self._tx() as tx:
+                tx.execute("ALTER TABLE posts ADD COLUMN comment_count INTEGER NOT NULL DEFAULT 0")
+                tx.execute(
+                    "UPDATE posts SET comment_count ="
+                    " (SELECT COUNT(*) FROM comments c WHERE c.post_id = posts.post_id)"
+                )
+        if cols and "version" not in cols:
+            with self._tx() as tx:
+                tx.execute("ALTER TABLE posts ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        conn.executescript(SCHEMA)
+        if self.get_meta("post_count") is None:
+            with self._tx() as tx:
+                tx.execute(
+                    "INSERT OR IGNORE INTO meta (key, value) SELECT 'post_count', COUNT(*) FROM posts"
+                )
+        with self._tx() as tx:
+            tx.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('board_version', '1')")
+        # 검색 색인 도입 전의 글/댓글은 한 번만 전체 색인
+        if self.get_meta("search_indexed") is None:
+            with self._tx() as tx:
+                self._reindex_all(tx)
+                tx.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('search_indexed', '1')")
+        # blobs 도입 전에 올라온 원본 이미지도 참조 수를 잡아 둔다 (이후 교체/삭제 시 GC 되도록)
+        with self._tx() as tx:
+            tx.execute(
+                "INSERT INTO blobs (path, ref_count)"
+                " SELECT substr(i.url, ?), COUNT(*) FROM images i"
+                " WHERE i.variant = 'original' AND i.url LIKE ? || '%'"
+                " AND NOT EXISTS (SELECT 1 FROM blobs b WHERE b.path = substr(i.url, ?))"
+                " GROUP BY i.url",
+                (len(UPLOAD_URL_PREFIX) + 1, UPLOAD_URL_PREFIX, len(UPLOAD_URL_PREFIX) + 1),
+            )
+
+    def _touch(self, conn: sqlite3.Connection, post_id: Optional[str] = None) -> None:
+        """
+        캐시 검증용 버전 올리기: 글 내용이 바뀌면 그 글의 version 을,
+        목록에 보이는 것이 바뀔 수 있으면 항상 board_version 을 올린다.
+        """
+        if post_id is not None:
+            conn.execute("UPDATE posts SET version = version + 1 WHERE post_id = ?", (post_id,))
+        conn.execute(
+            "UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'board_version'"
+        )
+
+    def _bump_post_count(self, conn: sqlite3.Connection, delta: int) -> None:
+        conn.execute(
+            "UPDATE meta SET value = CAST(value AS INTEGER) + ? WHERE key = 'post_count'",
+            (delta,),
+        )
+
+    # ----- 메타 -----
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    # ----- 게시글 -----
+    def create_post(self, post: Dict[str, Any]) -> Dict[str, Any]:
+        with self._tx() as conn:
+            self._insert_post(conn, post)
+            self._bump_post_count(conn, 1)
+            self._touch(conn)
+        return {**post, "commentCount": 0, "version": 1, "comments": []}
+
+    def _insert_post(self, conn: sqlite3.Connection, post: Dict[str, Any]) -> None:
+        conn.execute(
+            "INSERT INTO posts (post_id, uid, nickname, title, body, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                post["postId"], post["uid"], post.get("nickname", ""), post["title"],
+                post.get("body", ""), post["createdAt"], post.get("updatedAt") or post["createdAt"],
+            ),
+        )
+        if post.get("imageUrl"):
+            self._set_original(conn, post["postId"], post["imageUrl"])
+        self._index_text(conn, post["postId"], "t", post["title"])
+        self._index_text(conn, post["postId"], "b", post.get("body", ""))
+
+    def _set_original(self, conn: sqlite3.Connection, post_id: str, url: str) -> None:
+        row = conn.execute(
+            "SELECT url FROM images WHERE post_id = ? AND variant = 'original'", (post_id,)
+        ).fetchone()
+        if row is not None and row["url"] == url:
+            return
+        if row is not None:
+            self._release(conn, row["url"])
+        # 원본이 바뀌면 예전 원본으로 만든 썸네일/중간 크기는 버린다
+        conn.execute("DELETE FROM images WHERE post_id = ?", (post_id,))
+        conn.execute(
+            "INSERT INTO images (post_id, variant, url) VALUES (?, 'original', ?)", (post_id, url)
+        )
+        self._retain(conn, url)
+
+    # ----- 업로드 파일 참조 수 -----
+    def _retain(self, conn: sqlite3.Connection, url: str) -> None:
+        if not url.startswith(UPLOAD_URL_PREFIX):
+            return
+        conn.execute(
+            "INSERT INTO blobs (path, ref_count) VALUES (?, 1)"
+            " ON CONFLICT (path) DO UPDATE SET ref_count = ref_count + 1, released_at = NULL",
+            (url[len(UPLOAD_URL_PREFIX):],),
+        )
+
+    def _release(self, conn: sqlite3.Connection, url: str) -> None:
+        if not url.startswith(UPLOAD_URL_PREFIX):
+            return
+        conn.execute(
+            "UPDATE blobs SET ref_count = ref_count - 1,"
+            " released_at = CASE WHEN ref_count - 1 <= 0 THEN ? ELSE NULL END"
+            " WHERE path = ?",
+            (time.time(), url[len(UPLOAD_URL_PREFIX):]),
+        )
+
+    def find_blob(self, digest: str) -> Optional[str]:
+        row = self._conn().execute("SELECT path FROM blobs WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        return row["path"] if row else None
+
+    def touch_blob(self, path: str, digest: str) -> None:
+        """
+        업로드 직후 호출: 처음 보는 파일이면 참조 0 으로 등록하고,
+        참조 0 인 파일이면 유예 시간을 다시 시작해서 GC 가 방금 올린 파일을 지우지 않게 한다.
+        (요청이 중간에 실패해 글에 연결되지 못한 파일도 결국 GC 된다)
+        """
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT INTO blobs (path, digest, ref_count, released_at) VALUES (?, ?, 0, ?)"
+                " ON CONFLICT (path) DO UPDATE SET digest = excluded.digest,"
+                " released_at = CASE WHEN ref_count <= 0 THEN excluded.released_at ELSE NULL END",
+                (path, digest, time.time()),
+            )
+
+    def orphan_blobs(self, released_before: float) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT path FROM blobs WHERE ref_count <= 0 AND released_at < ?", (released_before,)
+        )
+        return [r["path"] for r in rows]
+
+    def drop_blob(self, path: str, released_before: float, remove: Callable[[], None]) -> bool:
+        """
+        여전히 고아인 경우에만 행을 지우고 remove() 로 파일을 지운 뒤 True (다시 참조됐으면 False).
+        remove 는 쓰기 잠금을 쥔 채 부르므로, 같은 내용의 업로드(touch_blob)나 글의 참조(_retain)는
+        파일이 지워진 뒤에야 행을 다시 만든다 → 행은 있는데 파일은 없는 상태가 생기지 않는다.
+        """
+        with self._tx() as conn:
+            cur = conn.execute(
+                "DELETE FROM blobs WHERE path = ? AND ref_count <= 0 AND released_at < ?",
+                (path, released_before),
+            )
+            if cur.rowcount > 0:
+                remove()
+        return cur.rowcount > 0
+
+    def get_post(
+        self, post_id: str, *, with_comments: bool = True, comments_limit: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """comments_limit 을 주면 앞쪽 N개만 싣고 이어서 받을 커서를 commentsCursor 로 준다."""
+        conn = self._conn()
+        row = conn.execute(_POST_SELECT + " WHERE p.post_id = ?", (post_id,)).fetchone()
+        if row is None:
+            return None
+        post = _post_row_to_dict(row)
+        if with_comments and comments_limit is not None:
+            post["comments"], post["commentsCursor"] = self.page_comments(post_id, None, comments_limit)
+        elif with_comments:
+            post["comments"] = self.list_comments(post_id)
+        return post
+
+    def list_posts(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """page/page_size 호환용: 같은 (created_at, post_id) 인덱스를 따라 offset 만큼 건너뛴다."""
+        rows = self._conn().execute(
+            _POST_SELECT + " ORDER BY p.created_at DESC, p.post_id DESC LIMIT ? OFFSET ?",
+            (limit, offset),
+        )
+        return [_post_row_to_dict(r) for r in rows]
+
+    def list_posts_after(self, cursor: Optional[Tuple[str, str]], limit: int) -> List[Dict[str, Any]]:
+        """
+        키셋(커서) 페이지네이션: cursor=(createdAt, postId) 보다 오래된 글을 최신순으로 limit개.
+        인덱스에서 커서 위치로 바로 찾아가므로 깊은 페이지도 첫 페이지와 비용이 같다.
+        """
+        if cursor is None:
+            return self.list_posts(0, limit)
+        created_at, post_id = cursor
+        rows = self._conn().execute(
+            _POST_SELECT
+            + " WHERE (p.created_at, p.post_id) < (?, ?)"
+            " ORDER BY p.created_at DESC, p.post_id DESC LIMIT ?",
+            (created_at, post_id, limit),
+        )
+        return [_post_row_to_dict(r) for r in rows]
+
+    def count_posts(self) -> int:
+        # 글 수는 meta 에 유지하므로 COUNT(*) 스캔이 필요 없다
+        return int(self.get_meta("post_count") or 0)
+
+    def post_version(self, post_id: str) -> Optional[int]:
+        row = self._conn().execute("SELECT version FROM posts WHERE post_id = ?", (post_id,)).fetchone()
+        return row["version"] if row else None
+
+    def board_version(self) -> int:
+        return int(self.get_meta("board_version") or 0)
+
+    def update_post(self, post_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """fields 에는 title / body / imageUrl / updatedAt 중 바꿀 것만 넣는다."""
+        columns = {"title": "title", "body": "body", "updatedAt": "updated_at"}
+        sets = [f"{columns[k]} = ?" for k in fields if k in columns]
+        params = [fields[k] for k in fields if k in columns]
+        with self._tx() as conn:
+            if sets:
+                cur = conn.execute(f"UPDATE posts SET {', '.join(sets)} WHERE post_id = ?", (*params, post_id))
+                if cur.rowcount == 0:
+                    return None
+            elif conn.execute("SELECT 1 FROM posts WHERE post_id = ?", (post_id,)).fetchone() is None:
+                return None
+            if fields.get("imageUrl"):
+                self._set_original(conn, post_id, fields["imageUrl"])
+            # 바뀐 필드만 색인을 갈아끼운다 (댓글 색인은 그대로)
+            for key, field in (("title", "t"), ("body", "b")):
+                if key in fields:
+                    conn.execute(
+                        "DELETE FROM search_postings WHERE post_id = ? AND field = ?", (post_id, field)
+                    )
+                    self._index_text(conn, post_id, field, fields[key])
+            self._touch(conn, post_id)
+        return self.get_post(post_id)
+
+    def delete_post(self, post_id: str) -> bool:
+        with self._tx() as conn:
+            row = conn.execute(
+                "SELECT url FROM images WHERE post_id = ? AND variant = 'original'", (post_id,)
+            ).fetchone()
+            if row is not None:
+                self._release(conn, row["url"])
+            cur = conn.execute("DELETE FROM posts WHERE post_id = ?", (post_id,))
+            if cur.rowcount > 0:
+                self._bump_post_count(conn, -1)
+                self._touch(conn)
+        return cur.rowcount > 0
+
+    # ----- 이미지 변형 (썸네일 등) -----
+    def set_image_variants(self, post_id: str, source_url: str, variants: Dict[str, str]) -> bool:
+        """
+        백그라운드에서 만든 변형 이미지를 기록한다.
+        그 사이 원본이 바뀌었거나 글이 지워졌으면(source_url 불일치) 기록하지 않고 False.
+        """
+        with self._tx() as conn:
+            row = conn.execute(
+                "SELECT url FROM images WHERE post_id = ? AND variant = 'original'", (post_id,)
+            ).fetchone()
+            if row is None or row["url"] != source_url:
+                return False
+            conn.executemany(
+                "INSERT OR REPLACE INTO images (post_id, variant, url) VALUES (?, ?, ?)",
+                [(post_id, variant, url) for variant, url in variants.items()],
+            )
+            self._touch(conn, post_id)
+        return True
+
+    def originals_missing_variants(self) -> List[Tuple[str, str]]:
+        """썸네일이 아직 없는 (post_id, 원본 url) 목록 - 시작 시 백필용"""
+        rows = self._conn().execute(
+            "SELECT i.post_id, i.url FROM images i WHERE i.variant = 'original' AND NOT EXISTS"
+            " (SELECT 1 FROM images t WHERE t.post_id = i.post_id AND t.variant = 'thumb')"
+        )
+        return [(r["post_id"], r["url"]) for r in rows]
+
+    # ----- 댓글 -----
+    def add_comment(self, post_id: str, comment: Dict[str, Any]) -> bool:
+        with self._tx() as conn:
+            cur = conn.execute(
+                "UPDATE posts SET updated_at = ?, comment_count = comment_count + 1 WHERE post_id = ?",
+                (comment["createdAt"], post_id),
+            )
+            if cur.rowcount == 0:
+                return False
+            self._insert_comment(conn, post_id, comment)
+            self._touch(conn, post_id)
+        return True
+
+    def _insert_comment(self, conn: sqlite3.Connection, post_id: str, comment: Dict[str, Any]) -> None:
+        conn.execute(
+            "INSERT INTO comments (comment_id, post_id, uid, nickname, body, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                comment["commentId"], post_id, comment["uid"], comment.get("nickname", ""),
+                comment["body"], comment["createdAt"],
+            ),
+        )
+        self._index_text(conn, post_id, "c", comment["body"])
+
+    def list_comments(self, post_id: str) -> List[Dict[str, Any]]:
+        # 삽입 순서(id) == 작성 순서라서 정렬 비용 없이 인덱스 순서대로 읽는다
+        rows = self._conn().execute(
+            "SELECT comment_id, uid, nickname, body, created_at FROM comments"
+            " WHERE post_id = ? ORDER BY id",
+            (post_id,),
+        )
+        return [_comment_row_to_dict(r) for r in rows]
+
+    def page_comments(
+        self, post_id: str, cursor: Optional[int], limit: int
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        (post_id, id) 인덱스를 커서 위치부터 limit 개만 읽는다.
+        반환: (댓글 목록, 다음 커서 - 더 없으면 None)
+        """
+        rows = self._conn().execute(
+            "SELECT id, comment_id, uid, nickname, body, created_at FROM comments"
+            " WHERE post_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (post_id, cursor or 0, limit + 1),
+        ).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = rows[-1]["id"] if has_more else None
+        return [_comment_row_to_dict(r) for r in rows], next_cursor
+
+    # ----- 검색 -----
+    def _index_text(self, conn: sqlite3.Connection, post_id: str, field: str, text: str) -> None:
+        terms = document_terms(text)
+        if not terms:
+            return
+        conn.executemany(
+            "INSERT INTO search_postings (term, post_id, field, tf) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (term, post_id, field) DO UPDATE SET tf = tf + excluded.tf",
+            [(term, post_id, field, tf) for term, tf in terms.items()],
+        )
+
+    def _reindex_all(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DELETE FROM search_postings")
+        for row in conn.execute("SELECT post_id, title, body FROM posts").fetchall():
+            self._index_text(conn, row["post_id"], "t", row["title"])
+            self._index_text(conn, row["post_id"], "b", row["body"])
+        for row in conn.execute("SELECT post_id, body FROM comments").fetchall():
+            self._index_text(conn, row["post_id"], "c", row["body"])
+
+    def search(self, terms: List[str], offset: int, limit: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        모든 term 을 포함하는 글을 tf * 필드 가중치 * idf 합으로 정렬해서 (목록, 전체 개수) 반환.
+        검색어 term 들의 posting 만 읽으므로 전체 글을 훑지 않는다.
+        """
+        if not terms:
+            return [], 0
+        conn = self._conn()
+        n_posts = max(self.count_posts(), 1)
+
+        idf: Dict[str, float] = {}
+        for term in terms:
+            df = conn.execute(
+                "SELECT COUNT(DISTINCT post_id) FROM search_postings WHERE term = ?", (term,)
+            ).fetchone()[0]
+            if df == 0:
+                return [], 0  # 하나라도 없으면 AND 검색 결과 없음
+            idf[term] = math.log(1 + n_posts / df)
+
+        term_case = " ".join("WHEN ? THEN ?" for _ in terms)
+        matched = (
+            "SELECT post_id, SUM(tf * CASE field WHEN 't' THEN ? WHEN 'b' THEN ? ELSE ? END"
+            f" * CASE term {term_case} END) AS score"
+            f" FROM search_postings WHERE term IN ({', '.join('?' for _ in terms)})"
+            " GROUP BY post_id HAVING COUNT(DISTINCT term) = ?"
+        )
+        params = [
+            FIELD_WEIGHTS["t"], FIELD_WEIGHTS["b"], FIELD_WEIGHTS["c"],
+            *[v for term in terms for v in (term, idf[term])],
+            *terms,
+            len(terms),
+        ]
+        total = conn.execute(f"SELECT COUNT(*) FROM ({matched})", params).fetchone()[0]
+        ranked = conn.execute(
+            matched + " ORDER BY score DESC, post_id LIMIT ? OFFSET ?", (*params, limit, offset)
+        ).fetchall()
+        if not ranked:
+            return [], total
+
+        ids = [r["post_id"] for r in ranked]
+        rows = conn.execute(
+            _POST_SELECT + f" WHERE p.post_id IN ({', '.join('?' for _ in ids)})", ids
+        ).fetchall()
+        by_id = {r["post_id"]: _post_row_to_dict(r) for r in rows}
+        out = []
+        for r in ranked:
+            if r["post_id"] in by_id:
+                out.append({**by_id[r["post_id"]], "score": round(r["score"], 4)})
+        return out, total
+
+    # ----- community.json → SQLite 마이그레이션 -----
+    def migrate_from_json(self, json_path: Path) -> int:
+        """
+        기존 community.json 내용을 한 트랜잭션으로 옮긴다. (이미 있는 postId는 건너뜀)
+        옮긴 게시글 수를 반환.
+        """
+        if not json_path.exists():
+            return 0
+        try:
+            data = json.loads(json_path.read_text(encoding="utf-8"))
+        except Exception:
+            return 0
+
+        migrated = 0
+        with self._tx() as conn:
+            for p in data.get("posts", []):
+                if not p.get("postId"):
+                    continue
+                if conn.execute("SELECT 1 FROM posts WHERE post_id = ?", (p["postId"],)).fetchone():
+                    continue
+                self._insert_post(conn, {
+                    **p,
+                    "uid": p.get("uid", ""),
+                    "title": p.get("title", ""),
+                    "createdAt": p.get("createdAt", ""),
+                })
+                # 예전 API는 createdAt 정렬로 보여줬으므로 그 순서대로 넣어 id 순서를 맞춘다
+                for c in sorted(p.get("comments", []), key=lambda c: c.get("createdAt", "")):
+                    self._insert_comment(conn, p["postId"], {
+                        **c,
+                        "uid": c.get("uid", ""),
+                        "body": c.get("body", ""),
+                        "createdAt": c.get("createdAt", ""),
+                    })
+                conn.execute(
+                    "UPDATE posts SET comment_count = ? WHERE post_id = ?",
+                    (len(p.get("comments", [])), p["postId"]),
+                )
+                self._bump_post_count(conn, 1)
+                migrated += 1
+            self._touch(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                (str(json_path),),
+            )
+        return migrated
+
+
+# ----- 백엔드 선택 -----
+BACKENDS = {
+    "sqlite": SqlitePostStore,
+}
+
+
+def open_store(path: Path | str, *, json_path: Optional[Path] = None) -> PostRepository:
+    """
+    COMMUNITY_STORAGE 환경변수로 백엔드를 고른다. (기본: sqlite)
+    json_path 가 주어지면 아직 옮기지 않은 경우에 한해 1회 마이그레이션한다.
+    """
+    kind = os.environ.get("COMMUNITY_STORAGE", "sqlite")
+    if kind not in BACKENDS:
+        raise RuntimeError(f"unknown COMMUNITY_STORAGE: {kind}")
+
+    store = BACKENDS[kind](path)
+    if json_path is not None and isinstance(store, SqlitePostStore):
+        if store.get_meta("json_migrated") is None:
+            store.migrate_from_json(json_path)
+    return store
+
+
+if __name__ == "__main__":
+    # 수동 마이그레이션: python -m community.backend.storage <community.json> <community.sqlite3>
+    import sys
+
+    src = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent / "community.json"
+    dst = Path(sys.argv[2]) if len(sys.argv) > 2 else src.with_suffix(".sqlite3")
+    n = SqlitePostStore(dst).migrate_from_json(src)
+    print(f"migrated {n} posts: {src} -> {dst}")
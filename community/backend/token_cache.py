@@ -0,0 +1,82 @@
+"""
+검증된 Firebase ID 토큰 캐시.
+
+verify_id_token 은 매번 RSA 서명 검증(+ 가끔 구글 공개키 fetch)을 하기 때문에
+같은 세션에서 반복되는 요청은 한 번 검증한 결과를 토큰의 exp 까지 재사용한다.
+- 키: 토큰의 sha256 (원문 토큰은 메모리에 남기지 않음)
+- 크기 제한 LRU, 항목별 만료 시각 = 토큰의 exp 클레임
+- firebase_admin 에 의존하지 않으므로 검증 함수만 바꿔 끼우면 오프라인에서도 동작
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+import hashlib, threading, time
+
+
+class VerifiedTokenCache:
+    def __init__(
+        self,
+        verify: Callable[[str], Dict[str, Any]],
+        maxsize: int = 10000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._verify = verify
+        self._maxsize = maxsize
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """캐시에 살아있으면 그대로, 아니면 검증 후 저장. 검증 실패는 캐시하지 않고 예외를 그대로 올린다."""
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        now = self._clock()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                exp, decoded = entry
+                if now < exp:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return decoded
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        # 서명 검증은 잠금 밖에서 (다른 요청의 캐시 조회를 막지 않도록)
+        decoded = self._verify(token)
+
+        exp = decoded.get("exp")
+        if exp is None or float(exp) <= self._clock():
+            return decoded
+
+        with self._lock:
+            self._entries[key] = (float(exp), decoded)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return decoded
+
+    def invalidate(self, token: str) -> None:
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self._maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,62 @@
+"""
+간단한 프로세스 내 TTL 캐시.
+
+users/{uid} 프로필처럼 자주 읽고 가끔 바뀌는 값을 ttl 초 동안 재사용한다.
+"없음(None)"도 그대로 캐시해서, 프로필 문서가 없는 유저 때문에 매번 Firestore 를 치지 않게 한다.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Tuple
+import threading, time
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._maxsize = maxsize
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: Iterable[Hashable]) -> Tuple[Dict[Hashable, Any], list]:
+        """(캐시에 있던 값들, 없던 키 목록) 을 돌려준다."""
+        found: Dict[Hashable, Any] = {}
+        missing = []
+        now = self._clock()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key, _MISSING)
+                if entry is not _MISSING and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[1]
+                    self.hits += 1
+                else:
+                    if entry is not _MISSING:
+                        del self._entries[key]
+                    missing.append(key)
+                    self.misses += 1
+        return found, missing
+
+    def set_many(self, values: Dict[Hashable, Any]) -> None:
+        expires = self._clock() + self.ttl
+        with self._lock:
+            for key, value in values.items():
+                self._entries[key] = (expires, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
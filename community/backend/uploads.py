@@ -0,0 +1,139 @@
+"""
+내용 주소(content-addressed) 업로드 저장소.
+
+- 업로드를 스트리밍으로 받으면서 sha256 을 같이 계산하고
+  uploads/cas/<앞 2글자>/<digest><ext> 에 저장한다. 같은 내용이면 기존 파일을 그대로 재사용.
+- 파일이 몇 개의 글에서 쓰이는지는 storage 의 blobs 테이블(ref_count)이 관리한다.
+- 백그라운드 GC 가 참조 0 인 상태로 유예 시간이 지난 파일(+ 썸네일 등 변형)을 지운다.
+주소가 내용에 따라 정해지므로 한 번 나간 URL 의 내용은 절대 바뀌지 않는다.
+"""
+from pathlib import Path
+import glob, hashlib, os, re, threading, time, uuid
+
+from fastapi.staticfiles import StaticFiles
+
+from .aio import run_io
+from .images import VARIANT_SIZES
+from .storage import UPLOAD_URL_PREFIX
+
+UPLOAD_CHUNK = 1024 * 1024
+_EXT_RE = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+def safe_ext(filename: str) -> str:
+    ext = Path(filename).suffix.lower()
+    return ext if _EXT_RE.match(ext) else ""
+
+
+class UploadStore:
+    def __init__(self, store, upload_dir: Path, *, grace_seconds: float = 3600, gc_interval: float = 600):
+        self.store = store
+        self.upload_dir = upload_dir
+        # 임시 파일은 StaticFiles 로 노출되지 않도록 uploads 바깥(같은 디스크)에 둔다
+        self.tmp_dir = upload_dir.parent / ".upload_tmp"
+        self.grace_seconds = grace_seconds
+        self.gc_interval = gc_interval
+        self._gc_thread: threading.Thread | None = None
+
+    # ----- 저장 -----
+    async def save(self, upload) -> str:
+        """UploadFile 을 저장하고 /uploads/... URL 을 반환한다."""
+        await run_io(self.tmp_dir.mkdir, parents=True, exist_ok=True)
+        tmp = self.tmp_dir / uuid.uuid4().hex
+        hasher = hashlib.sha256()
+        f = await run_io(tmp.open, "wb")
+
+        def write(chunk: bytes) -> None:
+            hasher.update(chunk)
+            f.write(chunk)
+
+        try:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK)
+                if not chunk:
+                    break
+                await run_io(write, chunk)
+        except BaseException:
+            await run_io(f.close)
+            await run_io(tmp.unlink, missing_ok=True)
+            raise
+        await run_io(f.close)
+
+        digest = hasher.hexdigest()
+        path = await run_io(self._commit, tmp, digest, safe_ext(upload.filename or ""))
+        return UPLOAD_URL_PREFIX + path
+
+    def _commit(self, tmp: Path, digest: str, ext: str) -> str:
+        # 같은 내용이 이미 있으면 (확장자가 달라도) 그 파일을 그대로 쓴다
+        path = self.store.find_blob(digest) or f"cas/{digest[:2]}/{digest}{ext}"
+        self.store.touch_blob(path, digest)
+        dest = self.upload_dir / path
+        if dest.exists():
+            tmp.unlink(missing_ok=True)
+        else:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, dest)
+        return path
+
+    # ----- GC -----
+    def collect_garbage(self) -> int:
+        """참조가 끊긴 지 grace_seconds 가 지난 파일과 그 변형들을 지운다. 지운 원본 수를 반환."""
+        cutoff = time.time() - self.grace_seconds
+        removed = 0
+        for path in self.store.orphan_blobs(cutoff):
+            # 참조 수 재확인 → 행 삭제 → 파일 삭제를 한 쓰기 트랜잭션 안에서 한다.
+            # 행만 먼저 지우고 나와서 파일을 지우면, 그 사이 같은 내용이 다시 올라와
+            # 기존 파일을 재사용한 업로드의 파일까지 지워 버린다
+            if self.store.drop_blob(path, cutoff, lambda: self._remove_files(self.upload_dir / path)):
+                removed += 1
+
+        # 요청이 도중에 죽어서 남은 임시 파일 정리
+        if self.tmp_dir.exists():
+            for f in self.tmp_dir.iterdir():
+                try:
+                    if f.stat().st_mtime < cutoff:
+                        f.unlink()
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    @staticmethod
+    def _remove_files(target: Path) -> None:
+        # 원본은 이름 그대로 지운다 (확장자 없는 업로드는 "<digest>" 라 "<stem>.*" 로는 안 잡힘)
+        target.unlink(missing_ok=True)
+        # 변형은 "<stem>.<variant>.<ext>" (images.build_variants). 같은 내용이 다른 확장자로도
+        # 올라와 있으면 변형을 같이 쓰므로 남겨 둔다
+        stem = glob.escape(target.stem)
+        variants = [f for v in VARIANT_SIZES for f in target.parent.glob(f"{stem}.{v}.*")]
+        if not any(f not in variants for f in target.parent.glob(f"{stem}.*")):
+            for f in variants:
+                f.unlink(missing_ok=True)
+
+    def start_gc(self) -> None:
+        if self._gc_thread is not None:
+            return
+
+        def loop() -> None:
+            while True:
+                time.sleep(self.gc_interval)
+                try:
+                    self.collect_garbage()
+                except Exception as e:
+                    print("upload gc failed:", e)
+
+        self._gc_thread = threading.Thread(target=loop, name="community-upload-gc", daemon=True)
+        self._gc_thread.start()
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    /uploads 서빙용: 파일 주소가 내용(sha256)으로 정해지고 같은 이름으로 덮어쓰는 일이 없으므로
+    브라우저/프록시가 1년 동안 재검증 없이 캐시해도 된다.
+    """
+
+    CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = self.CACHE_CONTROL
+        return response
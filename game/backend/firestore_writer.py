@@ -0,0 +1,224 @@
+"""
+게임 통계용 Firestore 백그라운드 writer.
+
+예전 /events/end 는 요청 안에서 Firestore 를 세 번(player_stats.set, case_stats.set,
+session_logs.add) 동기로 불러서 p99 가 Firestore 지연에 묶였고, 실패하면 print 만 하고 버렸다.
+이제는
+- 요청은 큐에 넣기만 하고 바로 응답한다
+- 같은 문서(player_stats/uid, case_stats/caseid)에 대한 set(merge) 는 큐 안에서 하나로 합친다
+- 백그라운드 스레드가 최대 BATCH_LIMIT 개씩 batch write 로 보내고, 실패하면 지수 백오프로 재시도
+- 큐 크기에 상한을 두고, 넘치거나 재시도를 다 써서 버린 건수는 지표로 남긴다
+Firestore 클라이언트는 생성자로 받으므로 가짜 클라이언트(batch/collection/document 만 있으면 됨)로 시험할 수 있다.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import random, threading, time, uuid
+
+from shared.metrics import timer
+
+# Firestore batch 한 번에 쓸 수 있는 최대 문서 수는 500
+BATCH_LIMIT = 500
+
+
+def deep_merge(base: dict, update: dict) -> dict:
+    """set(merge=True) 를 두 번 한 것과 같은 결과 (중첩 dict 는 필드 단위로 합침)."""
+    out = dict(base)
+    for k, v in update.items():
+        if isinstance(v, dict) and isinstance(out.get(k), dict):
+            out[k] = deep_merge(out[k], v)
+        else:
+            out[k] = v
+    return out
+
+
+class _Pending:
+    __slots__ = ("collection", "doc_id", "data", "merge", "enqueued", "attempts")
+
+    def __init__(self, collection: str, doc_id: str, data: dict, merge: bool, enqueued: float):
+        self.collection = collection
+        self.doc_id = doc_id          # add 도 큐에 넣을 때 id 를 정해 둔다 (재시도해도 같은 문서)
+        self.data = data
+        self.merge = merge
+        self.enqueued = enqueued      # 처음 큐에 들어온 시각 (합쳐져도 유지 → 지연 계산용)
+        self.attempts = 0
+
+
+class FirestoreWriter:
+    def __init__(
+        self,
+        client,
+        *,
+        max_queue: int = 10000,
+        batch_size: int = 400,
+        flush_interval: float = 0.5,
+        max_retries: int = 5,
+        backoff_base: float = 0.2,
+        backoff_max: float = 10.0,
+        clock=time.monotonic,
+    ):
+        self.client = client
+        self.max_queue = max_queue
+        self.batch_size = min(batch_size, BATCH_LIMIT)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._clock = clock
+
+        # 키: (collection, doc_id) → 들어온 순서 유지 (add 는 새 id 라 합쳐지지 않음)
+        self._queue: "OrderedDict[Tuple, _Pending]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread: threading.Thread | None = None
+        self._inflight = 0
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.dropped = 0      # 큐가 가득 차서 못 넣은 건수
+        self.failed = 0       # 재시도를 다 쓰고 버린 건수
+        self.last_error: Optional[str] = None
+        self.last_lag = 0.0   # 마지막으로 커밋된 batch 에서 가장 오래 기다린 항목의 대기 시간(초)
+
+    # ----- 큐에 넣기 (요청 경로) -----
+    def set(self, collection: str, doc_id: str, data: dict, *, merge: bool = False) -> bool:
+        with self._cond:
+            key = (collection, doc_id)
+            item = self._queue.get(key)
+            if item is not None:
+                # 아직 안 보낸 같은 문서 쓰기가 있으면 하나로 합친다
+                item.data = deep_merge(item.data, data) if merge else dict(data)
+                item.merge = item.merge and merge
+                self.coalesced += 1
+                self.enqueued += 1
+                return True
+            return self._push_locked(key, _Pending(collection, doc_id, dict(data), merge, self._clock()))
+
+    def add(self, collection: str, data: dict) -> bool:
+        with self._cond:
+            # batch 가 실패해 다시 보내도 문서가 두 개 생기지 않도록 자동 id 를 여기서 한 번만 만든다
+            doc_id = uuid.uuid4().hex
+            return self._push_locked((collection, doc_id), _Pending(collection, doc_id, dict(data), False, self._clock()))
+
+    def _push_locked(self, key: Tuple, item: _Pending) -> bool:
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return False
+        self._queue[key] = item
+        self.enqueued += 1
+        if len(self._queue) >= self.batch_size:
+            self._cond.notify()
+        return True
+
+    # ----- 보내기 (백그라운드) -----
+    def _take_batch_locked(self) -> List[Tuple[Tuple, _Pending]]:
+        items = []
+        while self._queue and len(items) < self.batch_size:
+            items.append(self._queue.popitem(last=False))
+        self._inflight = len(items)
+        return items
+
+    def _commit(self, items: List[Tuple[Tuple, _Pending]]) -> None:
+        batch = self.client.batch()
+        for _, item in items:
+            ref = self.client.collection(item.collection).document(item.doc_id)
+            if item.merge:
+                batch.set(ref, item.data, merge=True)
+            else:
+                batch.set(ref, item.data)
+        batch.commit()
+
+    def _backoff(self, attempt: int) -> float:
+        # 지수 백오프 + 지터 (여러 워커가 동시에 재시도하지 않도록)
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _send(self, items: List[Tuple[Tuple, _Pending]]) -> None:
+        attempt = 0
+        while True:
+            try:
+                with timer("firestore.batch_commit"):
+                    self._commit(items)
+            except Exception as e:
+                self.last_error = repr(e)
+                if attempt >= self.max_retries:
+                    self.failed += len(items)
+                    return
+                self.retries += 1
+                with self._cond:
+                    # 종료 중이면 기다리지 않고 바로 다시 시도
+                    if not self._stop:
+                        self._cond.wait(self._backoff(attempt))
+                attempt += 1
+                continue
+            now = self._clock()
+            self.written += len(items)
+            self.batches += 1
+            self.last_lag = max(now - item.enqueued for _, item in items)
+            return
+
+    def drain(self) -> None:
+        """큐에 있는 것을 지금 모두 보낸다 (종료 시 / 테스트용)."""
+        while True:
+            with self._cond:
+                items = self._take_batch_locked()
+            if not items:
+                return
+            try:
+                self._send(items)
+            finally:
+                with self._cond:
+                    self._inflight = 0
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._stop and len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if self._stop:
+                    return
+                items = self._take_batch_locked()
+            if items:
+                try:
+                    self._send(items)
+                finally:
+                    with self._cond:
+                        self._inflight = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="game-firestore-writer", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.drain()
+
+    # ----- 지표 -----
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            depth = len(self._queue)
+            oldest = next(iter(self._queue.values())).enqueued if self._queue else None
+            inflight = self._inflight
+        return {
+            "queueDepth": depth,
+            "inflight": inflight,
+            # 큐에서 가장 오래 기다리고 있는 쓰기의 대기 시간(초)
+            "lagSeconds": (self._clock() - oldest) if oldest is not None else 0.0,
+            "lastCommitLagSeconds": self.last_lag,
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "lastError": self.last_error,
+        }
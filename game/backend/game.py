@@ -0,0 +1,374 @@
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+from pathlib import Path
+from typing import List, Literal, Optional
+from datetime import datetime, timezone, timedelta
+from game.backend.stats import StatsAggregator
+from game.backend.player_store import open_player_store
+from game.backend.sessions import open_session_store
+from game.backend.firestore_writer import FirestoreWriter
+from shared import firebase_client
+from shared.metrics import gauge, instrument
+from shared.ratelimit import AdmissionRule, ConcurrencyLimit, RateLimit, client_ip, open_buckets
+import json, math, re, uuid, time
+import os
+
+# 게임 통계 라우터. 앱(미들웨어, /uploads, /metrics)은 game.backend.main 이나 gateway.main 이 만든다.
+router = APIRouter()
+
+# --- Firebase: 초기화는 shared.firebase_client 가 처음 실제로 쓸 때 한 번만 ---
+FIREBASE_ENABLED = firebase_client.configured()
+fb_db = firebase_client.db if FIREBASE_ENABLED else None
+
+if not FIREBASE_ENABLED:
+    print("FIREBASE_CREDENTIALS env not set, running without Firebase")
+
+# --- Firestore 쓰기는 요청 밖에서: 큐에 모아 같은 문서는 합치고 batch 로 전송 ---
+fs_writer = None
+if FIREBASE_ENABLED and fb_db is not None:
+    fs_writer = FirestoreWriter(
+        fb_db,
+        max_queue=int(os.environ.get("FIRESTORE_WRITE_QUEUE", "10000")),
+        flush_interval=float(os.environ.get("FIRESTORE_FLUSH_INTERVAL", "0.5")),
+    )
+    fs_writer.start()
+    gauge("game_firestore_queue_depth", "Firestore writes waiting to be sent", fn=lambda: fs_writer.metrics()["queueDepth"])
+    gauge("game_firestore_lag_seconds", "Age of the oldest queued Firestore write", fn=lambda: fs_writer.metrics()["lagSeconds"])
+    gauge("game_firestore_failed", "Firestore writes dropped after retries", fn=lambda: fs_writer.metrics()["failed"])
+    gauge("game_firestore_dropped", "Firestore writes rejected because the queue was full", fn=lambda: fs_writer.metrics()["dropped"])
+
+# 이 파일이 있는 backend 폴더 (데이터 폴더 기본값)
+BASE_DIR = Path(__file__).resolve().parent
+
+# --- 통계 저장 경로 (GAME_DATA_DIR 로 바꿀 수 있음, 기본은 backend 폴더) ---
+DATA_DIR = Path(os.environ.get("GAME_DATA_DIR", BASE_DIR))
+PLAYERS_DB = DATA_DIR / "players.sqlite3"     # 플레이어 × 스테이지 / 케이스별 통계와 스케치 (워커끼리 공유)
+# 아직 저장소에 안 내려쓴 이벤트는 워커마다 DATA_DIR/stats.<pid>.wal
+# 예전 형식 (처음 한 번만 옮겨 옴)
+LEGACY_PLAYERS_JSON = DATA_DIR / "players.json"
+LEGACY_CASES_JSON = DATA_DIR / "cases.json"
+LEGACY_SKETCHES_JSON = DATA_DIR / "sketches.json"
+LEGACY_STATS_WAL = DATA_DIR / "stats.wal"
+
+# --- 쓰기 API 입장 제어: uid/IP 별 토큰 버킷(429) + 동시 처리 상한(503), 본문 읽기 전에 적용 ---
+#     한도 형식은 "횟수/초" (예: 30/60 → 60초에 30번), 0 이면 끔
+rate_buckets = open_buckets(DATA_DIR / "ratelimit.sqlite3")
+start_limit = RateLimit("game.start", os.environ.get("GAME_START_RATE", "30/60"), rate_buckets)
+events_ip_limit = RateLimit("game.ip", os.environ.get("GAME_EVENTS_RATE_IP", "300/60"), rate_buckets)
+events_slots = ConcurrencyLimit("game.events", int(os.environ.get("GAME_EVENTS_CONCURRENCY", "64")))
+
+def admission_rules(prefix: str = "") -> list:
+    """AdmissionMiddleware 에 넘길 규칙 (prefix = 라우터를 붙인 경로)."""
+    return [AdmissionRule(("POST",), rf"{re.escape(prefix)}/events/", ip_limit=events_ip_limit, concurrency=events_slots)]
+
+# --- CORS: 게임 클라이언트는 어디서든 부른다 ---
+CORS = dict(
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# --- 통계는 워커 메모리에 증분으로 모으고, WAL + 일정 건수/주기마다 저장소에 더한다 ---
+player_store = open_player_store(PLAYERS_DB, json_path=LEGACY_PLAYERS_JSON, sketches_path=LEGACY_SKETCHES_JSON)
+stats = instrument(StatsAggregator(
+    player_store,
+    DATA_DIR,
+    legacy_cases_path=LEGACY_CASES_JSON,
+    legacy_sketches_path=LEGACY_SKETCHES_JSON,
+    legacy_wal_path=LEGACY_STATS_WAL,
+    flush_every=int(os.environ.get("STATS_FLUSH_EVERY", "100")),
+    flush_interval=float(os.environ.get("STATS_FLUSH_INTERVAL", "5")),
+), "stats")
+stats.start()
+
+@router.on_event("shutdown")
+def flush_stats():
+    stats.close()
+    if fs_writer is not None:
+        fs_writer.close()
+
+# --- 세션(시작~종료 구간) 저장소: 기본은 메모리(TTL 만료), SESSION_STORE=sqlite 면 워커끼리 공유 ---
+sessions = instrument(open_session_store(DATA_DIR / "sessions.sqlite3"), "sessions")
+gauge("game_sessions_active", "Sessions started but not ended yet", fn=lambda: sessions.stats()["active"])
+gauge("game_sessions_evicted", "Sessions dropped by TTL so far", fn=lambda: sessions.stats()["evicted"])
+
+# --- /events/batch: 재전송 중복 방지 키는 세션 저장소에 (세션을 넣고/꺼내는 것과 같은 트랜잭션) ---
+EVENTS_BATCH_MAX = int(os.environ.get("EVENTS_BATCH_MAX", "1000"))
+BATCH_SESSION_NS = uuid.UUID("6f1c1d7e-3b0a-4c55-9a49-0d5b8f0f3a21")
+
+def batch_session_id(start_key: str) -> str:
+    # start 이벤트의 키로 세션 id 를 정하면, 재전송해도 같은 세션이고
+    # 같은 배치의 end 가 start_key 로 세션을 찾을 수 있다
+    return str(uuid.uuid5(BATCH_SESSION_NS, start_key))
+
+# --- 시간 ---
+def now_epoch() -> int:
+    # 서버 기준 epoch(초) – 플레이 시간 계산용
+    return int(time.time())
+
+TZ_KST = timezone(timedelta(hours=9), name="KST")
+
+def now_kst_iso() -> str:
+    # KST 문자열, 수정 필요
+    return datetime.now(TZ_KST).isoformat()
+
+def kst_iso(ts: float) -> str:
+    # 클라이언트가 보낸 epoch(초) → KST 문자열
+    return datetime.fromtimestamp(ts, TZ_KST).isoformat()
+
+
+# --- 요청 바디 스키마 ---
+class StartIn(BaseModel):
+    uid: str
+    caseid: str
+
+class EndIn(BaseModel):
+    session_id: str
+    judge: bool              # 이번 플레이 판정 (True/False)
+    caseid: Optional[str] = None  # 옵션: caseid 보정용
+
+class EventIn(BaseModel):
+    type: Literal["start", "end"]
+    idempotency_key: str              # 같은 키는 한 번만 반영 (재전송 안전)
+    client_ts: Optional[float] = None # 클라이언트 기준 epoch(초), 오프라인 플레이 재전송용
+    uid: Optional[str] = None         # start 필수
+    caseid: Optional[str] = None      # start 필수, end 는 보정용
+    session_id: Optional[str] = None  # end: 끝낼 세션
+    start_key: Optional[str] = None   # end: session_id 대신 start 이벤트의 idempotency_key
+    judge: Optional[bool] = None      # end 필수
+
+class BatchIn(BaseModel):
+    events: List[EventIn]
+
+class PlayersBatchGetIn(BaseModel):
+    uids: List[str]
+
+
+# --- Firebase에도 저장 (배포 서버용) ---
+#     요청 안에서 기다리지 않고 writer 큐에 넣기만 한다
+def enqueue_firestore(uid, caseid, judge, elapsed, start_kst, end_kst, user_cases, case_stats):
+    if fs_writer is None:
+        return
+    # 1) 플레이어별 스테이지 통계 저장
+    #    player_stats 컬렉션 안에 uid 문서 하나에 전부 모아서 저장
+    fs_writer.set(
+        "player_stats",
+        uid,
+        {
+            "uid": uid,
+            "cases": user_cases,  # 이 유저가 플레이한 모든 case 통계
+        },
+        merge=True,  # 기존 데이터와 병합
+    )
+
+    # 2) 케이스별 전체 통계 저장
+    #    case_stats 컬렉션 안에 caseid 문서로 저장
+    fs_writer.set("case_stats", caseid, case_stats, merge=True)
+
+    # 3) 세션 로그도 하나씩 남기고 싶으면 (선택)
+    fs_writer.add(
+        "session_logs",
+        {
+            "uid": uid,
+            "caseid": caseid,
+            "judge": judge,
+            "elapsed": elapsed,
+            "startTime": start_kst,
+            "endTime": end_kst,
+        },
+    )
+
+
+def end_response(sid, uid, caseid, elapsed, user_cases, case_stats):
+    return {
+        "session_id": sid,
+        "uid": uid,
+        "caseid": caseid,
+        "timeSpentSeconds": elapsed,
+        "playerStage": user_cases[caseid],
+        "caseStats": case_stats,
+    }
+
+
+# --- 세션 시작: 세션 저장소에 저장 ---
+@router.post("/events/start")
+def start_session(body: StartIn):
+    start_limit.check(body.uid)
+    sid = str(uuid.uuid4())
+    start_kst = now_kst_iso()
+
+    sessions.put(sid, body.uid, body.caseid, now_epoch(), start_kst)
+
+    return {"session_id": sid, "startTime": start_kst}
+
+
+# --- 세션 저장소 상태 (활성 세션 수 / TTL 로 정리된 수) ---
+@router.get("/sessions/stats")
+def session_stats():
+    return sessions.stats()
+
+
+# --- Firestore writer 상태 (큐 길이 / 지연 / 재시도·실패 수) ---
+@router.get("/firestore/stats")
+def firestore_stats():
+    if fs_writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **fs_writer.metrics()}
+
+
+# --- 케이스별 플레이 시간 분위수/히스토그램 (로그를 훑지 않고 스케치에서 바로) ---
+@router.get("/stats/cases/{caseid}")
+def case_time_stats(caseid: str):
+    sketch = stats.case_sketch(caseid)
+    if sketch is None:
+        raise HTTPException(status_code=404, detail="case not found")
+    return {"caseid": caseid, **sketch.summary()}
+
+
+# --- 플레이어 진행 상황 (한 명 / 여러 명) ---
+PLAYERS_BATCH_GET_MAX = int(os.environ.get("PLAYERS_BATCH_GET_MAX", "100"))
+
+def player_response(uid, user_cases, sketch):
+    return {
+        "uid": uid,
+        "cases": user_cases,
+        "playTime": sketch.summary() if sketch is not None else None,
+    }
+
+@router.get("/stats/players/{uid}")
+def player_stats(uid: str):
+    user_cases, sketch = stats.get_player(uid)
+    if not user_cases:
+        raise HTTPException(status_code=404, detail="player not found")
+    return player_response(uid, user_cases, sketch)
+
+@router.post("/stats/players:batchGet")
+def player_stats_batch(body: PlayersBatchGetIn):
+    if len(body.uids) > PLAYERS_BATCH_GET_MAX:
+        raise HTTPException(status_code=413, detail=f"too many uids (max {PLAYERS_BATCH_GET_MAX})")
+    found = stats.get_players(body.uids)
+    return {
+        "players": {uid: player_response(uid, *found[uid]) for uid in found},
+        "missing": [uid for uid in dict.fromkeys(body.uids) if uid not in found],
+    }
+
+
+# --- 세션 종료: 플레이 시간 계산 + 플레이어/케이스 통계 반영 ---
+@router.post("/events/end")
+def end_session(body: EndIn):
+    # 꺼내면서 지우므로 같은 세션을 두 번 끝내도 한 번만 집계된다
+    session = sessions.pop(body.session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="session not found")
+
+    end_ts = now_epoch()
+    end_kst = now_kst_iso()
+    elapsed = max(0, end_ts - session.start)  # 이번 판 플레이 시간(초)
+
+    uid = session.uid
+    caseid = body.caseid or session.caseid
+
+    # 통계 갱신은 집계기가 메모리에서 O(1)로 처리
+    # (워커 WAL 에 먼저 기록 → 일정 건수/주기마다 player_store 에 증분으로 더함)
+    user_cases, case_stats = stats.record(
+        uid, caseid, body.judge, elapsed, session.start_kst, end_kst
+    )
+
+    enqueue_firestore(uid, caseid, body.judge, elapsed, session.start_kst, end_kst, user_cases, case_stats)
+
+    # 응답은 디버깅/확인용
+    return end_response(body.session_id, uid, caseid, elapsed, user_cases, case_stats)
+
+
+def duplicate_result(i, key, prev):
+    # prev 가 {} 면 키는 기록됐지만 결과를 남기기 전에 멈춘 경우 (그래도 다시 반영하지 않는다)
+    return {"idempotency_key": key, **(prev or {}), "index": i, "status": "duplicate"}
+
+
+# --- 여러 start/end 이벤트를 한 번에: 집계 반영 + WAL 저장은 배치 전체에 한 번 ---
+@router.post("/events/batch")
+def ingest_events(body: BatchIn, request: Request):
+    if len(body.events) > EVENTS_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"too many events (max {EVENTS_BATCH_MAX})")
+    # IP 한도는 이벤트 단위로: 미들웨어가 요청 하나분을 이미 썼으니 나머지만큼 더 쓴다
+    burst = events_ip_limit.burst
+    if burst is not None and len(body.events) > burst:
+        raise HTTPException(status_code=413, detail=f"too many events for the rate limit (max {burst})")
+    wait = events_ip_limit.wait(client_ip(request), cost=len(body.events) - 1)
+    if wait > 0:
+        raise HTTPException(status_code=429, detail="too many requests", headers={"Retry-After": str(max(1, math.ceil(wait)))})
+
+    results: List[Optional[dict]] = [None] * len(body.events)
+    first_index = {}   # 같은 배치 안에서 키가 반복되면 첫 이벤트 결과를 따른다
+    plays = []         # stats.record_many 에 넘길 판 결과
+    ended = []         # (index, key, sid, uid, caseid, judge, elapsed, start_kst, end_kst)
+
+    for i, ev in enumerate(body.events):
+        key = ev.idempotency_key
+        if key in first_index:
+            continue
+        first_index[key] = i
+        prev = sessions.recall(key)
+        if prev is not None:
+            results[i] = duplicate_result(i, key, prev)
+            continue
+
+        if ev.type == "start":
+            if not ev.uid or not ev.caseid:
+                results[i] = {"index": i, "idempotency_key": key, "status": "error", "detail": "uid and caseid required"}
+                continue
+            # /events/start 와 같은 uid 별 한도 (넘으면 이 이벤트만 429, 키는 기록하지 않으므로 나중에 재전송 가능)
+            wait = start_limit.wait(ev.uid)
+            if wait > 0:
+                results[i] = {"index": i, "idempotency_key": key, "status": "error", "code": 429,
+                              "detail": "too many requests", "retryAfter": max(1, math.ceil(wait))}
+                continue
+            sid = batch_session_id(key)
+            start_ts = ev.client_ts if ev.client_ts is not None else time.time()
+            start_kst = kst_iso(start_ts)
+            if sessions.put(sid, ev.uid, ev.caseid, int(start_ts), start_kst, key=key) is None:
+                # 다른 요청이 방금 같은 키를 기록함
+                results[i] = duplicate_result(i, key, sessions.recall(key))
+                continue
+            results[i] = {"index": i, "idempotency_key": key, "status": "ok", "type": "start", "session_id": sid, "startTime": start_kst}
+            sessions.remember(key, results[i])
+            continue
+
+        sid = ev.session_id or (batch_session_id(ev.start_key) if ev.start_key else None)
+        if sid is None or ev.judge is None:
+            results[i] = {"index": i, "idempotency_key": key, "status": "error", "detail": "session_id (or start_key) and judge required"}
+            continue
+        session = sessions.pop(sid, key=key)
+        if session is None:
+            prev = sessions.recall(key)
+            if prev is not None:
+                results[i] = duplicate_result(i, key, prev)
+            else:
+                results[i] = {"index": i, "idempotency_key": key, "status": "error", "detail": "session not found"}
+            continue
+        end_ts = ev.client_ts if ev.client_ts is not None else time.time()
+        end_kst = kst_iso(end_ts)
+        elapsed = max(0, int(end_ts) - session.start)
+        caseid = ev.caseid or session.caseid
+        plays.append((session.uid, caseid, ev.judge, elapsed, session.start_kst, end_kst))
+        ended.append((i, key, sid, session.uid, caseid, ev.judge, elapsed, session.start_kst, end_kst))
+
+    # 배치 전체를 한 번에 반영 (WAL 한 번 쓰고 fsync 한 번)
+    for (i, key, sid, uid, caseid, judge, elapsed, start_kst, end_kst), (user_cases, case_stats) in zip(
+        ended, stats.record_many(plays)
+    ):
+        enqueue_firestore(uid, caseid, judge, elapsed, start_kst, end_kst, user_cases, case_stats)
+        results[i] = {
+            "index": i,
+            "idempotency_key": key,
+            "status": "ok",
+            "type": "end",
+            **end_response(sid, uid, caseid, elapsed, user_cases, case_stats),
+        }
+        sessions.remember(key, results[i])
+
+    for i, ev in enumerate(body.events):
+        if results[i] is None:
+            results[i] = {**results[first_index[ev.idempotency_key]], "index": i, "status": "duplicate"}
+
+    return {"results": results}
@@ -0,0 +1,45 @@
+"""
+/events/batch 용 멱등 키 기록.
+
+오프라인에서 모아 둔 이벤트를 다시 보내거나 응답을 못 받고 재시도해도
+같은 idempotency_key 는 한 번만 반영하고, 두 번째부터는 처음 결과를 그대로 돌려준다.
+최근 키만 (개수 + 유효 시간) 제한해서 메모리에 들고 있는다.
+MemorySessionStore 가 세션과 같은 락 안에서 쓴다 (sqlite 세션 저장소는 같은 파일의 테이블에 둔다).
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import threading, time
+
+
+class IdempotencyLog:
+    def __init__(self, maxsize: int = 100_000, ttl: float = 24 * 3600, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()  # key -> (만료 시각, 결과)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def put(self, key: str, result: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, result)
+            self._entries.move_to_end(key)
+            # 넣은 순서 = 만료 순서이므로 앞에서부터 정리
+            now = self._clock()
+            while self._entries and (
+                len(self._entries) > self.maxsize or next(iter(self._entries.values()))[0] <= now
+            ):
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"keys": len(self._entries)}
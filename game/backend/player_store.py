@@ -0,0 +1,379 @@
+"""
+게임 통계 저장소 (SQLite, uid / caseid 키 테이블).
+
+예전엔 players.json 하나에 모든 플레이어가 들어 있어서
+한 명을 읽거나 고치려 해도 전체를 파싱해야 했고, 시작할 때 전부 메모리에 올렸다.
+이제는
+- player_cases(uid, caseid) 행 하나가 플레이어 × 스테이지 통계 하나 (형태는 players.json 과 같고 totalTimeSeconds 추가)
+- player_sketches(uid) 에 플레이어별 플레이 시간 스케치
+- case_stats / case_sketches 에 케이스별 통계와 스케치 (예전 cases.json / sketches.json 의 "cases")
+- 집계기는 apply() 로 "증분"을 보내고, 저장된 행과의 합치기는 한 트랜잭션 안에서 한다
+  → 워커 여러 개가 같은 파일을 써도 서로의 값을 덮어쓰지 않는다
+- 집계기가 마지막으로 반영한 WAL 번호도 같은 트랜잭션으로 meta 에 저장 → 재시작 시 중복 반영 없음
+한 명 조회/갱신은 기본키 조회라 플레이어 수와 상관없이 O(1) 이다.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+import json, sqlite3, threading
+
+from game.backend.sketch import DDSketch
+
+try:
+    import orjson
+except ImportError:  # orjson 미설치 → 표준 json
+    orjson = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS player_cases (
+    uid    TEXT NOT NULL,
+    caseid TEXT NOT NULL,
+    data   TEXT NOT NULL,
+    PRIMARY KEY (uid, caseid)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS player_sketches (
+    uid  TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS case_stats (
+    caseid TEXT PRIMARY KEY,
+    data   TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS case_sketches (
+    caseid TEXT PRIMARY KEY,
+    data   TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# IN (...) 한 번에 넣을 uid 개수 (SQLite 변수 개수 제한 안쪽)
+_IN_CHUNK = 500
+
+
+def _dumps(data) -> str:
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+# ----- 통계 합치기 -----
+# 한 판도, 한 워커가 모아 둔 증분도, 저장된 누적값도 모두 같은 형태라서
+# merge_*(앞, 뒤) 로 순서대로 합치면 된다 (결합 법칙이 성립해서 어떻게 묶어 합쳐도 결과가 같다).
+
+def _total_time(row: dict) -> float:
+    # totalTimeSeconds 가 없던 예전 행은 평균 × 횟수로 (플레이 시간은 정수 초)
+    if "totalTimeSeconds" in row:
+        return row["totalTimeSeconds"]
+    return round(row.get("avgTimeSeconds", 0) * row.get("playCount", 0))
+
+
+def play_row(uid: str, caseid: str, judge: bool, elapsed, start_time: str, end_time: str) -> dict:
+    """한 판 = playCount 1 인 플레이어 × 케이스 행."""
+    return {
+        "uid": uid,
+        "caseid": caseid,
+        "startTime": start_time,
+        "endTime": end_time,
+        "judge": judge,
+        "avgTimeSeconds": float(elapsed),
+        "totalTimeSeconds": elapsed,
+        "playCount": 1,
+        "clearCount": 1 if judge else 0,
+    }
+
+
+def merge_player_case(prev: Optional[dict], new: dict) -> dict:
+    """플레이어 × 케이스 통계 두 개를 합친다. "마지막 판" 필드는 endTime 이 늦은 쪽(같으면 new)."""
+    if not prev:
+        return dict(new)
+    count = prev.get("playCount", 0) + new["playCount"]
+    total = _total_time(prev) + _total_time(new)
+    last = new if new.get("endTime", "") >= prev.get("endTime", "") else prev
+    return {
+        "uid": new["uid"],
+        "caseid": new["caseid"],
+        "startTime": last.get("startTime", ""),   # 마지막 판 시작 시간
+        "endTime": last.get("endTime", ""),       # 마지막 판 끝난 시간
+        "judge": last.get("judge"),               # 마지막 판 결과
+        "avgTimeSeconds": total / count,          # 이 유저가 이 스테이지를 플레이한 평균 시간
+        "totalTimeSeconds": total,
+        "playCount": count,                       # 누적 플레이 횟수
+        "clearCount": prev.get("clearCount", 0) + new["clearCount"],
+    }
+
+
+def case_row(caseid: str, judge: bool, elapsed) -> dict:
+    """한 판 = playCount 1 인 케이스 행."""
+    return {
+        "caseid": caseid,
+        "playCount": 1,
+        "totalTimeSeconds": elapsed,
+        "avgTimeSeconds": float(elapsed),
+        "trueCount": 1 if judge else 0,
+        "falseCount": 0 if judge else 1,
+    }
+
+
+def merge_case(prev: Optional[dict], new: dict) -> dict:
+    if not prev:
+        return dict(new)
+    count = prev.get("playCount", 0) + new["playCount"]
+    total = prev.get("totalTimeSeconds", 0) + new["totalTimeSeconds"]
+    return {
+        "caseid": new["caseid"],
+        "playCount": count,                          # 전체 플레이 횟수
+        "totalTimeSeconds": total,                   # 모든 유저의 플레이 시간 합
+        "avgTimeSeconds": total / count,             # 전체 평균 플레이 시간
+        "trueCount": prev.get("trueCount", 0) + new["trueCount"],
+        "falseCount": prev.get("falseCount", 0) + new["falseCount"],
+    }
+
+
+class PlayerStore:
+    def __init__(self, path: Path | str):
+        self.path = str(path)
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    # ----- meta -----
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def get_seq(self, key: str) -> int:
+        return int(self.get_meta(key) or 0)
+
+    # ----- 읽기 -----
+    def get_player(self, uid: str) -> Dict[str, dict]:
+        """{caseid: 통계}. 없는 플레이어면 빈 dict."""
+        rows = self._conn().execute(
+            "SELECT caseid, data FROM player_cases WHERE uid = ?", (uid,)
+        ).fetchall()
+        return {r["caseid"]: json.loads(r["data"]) for r in rows}
+
+    def get_players(self, uids: Iterable[str]) -> Dict[str, Dict[str, dict]]:
+        """여러 명을 한 번에. 기록이 있는 uid 만 들어 있다."""
+        uids = list(dict.fromkeys(uids))
+        out: Dict[str, Dict[str, dict]] = {}
+        conn = self._conn()
+        for i in range(0, len(uids), _IN_CHUNK):
+            chunk = uids[i:i + _IN_CHUNK]
+            rows = conn.execute(
+                f"SELECT uid, caseid, data FROM player_cases WHERE uid IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for r in rows:
+                out.setdefault(r["uid"], {})[r["caseid"]] = json.loads(r["data"])
+        return out
+
+    def get_sketches(self, uids: Iterable[str]) -> Dict[str, DDSketch]:
+        uids = list(dict.fromkeys(uids))
+        out: Dict[str, DDSketch] = {}
+        conn = self._conn()
+        for i in range(0, len(uids), _IN_CHUNK):
+            chunk = uids[i:i + _IN_CHUNK]
+            rows = conn.execute(
+                f"SELECT uid, data FROM player_sketches WHERE uid IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for r in rows:
+                out[r["uid"]] = DDSketch.from_dict(json.loads(r["data"]))
+        return out
+
+    def get_case(self, caseid: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT data FROM case_stats WHERE caseid = ?", (caseid,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def get_case_sketch(self, caseid: str) -> Optional[DDSketch]:
+        row = self._conn().execute("SELECT data FROM case_sketches WHERE caseid = ?", (caseid,)).fetchone()
+        return DDSketch.from_dict(json.loads(row["data"])) if row else None
+
+    # ----- 쓰기 -----
+    def _apply_locked(self, conn: sqlite3.Connection, delta) -> None:
+        # 트랜잭션 안에서: 지금 저장된 값 + 증분 → 저장
+        def load(table: str, where: str, key: tuple) -> Optional[dict]:
+            row = conn.execute(f"SELECT data FROM {table} WHERE {where}", key).fetchone()
+            return json.loads(row["data"]) if row else None
+
+        rows = []
+        for (uid, caseid), d in delta.players.items():
+            rows.append((uid, caseid, _dumps(merge_player_case(load("player_cases", "uid = ? AND caseid = ?", (uid, caseid)), d))))
+        conn.executemany("INSERT OR REPLACE INTO player_cases (uid, caseid, data) VALUES (?, ?, ?)", rows)
+
+        rows = []
+        for uid, sk in delta.player_sketches.items():
+            prev = load("player_sketches", "uid = ?", (uid,))
+            merged = DDSketch.from_dict(prev) if prev else DDSketch(sk.alpha)
+            merged.merge(sk)
+            rows.append((uid, _dumps(merged.to_dict())))
+        conn.executemany("INSERT OR REPLACE INTO player_sketches (uid, data) VALUES (?, ?)", rows)
+
+        rows = []
+        for caseid, d in delta.cases.items():
+            rows.append((caseid, _dumps(merge_case(load("case_stats", "caseid = ?", (caseid,)), d))))
+        conn.executemany("INSERT OR REPLACE INTO case_stats (caseid, data) VALUES (?, ?)", rows)
+
+        rows = []
+        for caseid, sk in delta.case_sketches.items():
+            prev = load("case_sketches", "caseid = ?", (caseid,))
+            merged = DDSketch.from_dict(prev) if prev else DDSketch(sk.alpha)
+            merged.merge(sk)
+            rows.append((caseid, _dumps(merged.to_dict())))
+        conn.executemany("INSERT OR REPLACE INTO case_sketches (caseid, data) VALUES (?, ?)", rows)
+
+    def apply(self, delta, seqs: Dict[str, int]) -> None:
+        """
+        집계기 증분(stats.StatsDelta: players / player_sketches / cases / case_sketches)을
+        저장된 값에 더하고, 그 WAL 번호와 함께 한 트랜잭션으로 저장한다.
+        """
+        with self._tx() as conn:
+            self._apply_locked(conn, delta)
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(k, str(v)) for k, v in seqs.items()],
+            )
+
+    def delete_meta(self, key: str) -> None:
+        with self._tx() as conn:
+            conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+
+    def replace_all(
+        self,
+        players: Iterable[Tuple[str, str, dict]],
+        player_sketches: Iterable[Tuple[str, dict]],
+        cases: Dict[str, dict],
+        case_sketches: Dict[str, dict],
+        meta: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        통계 테이블 전체를 한 트랜잭션으로 갈아끼운다 (session_logs 에서 다시 계산한 결과 저장용).
+        스케치는 DDSketch.to_dict() 형태 그대로 받는다. 도중에 실패하면 예전 값이 그대로 남는다.
+        meta 는 같은 트랜잭션에 같이 적는다 (남은 WAL 의 마지막 번호 등).
+        """
+        with self._tx() as conn:
+            for table in ("player_cases", "player_sketches", "case_stats", "case_sketches"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.executemany(
+                "INSERT INTO player_cases (uid, caseid, data) VALUES (?, ?, ?)",
+                ((uid, caseid, _dumps(data)) for uid, caseid, data in players),
+            )
+            conn.executemany(
+                "INSERT INTO player_sketches (uid, data) VALUES (?, ?)",
+                ((uid, _dumps(data)) for uid, data in player_sketches),
+            )
+            conn.executemany(
+                "INSERT INTO case_stats (caseid, data) VALUES (?, ?)",
+                [(caseid, _dumps(data)) for caseid, data in cases.items()],
+            )
+            conn.executemany(
+                "INSERT INTO case_sketches (caseid, data) VALUES (?, ?)",
+                [(caseid, _dumps(data)) for caseid, data in case_sketches.items()],
+            )
+            # 남아 있던 WAL 은 이 결과에 이미 들어 있다 → 넘겨받은 번호까지는 다시 재생하지 않게
+            conn.execute("DELETE FROM meta WHERE key LIKE 'wal:%'")
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", list((meta or {}).items())
+            )
+
+    def migrate_cases(self, cases: Dict[str, dict], case_sketches: Dict[str, dict], delta) -> None:
+        """
+        예전 cases.json / sketches.json 의 케이스 통계와, 남아 있던 stats.wal 중 아직 반영 안 된 부분(delta)을
+        한 트랜잭션으로 옮긴다. 끝나면 meta 의 cases_json_migrated 가 생긴다.
+        """
+        with self._tx() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'cases_json_migrated'").fetchone():
+                return  # 다른 워커가 먼저 옮겼다
+            conn.executemany(
+                "INSERT OR IGNORE INTO case_stats (caseid, data) VALUES (?, ?)",
+                [(caseid, _dumps(data)) for caseid, data in cases.items()],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO case_sketches (caseid, data) VALUES (?, ?)",
+                [(caseid, _dumps(data)) for caseid, data in case_sketches.items()],
+            )
+            self._apply_locked(conn, delta)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('cases_json_migrated', '1')")
+
+    def migrate_from_json(self, players_path: Path, sketches_path: Optional[Path] = None) -> int:
+        """
+        players.json (+ sketches.json 의 플레이어 스케치) 를 한 트랜잭션으로 옮긴다.
+        각 파일의 walSeq 도 같이 옮겨서 남아 있던 WAL 재생이 정확히 이어지게 한다.
+        옮긴 플레이어 수를 반환.
+        """
+        def load(path: Optional[Path]) -> dict:
+            if path is None or not path.exists():
+                return {}
+            try:
+                return json.loads(path.read_text(encoding="utf-8"))
+            except Exception:
+                return {}
+
+        players_doc = load(players_path)
+        sketches_doc = load(sketches_path)
+        players = players_doc.get("players", {})
+        sketches = sketches_doc.get("players", {})
+
+        with self._tx() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO player_cases (uid, caseid, data) VALUES (?, ?, ?)",
+                [(uid, caseid, _dumps(data)) for uid, user_cases in players.items() for caseid, data in user_cases.items()],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO player_sketches (uid, data) VALUES (?, ?)",
+                [(uid, _dumps(data)) for uid, data in sketches.items()],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("players_seq", str(int(players_doc.get("walSeq", 0)))),
+                    ("player_sketches_seq", str(int(sketches_doc.get("walSeq", 0)))),
+                    ("json_migrated", str(players_path)),
+                ],
+            )
+        return len(players)
+
+
+def open_player_store(
+    path: Path | str, *, json_path: Optional[Path] = None, sketches_path: Optional[Path] = None
+) -> PlayerStore:
+    """처음 열 때 한 번만 예전 players.json 을 옮겨 온다."""
+    store = PlayerStore(path)
+    if json_path is not None and store.get_meta("json_migrated") is None:
+        store.migrate_from_json(json_path, sketches_path)
+    return store
+
+
+if __name__ == "__main__":
+    # 수동 마이그레이션: python -m game.backend.player_store <players.json> <players.sqlite3>
+    import sys
+
+    src = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent / "players.json"
+    dst = Path(sys.argv[2]) if len(sys.argv) > 2 else src.with_suffix(".sqlite3")
+    n = PlayerStore(dst).migrate_from_json(src)
+    print(f"migrated {n} players: {src} -> {dst}")
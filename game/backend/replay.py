@@ -0,0 +1,347 @@
+"""
+session_logs 에서 게임 통계를 처음부터 다시 계산하는 도구.
+
+게임 통계(player_store: 플레이어 × 케이스, 케이스별 통계와 스케치)는 이벤트마다 갱신되는 누적값이라
+파일이 깨지거나 새 지표를 추가하면 고칠 방법이 없었다. 원본은 /events/end 가 남기는 session_logs 뿐이다.
+- NDJSON 내보내기 파일이나 Firestore(FIREBASE_MODE=fake 면 대역) 에서 로그를 한 줄씩 읽어
+  uid / caseid 는 정수 코드로, 나머지는 열(column) 배열로 모은 뒤
+- NumPy 의 정렬 / bincount / unique 로 플레이어×케이스, 케이스별 집계와 플레이 시간 스케치를 한 번에 계산하고
+- 통계 테이블 전체를 한 트랜잭션으로 갈아끼운다.
+결과는 StatsAggregator 가 한 판씩 쌓은 것과 같다 ("마지막 판" 필드는 endTime 이 가장 늦은 판 기준).
+평균은 양쪽 모두 정수 초의 합 / 횟수로 계산하므로 부동소수점 값까지 같다 (python -m benchmarks.replay_check).
+
+    python -m game.backend.replay --ndjson session_logs.ndjson
+    python -m game.backend.replay --firestore --data-dir /srv/game
+    python -m game.backend.replay --ndjson logs.ndjson --dry-run
+
+서버가 꺼져 있을 때 돌린다 (남아 있는 stats*.wal 이 있으면 --force 없이는 거부).
+"""
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import argparse, gc, json, math, os, time
+
+import numpy as np
+
+from game.backend.player_store import PlayerStore, open_player_store
+from game.backend.sketch import DEFAULT_ALPHA, MAX_BINS, DDSketch
+from game.backend.stats import read_wal
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson 미설치 → 표준 json
+    _loads = json.loads
+
+
+class SessionColumns:
+    """session_logs 를 열 단위로 모은 것. uid / caseid 는 uids[code], caseids[code] 로 되돌린다."""
+
+    def __init__(self):
+        self.uids: List[str] = []
+        self.caseids: List[str] = []
+        self._uid_codes: Dict[str, int] = {}
+        self._case_codes: Dict[str, int] = {}
+        # 파이썬 리스트보다 훨씬 작게 쌓이도록 array 에 모은 뒤 numpy 로 그대로 넘긴다
+        self._uid = array("q")
+        self._case = array("q")
+        self._judge = array("b")
+        self._elapsed = array("d")
+        self.start_times: List[str] = []
+        self.end_times: List[str] = []
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self._uid)
+
+    def append(self, rec: Dict[str, Any]) -> None:
+        uid, caseid = rec.get("uid"), rec.get("caseid")
+        if not uid or caseid is None or rec.get("elapsed") is None:
+            self.skipped += 1
+            return
+        caseid = str(caseid)
+        u = self._uid_codes.get(uid)
+        if u is None:
+            u = self._uid_codes[uid] = len(self.uids)
+            self.uids.append(uid)
+        c = self._case_codes.get(caseid)
+        if c is None:
+            c = self._case_codes[caseid] = len(self.caseids)
+            self.caseids.append(caseid)
+        self._uid.append(u)
+        self._case.append(c)
+        self._judge.append(1 if rec.get("judge") else 0)
+        self._elapsed.append(float(rec["elapsed"]))
+        self.start_times.append(rec.get("startTime", ""))
+        self.end_times.append(rec.get("endTime", ""))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "SessionColumns":
+        cols = cls()
+        for rec in records:
+            cols.append(rec)
+        return cols
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(uid 코드, case 코드, judge(bool), elapsed(float64))"""
+        return (
+            np.frombuffer(self._uid, dtype=np.int64),
+            np.frombuffer(self._case, dtype=np.int64),
+            np.frombuffer(self._judge, dtype=np.int8).astype(bool),
+            np.frombuffer(self._elapsed, dtype=np.float64),
+        )
+
+
+# ----- 읽기 -----
+def iter_ndjson(path: Path) -> Iterator[Dict[str, Any]]:
+    """한 줄에 로그 하나. {"id":..., "data": {...}} 처럼 감싼 형태도 받는다."""
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = _loads(line)
+            if "uid" not in rec and isinstance(rec.get("data"), dict):
+                rec = rec["data"]
+            yield rec
+
+
+def iter_firestore(client, collection: str = "session_logs") -> Iterator[Dict[str, Any]]:
+    for snap in client.collection(collection).stream():
+        data = snap.to_dict()
+        if data:
+            yield data
+
+
+# ----- 집계 -----
+def _group_bounds(sorted_codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """정렬된 코드 배열에서 같은 코드 구간의 [시작, 끝) 위치."""
+    if len(sorted_codes) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    ends = np.r_[starts[1:], len(sorted_codes)]
+    return starts, ends
+
+
+def _num(v: float):
+    # StatsAggregator 는 정수 초를 더하므로 정수면 정수로 (저장 형태 유지)
+    return int(v) if float(v).is_integer() else float(v)
+
+
+def sketches_by_group(groups: np.ndarray, elapsed: np.ndarray, alpha: float = DEFAULT_ALPHA) -> Dict[int, dict]:
+    """
+    그룹 코드별 DDSketch.to_dict() 를 한 번에 만든다.
+    구간 번호 계산과 (그룹, 구간) 개수 세기는 벡터 연산, 파이썬 루프는 그룹 수만큼만 돈다.
+    """
+    out: Dict[int, dict] = {}
+    if len(groups) == 0:
+        return out
+    log_gamma = math.log((1 + alpha) / (1 - alpha))
+
+    order = np.lexsort((elapsed, groups))
+    g_sorted = groups[order]
+    x_sorted = elapsed[order]
+    starts, ends = _group_bounds(g_sorted)
+    counts = ends - starts
+    sums = np.add.reduceat(x_sorted, starts)
+    zeros = np.add.reduceat((x_sorted <= 0).astype(np.int64), starts)
+    mins = x_sorted[starts]
+    maxs = x_sorted[ends - 1]
+
+    positive = x_sorted > 0
+    keys = np.ceil(np.log(x_sorted[positive]) / log_gamma).astype(np.int64)
+    pg = g_sorted[positive]
+    # (그룹, 구간) 쌍별 개수: 이미 그룹 → 값 순으로 정렬돼 있어서 구간 번호도 그룹 안에서 오름차순
+    pair_starts, pair_ends = _group_bounds(pg * (1 << 20) + (keys - keys.min() if len(keys) else keys))
+    # 그룹마다 [첫 구간, 마지막 구간] 을 이어 붙인 한 배열에 개수를 흩뿌린 뒤, 리스트로 한 번에 바꿔서 잘라 쓴다
+    g_unique = g_sorted[starts]
+    pair_gi = np.searchsorted(g_unique, pg[pair_starts])
+    pair_keys = keys[pair_starts]
+    span_starts, span_ends = _group_bounds(pair_gi)
+    span_lo = pair_keys[span_starts]
+    span_len = pair_keys[span_ends - 1] - span_lo + 1
+    span_off = np.r_[0, np.cumsum(span_len)[:-1]].astype(np.int64)
+    span_of_pair = np.repeat(np.arange(len(span_starts)), span_ends - span_starts)
+    flat = np.zeros(int(span_len.sum()), dtype=np.int64)
+    flat[span_off[span_of_pair] + pair_keys - span_lo[span_of_pair]] = pair_ends - pair_starts
+    flat = flat.tolist()
+    spans = dict(zip(pair_gi[span_starts].tolist(), zip(
+        span_lo.tolist(), span_off.tolist(), span_len.tolist(), (span_ends - span_starts).tolist()
+    )))
+
+    # 아래 루프는 numpy 스칼라를 하나씩 꺼내면 느리므로 파이썬 리스트로 한 번에 바꿔 둔다
+    for gi, (g, n, total, z, lo_v, hi_v) in enumerate(zip(
+        g_unique.tolist(), counts.tolist(), sums.tolist(), zeros.tolist(), mins.tolist(), maxs.tolist()
+    )):
+        d = {"a": alpha, "n": n, "s": total, "z": z, "lo": _num(lo_v), "hi": _num(hi_v)}
+        span = spans.get(gi)
+        if span is not None:
+            lo, off, length, nonempty = span
+            d["o"] = lo
+            d["b"] = flat[off:off + length]
+            if nonempty > MAX_BINS:
+                # 스케치가 한 판씩 쌓을 때와 같은 방식으로 구간 수를 줄인다
+                sk = DDSketch.from_dict(d)
+                sk._collapse()
+                d = sk.to_dict()
+        out[g] = d
+    return out
+
+
+class Rebuilt:
+    """
+    다시 계산한 결과. 플레이어 × 케이스 행은 수백만 개가 될 수 있어서 열 배열로 들고 있다가
+    player_rows() 로 저장할 때 한 행씩 만든다.
+    """
+
+    def __init__(self, cols: SessionColumns, cases: Dict[str, dict], player_columns: Tuple[np.ndarray, ...],
+                 case_sketches: Dict[str, dict], player_sketches: List[Tuple[str, dict]]):
+        self._cols = cols
+        self.cases = cases                    # case_stats
+        self._player_columns = player_columns
+        self.case_sketches = case_sketches    # case_sketches
+        self.player_sketches = player_sketches
+
+    def __len__(self) -> int:
+        return len(self._player_columns[0])
+
+    def player_rows(self) -> Iterator[Tuple[str, str, dict]]:
+        """(uid, caseid, 통계) - player_store 한 행과 같은 형태."""
+        cols = self._cols
+        for j, u, c, jd, total, count, clear in zip(*(a.tolist() for a in self._player_columns)):
+            uid = cols.uids[u]
+            caseid = cols.caseids[c]
+            yield uid, caseid, {
+                "uid": uid,
+                "caseid": caseid,
+                "startTime": cols.start_times[j],        # 마지막 판
+                "endTime": cols.end_times[j],
+                "judge": jd,
+                "avgTimeSeconds": total / count,
+                "totalTimeSeconds": _num(total),
+                "playCount": count,
+                "clearCount": clear,
+            }
+
+
+def rebuild(cols: SessionColumns) -> Rebuilt:
+    uid_code, case_code, judge, elapsed = cols.arrays()
+    n_cases = max(len(cols.caseids), 1)
+
+    # --- 케이스별: bincount 몇 번이면 끝 ---
+    c_count = np.bincount(case_code, minlength=len(cols.caseids))
+    c_total = np.bincount(case_code, weights=elapsed, minlength=len(cols.caseids))
+    c_true = np.bincount(case_code, weights=judge, minlength=len(cols.caseids)).astype(np.int64)
+    cases = {}
+    for c, caseid in enumerate(cols.caseids):
+        count = int(c_count[c])
+        cases[caseid] = {
+            "caseid": caseid,
+            "playCount": count,
+            "totalTimeSeconds": _num(c_total[c]),
+            "avgTimeSeconds": float(c_total[c]) / count,
+            "trueCount": int(c_true[c]),
+            "falseCount": count - int(c_true[c]),
+        }
+
+    # --- 플레이어 × 케이스: (쌍, endTime 순서) 로 정렬한 뒤 구간별 합계 + 마지막 판 ---
+    pair = uid_code * n_cases + case_code
+    end_rank = np.empty(len(pair), dtype=np.int64)
+    end_rank[np.argsort(np.array(cols.end_times), kind="stable")] = np.arange(len(pair))
+    order = np.lexsort((end_rank, pair))
+    p_sorted = pair[order]
+    starts, ends = _group_bounds(p_sorted)
+    counts = ends - starts
+    sums = np.add.reduceat(elapsed[order], starts) if len(starts) else np.zeros(0)
+    clears = np.add.reduceat(judge[order].astype(np.int64), starts) if len(starts) else np.zeros(0, dtype=np.int64)
+    last = order[ends - 1]
+    player_columns = (last, uid_code[last], case_code[last], judge[last], sums, counts, clears)
+
+    # --- 플레이 시간 스케치 (케이스별 / 플레이어별) ---
+    case_sketches = {cols.caseids[g]: d for g, d in sketches_by_group(case_code, elapsed).items()}
+    player_sketches = [(cols.uids[g], d) for g, d in sketches_by_group(uid_code, elapsed).items()]
+    return Rebuilt(cols, cases, player_columns, case_sketches, player_sketches)
+
+
+# ----- 쓰기 -----
+def write(result: Rebuilt, players: PlayerStore, meta: Optional[Dict[str, str]] = None) -> None:
+    """플레이어 / 케이스 통계와 스케치를 한 트랜잭션으로 갈아끼운다."""
+    players.replace_all(result.player_rows(), result.player_sketches, result.cases, result.case_sketches, meta)
+
+
+def replayed_meta(wals: List[Path]) -> Dict[str, str]:
+    """
+    결과와 같은 트랜잭션에 적을 meta.
+    남은 WAL 의 이벤트는 session_logs 에도 있으므로, 결과를 저장한 뒤 WAL 을 지우기 전에 멈춰도
+    서버가 다시 재생하지 않도록 워커 WAL 마다 마지막 번호를 적고, 예전 cases.json / stats.wal 도 옮긴 것으로 표시한다.
+    """
+    meta = {"cases_json_migrated": "1"}
+    for wal in wals:
+        if wal.name != "stats.wal":
+            meta[f"wal:{wal.name}"] = str(max((ev["seq"] for ev in read_wal(wal)), default=0))
+    return meta
+
+
+def pending_wals(data_dir: Path) -> List[Path]:
+    """아직 저장소에 안 들어간 이벤트가 남아 있는 WAL (예전 단일 stats.wal 포함)."""
+    paths = [data_dir / "stats.wal", *sorted(data_dir.glob("stats.*.wal"))]
+    return [p for p in paths if p.exists() and p.stat().st_size > 0]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="session_logs 에서 게임 통계를 다시 계산")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--ndjson", type=Path, help="session_logs 내보내기 (한 줄에 JSON 하나)")
+    src.add_argument("--firestore", action="store_true", help="Firestore session_logs 컬렉션 (FIREBASE_MODE=fake 면 대역)")
+    ap.add_argument("--data-dir", type=Path, default=Path(os.environ.get("GAME_DATA_DIR", Path(__file__).resolve().parent)))
+    ap.add_argument("--dry-run", action="store_true", help="계산만 하고 쓰지 않음")
+    ap.add_argument("--force", action="store_true", help="stats*.wal 이 남아 있어도 진행 (저장이 끝난 뒤 WAL 은 지운다)")
+    args = ap.parse_args()
+
+    wals = pending_wals(args.data_dir)
+    if not args.dry_run and wals and not args.force:
+        raise SystemExit(
+            f"{', '.join(map(str, wals))} 에 아직 반영 안 된 이벤트가 있습니다. 서버를 한 번 켰다 끄거나 --force 로 진행하세요."
+        )
+
+    # 순환 참조를 만들지 않는 일괄 작업이라, 객체 수백만 개를 만드는 동안 GC 가 계속 훑지 않게 끈다
+    gc.disable()
+    t0 = time.perf_counter()
+    if args.ndjson:
+        records = iter_ndjson(args.ndjson)
+    else:
+        from shared.firebase_client import get_firestore
+
+        records = iter_firestore(get_firestore())
+    cols = SessionColumns.from_records(records)
+    t1 = time.perf_counter()
+    result = rebuild(cols)
+    t2 = time.perf_counter()
+
+    summary = {
+        "sessions": len(cols),
+        "skipped": cols.skipped,
+        "players": len(cols.uids),
+        "cases": len(cols.caseids),
+        "loadSeconds": round(t1 - t0, 3),
+        "aggregateSeconds": round(t2 - t1, 3),
+    }
+    if not args.dry_run:
+        args.data_dir.mkdir(parents=True, exist_ok=True)
+        players = open_player_store(
+            args.data_dir / "players.sqlite3",
+            json_path=args.data_dir / "players.json",
+            sketches_path=args.data_dir / "sketches.json",
+        )
+        write(result, players, replayed_meta(wals))
+        # 저장이 커밋된 뒤에만 WAL 을 지운다 (실패하면 WAL 이 그대로 남아 서버가 재생)
+        for wal in wals:
+            wal.unlink(missing_ok=True)
+            players.delete_meta(f"wal:{wal.name}")
+        summary["writeSeconds"] = round(time.perf_counter() - t2, 3)
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
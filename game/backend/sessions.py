@@ -0,0 +1,294 @@
+"""
+게임 세션(/events/start ~ /events/end) 저장소.
+
+예전 SESSIONS 는 모듈 전역 dict 라서
+- 시작만 하고 끝내지 않은 세션이 영원히 남고
+- uvicorn 워커가 여러 개면 end 가 다른 프로세스로 가서 404 가 났다.
+그래서 같은 인터페이스(SessionStore) 뒤에 두 가지 구현을 둔다.
+- MemorySessionStore : 프로세스 내, __slots__ 레코드 + 만료 힙(TTL)
+- SqliteSessionStore : 여러 워커/프로세스가 파일 하나를 공유 (수평 확장용)
+둘 다 활성 세션 수 / 만료로 정리된 수를 stats() 로 알려준다.
+
+/events/batch 의 idempotency_key 도 세션과 같은 저장소에 둔다.
+put / pop 에 key 를 주면 세션을 넣거나 꺼내는 것과 키 기록이 한 트랜잭션이라,
+재시작 뒤 재전송이나 다른 워커로 간 재전송도 한 번만 반영된다.
+"""
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import heapq, json, os, sqlite3, threading, time
+
+from game.backend.idempotency import IdempotencyLog
+
+
+class Session:
+    __slots__ = ("sid", "uid", "caseid", "start", "start_kst", "expires")
+
+    def __init__(self, sid: str, uid: str, caseid: str, start: int, start_kst: str, expires: float):
+        self.sid = sid
+        self.uid = uid
+        self.caseid = caseid
+        self.start = start            # epoch 초 (플레이 시간 계산용)
+        self.start_kst = start_kst    # KST 문자열
+        self.expires = expires
+
+
+class SessionStore(ABC):
+    def __init__(self, ttl: float, key_ttl: float = 24 * 3600):
+        self.ttl = ttl
+        self.key_ttl = key_ttl
+
+    @abstractmethod
+    def put(self, sid: str, uid: str, caseid: str, start: int, start_kst: str,
+            key: Optional[str] = None) -> Optional[Session]:
+        """key 를 주면 키 기록과 함께 넣는다. 이미 쓴 키면 아무것도 안 하고 None."""
+
+    @abstractmethod
+    def pop(self, sid: str, key: Optional[str] = None) -> Optional[Session]:
+        """
+        세션을 꺼내면서 지운다 (같은 세션을 두 번 끝낼 수 없음). 없거나 만료면 None.
+        key 를 주면 꺼낼 때 키도 같이 기록하고, 이미 쓴 키면 꺼내지 않고 None.
+        """
+
+    @abstractmethod
+    def recall(self, key: str) -> Optional[Dict[str, Any]]:
+        """기록된 키의 결과. 키는 있는데 결과를 아직 못 남겼으면 {}, 처음 보는 키면 None."""
+
+    @abstractmethod
+    def remember(self, key: str, result: Dict[str, Any]) -> None:
+        """put / pop 으로 기록한 키에 응답 결과를 남긴다 (재전송 시 그대로 돌려줌)."""
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """만료된 세션을 정리하고 정리한 개수를 반환."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]: ...
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, ttl: float, clock=time.time, key_ttl: float = 24 * 3600, max_keys: int = 100_000):
+        super().__init__(ttl, key_ttl)
+        self._clock = clock
+        self._sessions: Dict[str, Session] = {}
+        self._heap: List[Tuple[float, str]] = []   # (만료 시각, sid) - 가장 먼저 만료될 것이 맨 앞
+        self._lock = threading.Lock()
+        self._keys = IdempotencyLog(maxsize=max_keys, ttl=key_ttl, clock=clock)
+        self.evicted = 0
+
+    def put(self, sid: str, uid: str, caseid: str, start: int, start_kst: str,
+            key: Optional[str] = None) -> Optional[Session]:
+        session = Session(sid, uid, caseid, start, start_kst, self._clock() + self.ttl)
+        with self._lock:
+            if key is not None:
+                if self._keys.get(key) is not None:
+                    return None
+                self._keys.put(key, {})
+            self._sweep_locked()
+            self._sessions[sid] = session
+            heapq.heappush(self._heap, (session.expires, sid))
+        return session
+
+    def pop(self, sid: str, key: Optional[str] = None) -> Optional[Session]:
+        with self._lock:
+            self._sweep_locked()
+            if key is not None:
+                if self._keys.get(key) is not None:
+                    return None
+                session = self._sessions.pop(sid, None)
+                if session is not None:
+                    self._keys.put(key, {})
+                return session
+            return self._sessions.pop(sid, None)
+
+    def recall(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._keys.get(key)
+
+    def remember(self, key: str, result: Dict[str, Any]) -> None:
+        self._keys.put(key, result)
+
+    def _sweep_locked(self) -> int:
+        # 힙 맨 앞만 보면 되므로 평소엔 O(1), 만료된 것 k개 정리에 O(k log n)
+        now = self._clock()
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires, sid = heapq.heappop(self._heap)
+            session = self._sessions.get(sid)
+            # 이미 끝난 세션이면 힙에만 남아 있던 것
+            if session is not None and session.expires == expires:
+                del self._sessions[sid]
+                removed += 1
+        self.evicted += removed
+        return removed
+
+    def sweep(self) -> int:
+        with self._lock:
+            return self._sweep_locked()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            # 만료됐지만 아직 힙에서 안 빠진 세션을 active 로 세지 않도록 먼저 정리
+            self._sweep_locked()
+            return {"active": len(self._sessions), "evicted": self.evicted, "keys": self._keys.stats()["keys"]}
+
+
+class SqliteSessionStore(SessionStore):
+    """여러 워커가 같은 파일을 쓰므로 start 와 end 가 다른 프로세스로 가도 동작한다."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        sid       TEXT PRIMARY KEY,
+        uid       TEXT NOT NULL,
+        caseid    TEXT NOT NULL,
+        start     INTEGER NOT NULL,
+        start_kst TEXT NOT NULL,
+        expires   REAL NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires);
+    CREATE TABLE IF NOT EXISTS session_counters (
+        key   TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    INSERT OR IGNORE INTO session_counters (key, value) VALUES ('evicted', 0);
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        key     TEXT PRIMARY KEY,
+        result  TEXT,                -- 응답 JSON (키만 기록하고 아직 못 남겼으면 NULL)
+        expires REAL NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires);
+    """
+
+    def __init__(self, path: Path | str, ttl: float, clock=time.time, sweep_every: int = 100,
+                 key_ttl: float = 24 * 3600):
+        super().__init__(ttl, key_ttl)
+        self.path = str(path)
+        self._clock = clock
+        self._local = threading.local()
+        self._sweep_every = sweep_every
+        self._ops = 0
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _maybe_sweep(self) -> None:
+        # 요청마다 만료 정리를 하지 않고 N번에 한 번만 (인덱스 범위 삭제라 싸다)
+        self._ops += 1
+        if self._ops % self._sweep_every == 0:
+            self.sweep()
+
+    def _claim_key(self, conn: sqlite3.Connection, key: str, now: float) -> bool:
+        # 만료된 키는 없는 것으로 보고 덮어쓴다
+        conn.execute("DELETE FROM idempotency_keys WHERE key = ? AND expires <= ?", (key, now))
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO idempotency_keys (key, result, expires) VALUES (?, NULL, ?)",
+            (key, now + self.key_ttl),
+        )
+        return cur.rowcount == 1
+
+    def put(self, sid: str, uid: str, caseid: str, start: int, start_kst: str,
+            key: Optional[str] = None) -> Optional[Session]:
+        now = self._clock()
+        session = Session(sid, uid, caseid, start, start_kst, now + self.ttl)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if key is not None and not self._claim_key(conn, key, now):
+                conn.execute("ROLLBACK")
+                return None
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (sid, uid, caseid, start, start_kst, expires)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (sid, uid, caseid, start, start_kst, session.expires),
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self._maybe_sweep()
+        return session
+
+    def pop(self, sid: str, key: Optional[str] = None) -> Optional[Session]:
+        now = self._clock()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT * FROM sessions WHERE sid = ?", (sid,)).fetchone()
+            if row is not None and row["expires"] > now and key is not None and not self._claim_key(conn, key, now):
+                # 이미 반영한 end 의 재전송 → 세션은 건드리지 않는다
+                conn.execute("ROLLBACK")
+                return None
+            if row is not None:
+                conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self._maybe_sweep()
+
+        if row is None or row["expires"] <= now:
+            return None
+        return Session(row["sid"], row["uid"], row["caseid"], row["start"], row["start_kst"], row["expires"])
+
+    def recall(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT result FROM idempotency_keys WHERE key = ? AND expires > ?", (key, self._clock())
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row["result"]) if row["result"] is not None else {}
+
+    def remember(self, key: str, result: Dict[str, Any]) -> None:
+        self._conn().execute(
+            "UPDATE idempotency_keys SET result = ? WHERE key = ?", (json.dumps(result, ensure_ascii=False), key)
+        )
+
+    def sweep(self) -> int:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = self._clock()
+            conn.execute("DELETE FROM idempotency_keys WHERE expires <= ?", (now,))
+            cur = conn.execute("DELETE FROM sessions WHERE expires <= ?", (now,))
+            if cur.rowcount:
+                conn.execute(
+                    "UPDATE session_counters SET value = value + ? WHERE key = 'evicted'", (cur.rowcount,)
+                )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return cur.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._conn()
+        active = conn.execute("SELECT COUNT(*) FROM sessions WHERE expires > ?", (self._clock(),)).fetchone()[0]
+        evicted = conn.execute("SELECT value FROM session_counters WHERE key = 'evicted'").fetchone()[0]
+        keys = conn.execute("SELECT COUNT(*) FROM idempotency_keys").fetchone()[0]
+        return {"active": active, "evicted": evicted, "keys": keys}
+
+
+def open_session_store(default_path: Path) -> SessionStore:
+    """
+    SESSION_STORE=memory(기본) | sqlite
+    SESSION_TTL : 세션 유효 시간(초, 기본 6시간)
+    SESSION_DB_PATH : sqlite 파일 경로 (워커들이 같은 경로를 보게 할 것)
+    IDEMPOTENCY_TTL : /events/batch 키를 기억하는 시간(초, 기본 24시간)
+    IDEMPOTENCY_KEYS : memory 일 때 기억하는 키 수 상한
+    """
+    ttl = float(os.environ.get("SESSION_TTL", str(6 * 3600)))
+    key_ttl = float(os.environ.get("IDEMPOTENCY_TTL", str(24 * 3600)))
+    kind = os.environ.get("SESSION_STORE", "memory")
+    if kind == "memory":
+        return MemorySessionStore(ttl, key_ttl=key_ttl, max_keys=int(os.environ.get("IDEMPOTENCY_KEYS", "100000")))
+    if kind == "sqlite":
+        return SqliteSessionStore(os.environ.get("SESSION_DB_PATH", str(default_path)), ttl, key_ttl=key_ttl)
+    raise RuntimeError(f"unknown SESSION_STORE: {kind}")
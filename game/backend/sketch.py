@@ -0,0 +1,134 @@
+"""
+플레이 시간 분포용 DDSketch (상대 오차 보장 분위수 스케치).
+
+값 x 를 gamma = (1+a)/(1-a) 의 로그 구간 ceil(log_gamma(x)) 에 세기만 하므로
+- 추가는 O(1), 메모리는 값의 범위에만 비례 (1초~하루, a=1% 이면 구간 600개 정도)
+- 어떤 분위수든 참값 대비 상대 오차 a 이내
+- 같은 a 끼리는 구간 개수를 더하기만 하면 합쳐진다 (케이스 여러 개 / 워커 여러 개)
+session_logs 를 다시 훑지 않고도 중앙값, p90 같은 값을 바로 낼 수 있다.
+"""
+from typing import Dict, List, Optional, Sequence
+import math
+
+DEFAULT_ALPHA = 0.01
+MAX_BINS = 2048
+
+# /stats/cases/{caseid} 히스토그램 구간 경계(초)
+HISTOGRAM_EDGES = (10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+
+
+class DDSketch:
+    __slots__ = ("alpha", "gamma", "_log_gamma", "bins", "zero", "count", "sum", "min", "max")
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero = 0          # 0초 이하 (바로 끝낸 판)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, x: float) -> int:
+        return math.ceil(math.log(x) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        # 구간 (gamma^(k-1), gamma^k] 의 대표값 → 상대 오차 alpha 이내
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, x: float, n: int = 1) -> None:
+        if x <= 0:
+            self.zero += n
+        else:
+            k = self._key(x)
+            self.bins[k] = self.bins.get(k, 0) + n
+            if len(self.bins) > MAX_BINS:
+                self._collapse()
+        self.count += n
+        self.sum += x * n
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def _collapse(self) -> None:
+        # 구간이 너무 많으면 가장 작은 값 쪽을 합친다 (긴 플레이 쪽 정확도를 유지)
+        keys = sorted(self.bins)
+        extra = len(keys) - MAX_BINS
+        target = keys[extra]
+        self.bins[target] += sum(self.bins.pop(k) for k in keys[:extra])
+
+    def merge(self, other: "DDSketch") -> None:
+        if other.alpha != self.alpha:
+            raise ValueError("cannot merge sketches with different alpha")
+        for k, n in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + n
+        if len(self.bins) > MAX_BINS:
+            self._collapse()
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen > rank:
+                return min(max(self._value(k), self.min), self.max)
+        return self.max
+
+    def histogram(self, edges: Sequence[float] = HISTOGRAM_EDGES) -> List[dict]:
+        """[{"le": 경계, "count": 개수}, ..., {"le": None, "count": 나머지}] (구간별, 누적 아님)"""
+        counts = [0] * (len(edges) + 1)
+        counts[0] += self.zero
+        for k, n in self.bins.items():
+            v = self._value(k)
+            i = 0
+            while i < len(edges) and v > edges[i]:
+                i += 1
+            counts[i] += n
+        return [{"le": le, "count": c} for le, c in zip(list(edges) + [None], counts)]
+
+    # ----- 저장 형식: 구간 번호가 연속이므로 시작 번호 + 개수 배열로 -----
+    def to_dict(self) -> dict:
+        d = {"a": self.alpha, "n": self.count, "s": self.sum, "z": self.zero}
+        if self.count:
+            d["lo"], d["hi"] = self.min, self.max
+        if self.bins:
+            lo, hi = min(self.bins), max(self.bins)
+            d["o"] = lo
+            d["b"] = [self.bins.get(k, 0) for k in range(lo, hi + 1)]
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "DDSketch":
+        sk = cls(d.get("a", DEFAULT_ALPHA))
+        sk.count = d.get("n", 0)
+        sk.sum = d.get("s", 0.0)
+        sk.zero = d.get("z", 0)
+        sk.min = d.get("lo", math.inf)
+        sk.max = d.get("hi", -math.inf)
+        offset = d.get("o", 0)
+        sk.bins = {offset + i: n for i, n in enumerate(d.get("b", ())) if n}
+        return sk
+
+    def copy(self) -> "DDSketch":
+        return DDSketch.from_dict(self.to_dict())
+
+    def summary(self, quantiles: Sequence[float] = (0.5, 0.75, 0.9, 0.95, 0.99)) -> dict:
+        return {
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "mean": self.sum / self.count if self.count else None,
+            "percentiles": {f"p{round(q * 100)}": self.quantile(q) for q in quantiles},
+            "histogram": self.histogram(),
+            "relativeAccuracy": self.alpha,
+        }
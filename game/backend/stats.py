@@ -0,0 +1,312 @@
+"""
+게임 통계 집계기 (플레이어별 / 케이스별 통계, 플레이 시간 스케치).
+
+예전에는 /events/end 한 번마다 두 파일을 통째로 읽고-고치고-다시 썼다.
+이제는
+- 판 결과를 워커 메모리의 "증분"(StatsDelta)에 O(1) 로 더하고
+- 더하기 전에 워커 전용 WAL(stats.<pid>.wal, 한 줄 JSON) 에 먼저 적어서 프로세스가 죽어도 잃지 않으며
+- N 건마다 또는 주기적으로 증분을 저장소(player_store)에 보내, 저장된 값과 한 트랜잭션 안에서 합친다.
+워커마다 WAL 이 따로 있고 저장소에는 더하기만 하므로, 워커 여러 개가 같은 데이터 폴더를 써도
+서로의 이벤트를 지우거나 덮어쓰지 않는다.
+증분을 반영할 때 그 WAL 의 마지막 번호도 같은 트랜잭션으로 저장해서,
+내려쓴 직후 죽더라도 WAL 재생이 두 번 반영되지 않는다.
+죽은 워커가 남긴 WAL 은 다음에 시작하는 워커가 재생하고 지운다 (살아 있는 워커의 WAL 은 flock 으로 구분).
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import copy, fcntl, json, os, threading
+
+from game.backend.player_store import PlayerStore, case_row, merge_case, merge_player_case, play_row
+from game.backend.sketch import DDSketch
+from shared.metrics import timer
+
+
+def load_json(path: Path, *, default: dict) -> dict:
+    if not path.exists():
+        return copy.deepcopy(default)
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return copy.deepcopy(default)
+
+
+class StatsDelta:
+    """마지막 내려쓰기 이후 한 워커가 모은 증분. 저장소 행과 같은 형태라 merge_* 로 그대로 합친다."""
+
+    def __init__(self):
+        self.players: Dict[Tuple[str, str], dict] = {}
+        self.player_sketches: Dict[str, DDSketch] = {}
+        self.cases: Dict[str, dict] = {}
+        self.case_sketches: Dict[str, DDSketch] = {}
+        self.events = 0
+
+    def __bool__(self) -> bool:
+        return self.events > 0
+
+    def add(self, ev: dict, *, players: bool = True, player_sketches: bool = True,
+            cases: bool = True, case_sketches: bool = True) -> None:
+        # 플래그는 예전 stats.wal 재생용 (저장소마다 이미 반영한 번호가 달랐음)
+        uid, caseid = ev["uid"], ev["caseid"]
+        if players:
+            key = (uid, caseid)
+            one = play_row(uid, caseid, ev["judge"], ev["elapsed"], ev["startTime"], ev["endTime"])
+            self.players[key] = merge_player_case(self.players.get(key), one)
+        if player_sketches:
+            self.player_sketches.setdefault(uid, DDSketch()).add(ev["elapsed"])
+        if cases:
+            self.cases[caseid] = merge_case(self.cases.get(caseid), case_row(caseid, ev["judge"], ev["elapsed"]))
+        if case_sketches:
+            self.case_sketches.setdefault(caseid, DDSketch()).add(ev["elapsed"])
+        self.events += 1
+
+
+def read_wal(path: Path) -> Iterator[dict]:
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return
+    for line in text.splitlines():
+        try:
+            yield json.loads(line)
+        except ValueError:
+            return  # 마지막 줄이 쓰다 만 상태면 거기까지만
+
+
+@contextmanager
+def _flocked(path: Path) -> Iterator[None]:
+    """여러 워커가 동시에 시작할 때 WAL 정리 / 마이그레이션을 한 번에 하나씩."""
+    with path.open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class StatsAggregator:
+    def __init__(
+        self,
+        players: PlayerStore,
+        wal_dir: Path,
+        *,
+        legacy_cases_path: Path | None = None,
+        legacy_sketches_path: Path | None = None,
+        legacy_wal_path: Path | None = None,
+        flush_every: int = 100,
+        flush_interval: float = 5.0,
+        fsync: bool = True,
+    ):
+        self.players = players
+        self.wal_dir = wal_dir
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        self._lock = threading.RLock()
+        self._timer: threading.Thread | None = None
+        self._stop = threading.Event()
+
+        self._delta = StatsDelta()
+        # 이번 내려쓰기 주기에 건드린 것만: 저장소 값 + 증분 (응답용)
+        self._player_view: Dict[str, Dict[str, dict]] = {}
+        self._case_view: Dict[str, dict] = {}
+
+        self.wal_path = wal_dir / f"stats.{os.getpid()}.wal"
+        self._wal_key = f"wal:{self.wal_path.name}"
+        with _flocked(wal_dir / "stats.lock"):
+            if legacy_cases_path is not None:
+                self._migrate_legacy(legacy_cases_path, legacy_sketches_path, legacy_wal_path)
+            for path in sorted(wal_dir.glob("stats.*.wal")):
+                self._recover(path)
+            # 이 워커가 살아 있는 동안 잠가 둔다 → 다른 워커가 재생하지 않음
+            self._wal = self.wal_path.open("a", encoding="utf-8")
+            fcntl.flock(self._wal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._seq = players.get_seq(self._wal_key)
+
+    # ----- 시작할 때 정리 -----
+    def _migrate_legacy(self, cases_path: Path, sketches_path: Optional[Path], wal_path: Optional[Path]) -> None:
+        """예전 cases.json / sketches.json + 단일 stats.wal → 저장소 (한 번만)."""
+        if self.players.get_meta("cases_json_migrated") is None:
+            cases_doc = load_json(cases_path, default={"cases": {}})
+            sketches_doc = load_json(sketches_path, default={}) if sketches_path else {}
+            players_seq = self.players.get_seq("players_seq")
+            player_sketches_seq = self.players.get_seq("player_sketches_seq")
+            cases_seq = int(cases_doc.get("walSeq", 0))
+            sketches_seq = int(sketches_doc.get("walSeq", 0))
+            delta = StatsDelta()
+            for ev in read_wal(wal_path) if wal_path else ():
+                seq = ev["seq"]
+                delta.add(
+                    ev,
+                    players=seq > players_seq,
+                    player_sketches=seq > player_sketches_seq,
+                    cases=seq > cases_seq,
+                    case_sketches=seq > sketches_seq,
+                )
+            self.players.migrate_cases(cases_doc.get("cases", {}), sketches_doc.get("cases", {}), delta)
+        if wal_path is not None:
+            wal_path.unlink(missing_ok=True)
+
+    def _recover(self, path: Path) -> None:
+        """주인 없는(잠겨 있지 않은) WAL 을 재생하고 지운다."""
+        try:
+            f = path.open("r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # 살아 있는 워커의 WAL
+            key = f"wal:{path.name}"
+            done = last = self.players.get_seq(key)
+            delta = StatsDelta()
+            for ev in read_wal(path):
+                if ev["seq"] > done:
+                    delta.add(ev)
+                    last = max(last, ev["seq"])
+            if delta:
+                self.players.apply(delta, {key: last})
+            path.unlink(missing_ok=True)
+        self.players.delete_meta(key)
+
+    # ----- WAL -----
+    def _append_wal(self, events: List[dict]) -> None:
+        self._wal.write("".join(
+            json.dumps(ev, ensure_ascii=False, separators=(",", ":")) + "\n" for ev in events
+        ))
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+
+    # ----- 집계 (O(1)) -----
+    def _apply(self, ev: dict) -> Tuple[Dict[str, dict], dict]:
+        uid, caseid = ev["uid"], ev["caseid"]
+        self._delta.add(ev)
+
+        user_cases = self._player_view.get(uid)
+        if user_cases is None:
+            # 이번 내려쓰기 주기에서 처음 플레이한 사람만 저장소에서 한 번 읽어 온다
+            user_cases = self._player_view[uid] = self.players.get_player(uid)
+        one = play_row(uid, caseid, ev["judge"], ev["elapsed"], ev["startTime"], ev["endTime"])
+        user_cases[caseid] = merge_player_case(user_cases.get(caseid), one)
+
+        if caseid not in self._case_view:
+            self._case_view[caseid] = self.players.get_case(caseid)
+        case_stats = self._case_view[caseid] = merge_case(self._case_view[caseid], case_row(caseid, ev["judge"], ev["elapsed"]))
+        return user_cases, case_stats
+
+    # ----- 조회 -----
+    def case_sketch(self, caseid: str) -> DDSketch | None:
+        """저장소 값 + 이 워커의 아직 안 내려쓴 증분 (다른 워커 것은 내려쓴 뒤에 보인다)."""
+        # flush 와 같은 락 안에서 읽어야, 저장소에 더하고 증분을 비우는 사이에 끼어 적게 세지 않는다
+        with self._lock:
+            sk = self.players.get_case_sketch(caseid)
+            pending = self._delta.case_sketches.get(caseid)
+            if pending is not None:
+                sk = sk or DDSketch(pending.alpha)
+                sk.merge(pending)
+        return sk
+
+    def get_player(self, uid: str) -> Tuple[Dict[str, dict], Optional[DDSketch]]:
+        """(이 유저의 {caseid: 통계}, 플레이 시간 스케치). 이 워커의 아직 안 내려쓴 변경도 반영된 값."""
+        return self.get_players([uid]).get(uid, ({}, None))
+
+    def get_players(self, uids: Iterable[str]) -> Dict[str, Tuple[Dict[str, dict], Optional[DDSketch]]]:
+        """기록이 있는 uid 만 돌려준다. 저장소에서 한 번에 읽고 이 워커의 증분을 얹는다."""
+        uids = list(dict.fromkeys(uids))
+        wanted = set(uids)
+        # 저장소 읽기도 flush 와 같은 락 안에서 (읽은 뒤 flush 가 증분을 비우면 그만큼 빠진 값이 나온다)
+        with self._lock:
+            cases = self.players.get_players(uids)
+            sketches = self.players.get_sketches(uids)
+            for (uid, caseid), d in self._delta.players.items():
+                if uid in wanted:
+                    user_cases = cases.setdefault(uid, {})
+                    user_cases[caseid] = merge_player_case(user_cases.get(caseid), d)
+            for uid, pending in self._delta.player_sketches.items():
+                if uid in wanted:
+                    sk = sketches.get(uid) or DDSketch(pending.alpha)
+                    sk.merge(pending)
+                    sketches[uid] = sk
+        return {uid: (cases[uid], sketches.get(uid)) for uid in uids if uid in cases}
+
+    def record(
+        self, uid: str, caseid: str, judge: bool, elapsed: int, start_kst: str, end_kst: str
+    ) -> Tuple[Dict[str, dict], dict]:
+        """
+        한 판 결과를 반영하고 (이 유저의 전체 case 통계, 이 case 통계) 복사본을 돌려준다.
+        """
+        return self.record_many([(uid, caseid, judge, elapsed, start_kst, end_kst)])[0]
+
+    def record_many(
+        self, plays: Iterable[Tuple[str, str, bool, int, str, str]]
+    ) -> List[Tuple[Dict[str, dict], dict]]:
+        """
+        여러 판 결과를 한 번에 반영한다 (/events/batch 용).
+        WAL 쓰기와 fsync 도 묶어서 한 번만 하고, 결과는 판마다 record() 와 같은 형태로 돌려준다.
+        """
+        with self._lock:
+            events = []
+            for uid, caseid, judge, elapsed, start_kst, end_kst in plays:
+                self._seq += 1
+                events.append({
+                    "seq": self._seq,
+                    "uid": uid,
+                    "caseid": caseid,
+                    "judge": judge,
+                    "elapsed": elapsed,
+                    "startTime": start_kst,
+                    "endTime": end_kst,
+                })
+            if not events:
+                return []
+            self._append_wal(events)
+
+            results = []
+            for ev in events:
+                user_cases, case_stats = self._apply(ev)
+                results.append((copy.deepcopy(user_cases), dict(case_stats)))
+
+            if self._delta.events >= self.flush_every:
+                self.flush()
+            return results
+
+    # ----- 내려쓰기 -----
+    def flush(self) -> None:
+        with self._lock:
+            if not self._delta:
+                return
+            with timer("stats.snapshot"):
+                self.players.apply(self._delta, {self._wal_key: self._seq})
+            # 저장소에 다 들어갔으므로 이 워커의 WAL 은 비운다
+            self._wal.truncate(0)
+            self._wal.seek(0)
+            self._delta = StatsDelta()
+            # 다른 워커가 그 사이 더한 값도 보이도록 다음 주기에 다시 읽는다
+            self._player_view.clear()
+            self._case_view.clear()
+
+    def start(self) -> None:
+        if self._timer is not None:
+            return
+
+        def loop() -> None:
+            while not self._stop.wait(self.flush_interval):
+                try:
+                    self.flush()
+                except Exception as e:
+                    print("stats flush failed:", e)
+
+        self._timer = threading.Thread(target=loop, name="game-stats-flush", daemon=True)
+        self._timer.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self.flush()
+        with self._lock:
+            # 다 내려썼으니 WAL 파일과 번호는 필요 없다 (파일을 먼저 지우고 잠금을 푼다)
+            self.wal_path.unlink(missing_ok=True)
+            self._wal.close()
+        self.players.delete_meta(self._wal_key)
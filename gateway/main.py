@@ -0,0 +1,160 @@
+"""
+로그인 / 커뮤니티 / 게임 백엔드를 한 프로세스에 올리는 게이트웨이 앱.
+
+예전에는 세 FastAPI 앱을 따로 띄웠고, 게임 앱이 커뮤니티 라우터를 한 번 더 붙이고 있어서
+커뮤니티 저장소 / 캐시 / SSE 허브 / 업로드 GC 가 프로세스 두 곳에 따로 떠 있었고 /uploads 도 서로 다른 폴더를 가리켰다.
+이제는 켜 둔 백엔드의 라우터만 이 앱 하나에 붙이고, 같이 쓰는 것들은 한 벌만 둔다.
+- Firebase 클라이언트 : shared.firebase_client (처음 쓸 때 한 번 초기화)
+- rate limit 버킷     : shared.ratelimit.open_buckets 가 같은 저장소면 같은 객체/연결을 돌려준다
+- 워커 스레드         : 동기 엔드포인트와 커뮤니티 run_io 가 같은 anyio 워커 스레드를 쓴다
+                        (한도는 각각 GATEWAY_THREADS / COMMUNITY_IO_THREADS)
+- /uploads 정적 파일, /metrics, 입장 제어 미들웨어
+CORS 는 백엔드마다 단독 앱일 때의 정책을 그대로, 경로 prefix 로 골라서 적용한다.
+
+    GATEWAY_APPS=login,community,game uvicorn gateway.main:app
+
+워커를 여러 개 띄울 때는 게임 세션(+ /events/batch 멱등 키)과 rate limit 버킷을 워커끼리 공유하는
+sqlite 저장소로 바꿔야 한다 (기본값 memory 는 워커별이라 /events/end 가 다른 워커로 가면 404,
+배치 재전송이 다른 워커로 가면 두 번 반영, 한도는 워커 수만큼 늘어남).
+워커 수는 WEB_CONCURRENCY 로 준다 (uvicorn --workers 의 기본값). 2 이상인데 memory 저장소면 시작하지 않는다.
+
+    WEB_CONCURRENCY=<코어 수> SESSION_STORE=sqlite RATE_LIMIT_BACKEND=sqlite \
+        GATEWAY_APPS=login,community,game uvicorn gateway.main:app
+
+GATEWAY_APPS 에 없는 백엔드는 import 하지 않는다 (그 백엔드의 저장소 / 스레드도 안 뜸).
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+import os
+
+from anyio import to_thread
+from fastapi import APIRouter, FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+
+from shared.metrics import MetricsMiddleware, metrics_endpoint
+from shared.ratelimit import AdmissionMiddleware
+
+APPS = [name.strip() for name in os.environ.get("GATEWAY_APPS", "login,community,game").split(",") if name.strip()]
+THREADS = int(os.environ.get("GATEWAY_THREADS", "40"))
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+
+
+class SubApp:
+    """게이트웨이에 붙일 백엔드 하나: 라우터 + 붙일 위치 + CORS 정책 + 입장 제어 규칙 + 정적 파일."""
+
+    def __init__(self, name: str, router: APIRouter, prefix: str, cors: Dict[str, Any],
+                 rules: Sequence = (), mounts: Sequence[Tuple[str, Any]] = ()):
+        self.name = name
+        self.router = router
+        self.prefix = prefix
+        self.cors = cors
+        self.rules = list(rules)
+        self.mounts = list(mounts)
+
+    def roots(self) -> List[str]:
+        """이 백엔드가 차지하는 경로의 첫 마디들 (CORS 정책 고르는 용도)."""
+        if self.prefix:
+            roots = {self.prefix}
+        else:
+            roots = {"/" + route.path.lstrip("/").split("/", 1)[0] for route in self.router.routes}
+        roots.update(path for path, _ in self.mounts)
+        return sorted(roots)
+
+
+def _login() -> SubApp:
+    from capstone_login.backend.login import router, CORS
+
+    return SubApp("login", router, "", CORS)
+
+
+def _community() -> SubApp:
+    from community.backend.community import router, CORS, UPLOAD_DIR, admission_rules
+    from community.backend.uploads import ImmutableStaticFiles
+
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    return SubApp(
+        "community", router, "/community", CORS,
+        rules=admission_rules("/community"),
+        mounts=[("/uploads", ImmutableStaticFiles(directory=UPLOAD_DIR))],
+    )
+
+
+def _game() -> SubApp:
+    from game.backend.game import router, CORS, admission_rules
+
+    return SubApp("game", router, "", CORS, rules=admission_rules())
+
+
+LOADERS = {"login": _login, "community": _community, "game": _game}
+
+
+def check_shared_state(names: Sequence[str], workers: int) -> None:
+    """워커가 여러 개인데 워커별(memory) 저장소를 쓰면 조용히 틀리게 동작하므로 시작할 때 막는다."""
+    if workers <= 1:
+        return
+    problems = []
+    # 게임 세션 저장소는 /events/batch 의 idempotency_key 도 들고 있다
+    if "game" in names and os.environ.get("SESSION_STORE", "memory") == "memory":
+        problems.append("SESSION_STORE=sqlite")
+    if {"community", "game"} & set(names) and os.environ.get("RATE_LIMIT_BACKEND", "memory") == "memory":
+        problems.append("RATE_LIMIT_BACKEND=sqlite")
+    if problems:
+        raise RuntimeError(f"WEB_CONCURRENCY={workers} 이면 {' '.join(problems)} 가 필요합니다 (워커끼리 공유할 저장소)")
+
+
+class PathCORSMiddleware:
+    """경로 첫 마디로 백엔드를 골라 그 백엔드의 CORS 정책을 적용한다. 어디에도 안 맞으면 CORS 없이 통과."""
+
+    def __init__(self, app, policies: Sequence[Tuple[Sequence[str], Dict[str, Any]]]):
+        self.app = app
+        self._routes: Dict[str, CORSMiddleware] = {}
+        for roots, options in policies:
+            cors = CORSMiddleware(app, **options)
+            for root in roots:
+                self._routes[root] = cors
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            path = scope["path"]
+            root = scope.get("root_path", "")
+            if root and path.startswith(root):
+                path = path[len(root):]
+            cors = self._routes.get("/" + path.lstrip("/").split("/", 1)[0])
+            if cors is not None:
+                await cors(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+def create_app(names: Sequence[str]) -> FastAPI:
+    unknown = [name for name in names if name not in LOADERS]
+    if unknown:
+        raise ValueError(f"unknown GATEWAY_APPS: {', '.join(unknown)}")
+    check_shared_state(names, WORKERS)
+    subs = [LOADERS[name]() for name in dict.fromkeys(names)]
+
+    app = FastAPI(title="Please Gateway")
+
+    # 입장 제어(본문 읽기 전) → CORS(백엔드별) → 지연 히스토그램 순서로 감싼다 (단독 앱들과 같은 순서)
+    app.add_middleware(AdmissionMiddleware, rules=[rule for sub in subs for rule in sub.rules])
+    app.add_middleware(PathCORSMiddleware, policies=[(sub.roots(), sub.cors) for sub in subs])
+    app.add_middleware(MetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+    for sub in subs:
+        app.include_router(sub.router, prefix=sub.prefix, tags=[sub.name])
+        for path, handler in sub.mounts:
+            app.mount(path, handler, name=path.strip("/"))
+
+    @app.on_event("startup")
+    async def size_thread_pool():
+        # 동기 엔드포인트용 기본 한도. 커뮤니티 run_io 는 같은 스레드를 쓰되 자기 한도(COMMUNITY_IO_THREADS)를 따로 둔다
+        to_thread.current_default_thread_limiter().total_tokens = THREADS
+
+    @app.get("/")
+    def read_root():
+        return {"message": "Gateway running", "apps": [sub.name for sub in subs]}
+
+    return app
+
+
+app = create_app(APPS)
@@ -0,0 +1,140 @@
+"""
+세 백엔드(로그인 / 커뮤니티 / 게임)가 같이 쓰는 Firebase 핸들.
+
+예전에는 파일마다 import 시점에 제각각 initialize_app 을 불러서
+- firebase_admin import + 인증서 파싱 + Firestore 연결이 워커 시작 때마다 일어나고
+- 게임 백엔드는 커뮤니티 라우터를 import 하면서 한 번 더 초기화를 시도했고
+- 환경변수가 없으면 import 단계에서 예외가 나서 워커가 계속 재시작됐다.
+이제는
+- 이 모듈 import 는 firebase_admin 을 건드리지 않는다 (표준 라이브러리만)
+- app / auth / Firestore 는 처음 실제로 쓸 때 한 번만 만들고 프로세스 안에서 재사용한다
+- FIREBASE_MODE=fake 면 shared.firebase_fake 의 메모리 대역을 돌려준다 (로컬 개발, 벤치마크)
+
+인증서는 FIREBASE_CREDENTIALS(JSON 문자열) → FIREBASE_CREDENTIALS_FILE(파일 경로) 순서로 찾고,
+둘 다 없으면 호출한 쪽이 준 fallback_file (예: 로그인 백엔드의 serviceAccountKey.json) 을 쓴다.
+환경변수는 건드리지 않으므로 게이트웨이에서 같이 뜬 다른 백엔드에는 영향이 없다.
+"""
+from typing import Any, Callable, Optional
+import json, os, threading
+
+_lock = threading.RLock()
+_app = None
+_auth = None
+_db = None
+
+
+def mode() -> str:
+    return os.environ.get("FIREBASE_MODE", "live")
+
+
+def is_fake() -> bool:
+    return mode() == "fake"
+
+
+def configured(fallback_file: Optional[str] = None) -> bool:
+    """초기화하지 않고, 쓸 수 있는 설정이 있는지만 본다 (fallback_file 은 실제로 있어야 함)."""
+    if is_fake() or os.environ.get("FIREBASE_CREDENTIALS") or os.environ.get("FIREBASE_CREDENTIALS_FILE"):
+        return True
+    return fallback_file is not None and os.path.isfile(fallback_file)
+
+
+def _certificate(fallback_file: Optional[str] = None):
+    from firebase_admin import credentials
+
+    cred_json = os.environ.get("FIREBASE_CREDENTIALS")
+    if cred_json:
+        try:
+            return credentials.Certificate(json.loads(cred_json))
+        except ValueError as e:
+            raise RuntimeError(f"FIREBASE_CREDENTIALS is not valid JSON: {e}")
+    cred_file = os.environ.get("FIREBASE_CREDENTIALS_FILE") or fallback_file
+    if cred_file:
+        return credentials.Certificate(cred_file)
+    raise RuntimeError("FIREBASE_CREDENTIALS / FIREBASE_CREDENTIALS_FILE env not set")
+
+
+def get_app(fallback_file: Optional[str] = None):
+    global _app
+    if _app is None:
+        with _lock:
+            if _app is None:
+                import firebase_admin
+
+                # 다른 코드가 이미 초기화했으면 그 앱을 그대로 쓴다
+                _app = (
+                    firebase_admin.get_app() if firebase_admin._apps
+                    else firebase_admin.initialize_app(_certificate(fallback_file))
+                )
+    return _app
+
+
+def get_auth(fallback_file: Optional[str] = None):
+    """verify_id_token / create_custom_token 을 가진 객체."""
+    global _auth
+    if _auth is None:
+        with _lock:
+            if _auth is None:
+                if is_fake():
+                    from .firebase_fake import FakeAuth
+
+                    _auth = FakeAuth()
+                else:
+                    get_app(fallback_file)
+                    from firebase_admin import auth
+
+                    _auth = auth
+    return _auth
+
+
+def get_firestore(fallback_file: Optional[str] = None):
+    global _db
+    if _db is None:
+        with _lock:
+            if _db is None:
+                if is_fake():
+                    from .firebase_fake import FakeFirestore
+
+                    _db = FakeFirestore()
+                else:
+                    from firebase_admin import firestore
+
+                    _db = firestore.client(get_app(fallback_file))
+    return _db
+
+
+def use_fake(*, firestore_latency: float = 0.0, auth_latency: float = 0.0):
+    """코드에서 대역 모드로 바꾼다 (벤치마크). 만든 FakeFirestore 를 돌려준다."""
+    global _auth, _db
+    from .firebase_fake import FakeAuth, FakeFirestore
+
+    with _lock:
+        os.environ["FIREBASE_MODE"] = "fake"
+        _auth = FakeAuth(auth_latency)
+        _db = FakeFirestore(firestore_latency)
+        return _db
+
+
+def precondition_failed(exc: BaseException) -> bool:
+    """조건부 쓰기(db.write_option(last_update_time=...))가 그 사이 다른 쓰기에 밀려 실패한 예외인지."""
+    if is_fake():
+        from .firebase_fake import FakePreconditionFailed
+
+        return isinstance(exc, FakePreconditionFailed)
+    from google.api_core.exceptions import FailedPrecondition
+
+    return isinstance(exc, FailedPrecondition)
+
+
+class _Lazy:
+    """모듈 전역에 두고 쓰는 핸들. 속성을 처음 꺼낼 때 factory() 로 실제 객체를 만든다."""
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._factory(), name)
+
+
+# from shared.firebase_client import auth, db 로 import 해 두고 평소처럼 쓰면 된다
+auth = _Lazy(get_auth)
+db = _Lazy(get_firestore)
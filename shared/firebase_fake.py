@@ -0,0 +1,209 @@
+"""
+Firebase 대역 (auth / Firestore) - 로컬 개발(FIREBASE_MODE=fake)과 벤치마크용.
+
+- auth.verify_id_token("<uid>")  → {"uid": "<uid>", "exp": 지금+1시간}  (토큰 문자열 = uid)
+- auth.create_custom_token(uid)  → b"fake-custom-token.<uid>"
+- Firestore: collection/document/get/set/update/add/stream, get_all, batch, transaction,
+  write_option(last_update_time=...) 조건부 update 정도만
+latency 를 주면 Firestore 호출(왕복 1번)마다 그만큼 sleep 해서 네트워크 지연을 흉내 낸다.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import copy, threading, time, uuid
+
+
+MAX_BATCH_WRITES = 500
+
+
+class FakePreconditionFailed(Exception):
+    """조건부 쓰기 실패 (실제 클라이언트의 google.api_core.exceptions.FailedPrecondition 에 해당)."""
+
+
+class FakeWriteOption:
+    def __init__(self, last_update_time: int):
+        self.last_update_time = last_update_time
+
+
+class FakeSnapshot:
+    def __init__(self, ref: "FakeDocument", data: Optional[dict], update_time: Optional[int] = None):
+        self.reference = ref
+        self.id = ref.id
+        self._data = data
+        self.update_time = update_time
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[dict]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, client: "FakeFirestore", path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def get(self, transaction=None) -> FakeSnapshot:
+        self._client._rpc()
+        return self._client._snapshot(self)
+
+    def set(self, data: dict, merge: bool = False) -> None:
+        self._client._rpc()
+        self._client._write(self.path, data, merge)
+
+    def update(self, data: dict, option: Optional[FakeWriteOption] = None) -> None:
+        self._client._rpc()
+        with self._client._lock:
+            if option is not None and self._client.update_times.get(self.path) != option.last_update_time:
+                raise FakePreconditionFailed(f"{self.path} changed since last read")
+            self._client._update(self.path, data)
+
+    def collection(self, name: str) -> "FakeCollection":
+        return FakeCollection(self._client, f"{self.path}/{name}")
+
+
+class FakeCollection:
+    def __init__(self, client: "FakeFirestore", path: str):
+        self._client = client
+        self.path = path
+
+    def document(self, doc_id: Optional[str] = None) -> FakeDocument:
+        return FakeDocument(self._client, f"{self.path}/{doc_id or uuid.uuid4().hex}")
+
+    def add(self, data: dict):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+    def stream(self) -> Iterator[FakeSnapshot]:
+        """이 컬렉션 바로 아래 문서 전부 (하위 컬렉션 제외)."""
+        self._client._rpc()
+        prefix = self.path + "/"
+        with self._client._lock:
+            paths = [p for p in self._client.data if p.startswith(prefix) and "/" not in p[len(prefix):]]
+        for path in paths:
+            yield self._client._snapshot(FakeDocument(self._client, path))
+
+
+class FakeWriteBatch:
+    def __init__(self, client: "FakeFirestore"):
+        self._client = client
+        self._ops: List[tuple] = []
+
+    def set(self, ref: FakeDocument, data: dict, merge: bool = False) -> None:
+        self._ops.append(("set", ref.path, data, merge))
+
+    def update(self, ref: FakeDocument, data: dict) -> None:
+        self._ops.append(("update", ref.path, data, False))
+
+    def commit(self) -> None:
+        # 실제 Firestore 처럼 batch 하나에 쓰기 500개까지
+        if len(self._ops) > MAX_BATCH_WRITES:
+            raise ValueError(f"too many writes in one batch: {len(self._ops)} > {MAX_BATCH_WRITES}")
+        self._client._rpc()
+        with self._client._lock:
+            for op, path, data, merge in self._ops:
+                if op == "set":
+                    self._client._write(path, data, merge)
+                else:
+                    self._client._update(path, data)
+
+
+class FakeTransaction(FakeWriteBatch):
+    """읽기 → 쓰기 순서의 트랜잭션. commit 까지 클라이언트 전체 잠금을 잡아서 직렬화한다."""
+
+    def __enter__(self):
+        self._client._lock.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.commit()
+        finally:
+            self._client._lock.release()
+
+
+class FakeFirestore:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.data: Dict[str, dict] = {}
+        self.update_times: Dict[str, int] = {}
+        self._clock = 0
+        self.rpcs = 0
+        self._lock = threading.RLock()
+
+    def _rpc(self) -> None:
+        self.rpcs += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _read(self, path: str) -> Optional[dict]:
+        with self._lock:
+            data = self.data.get(path)
+            return copy.deepcopy(data) if data is not None else None
+
+    def _snapshot(self, ref: FakeDocument) -> FakeSnapshot:
+        with self._lock:
+            return FakeSnapshot(ref, self._read(ref.path), self.update_times.get(ref.path))
+
+    def _touch(self, path: str) -> None:
+        self._clock += 1
+        self.update_times[path] = self._clock
+
+    def _write(self, path: str, data: dict, merge: bool) -> None:
+        with self._lock:
+            if merge and path in self.data:
+                self.data[path].update(copy.deepcopy(data))
+            else:
+                self.data[path] = copy.deepcopy(data)
+            self._touch(path)
+
+    def _update(self, path: str, data: dict) -> None:
+        with self._lock:
+            if path not in self.data:
+                raise KeyError(f"no document to update: {path}")
+            self.data[path].update(copy.deepcopy(data))
+            self._touch(path)
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def get_all(self, refs: Iterable[FakeDocument]) -> List[FakeSnapshot]:
+        self._rpc()
+        return [self._snapshot(ref) for ref in refs]
+
+    def write_option(self, last_update_time: int) -> FakeWriteOption:
+        return FakeWriteOption(last_update_time)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def transaction(self) -> FakeTransaction:
+        return FakeTransaction(self)
+
+    def seed(self, collection: str, docs: Dict[str, dict]) -> None:
+        """왕복 지연 없이 한 번에 채워 넣기 (데이터셋 준비용)."""
+        with self._lock:
+            for doc_id, data in docs.items():
+                self.data[f"{collection}/{doc_id}"] = data
+                self._touch(f"{collection}/{doc_id}")
+
+
+class FakeAuth:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def verify_id_token(self, token: str, *args: Any, **kwargs: Any) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        if not token:
+            raise ValueError("empty token")
+        return {"uid": token, "exp": time.time() + 3600}
+
+    def create_custom_token(self, uid: str, *args: Any, **kwargs: Any) -> bytes:
+        if self.latency:
+            time.sleep(self.latency)
+        return f"fake-custom-token.{uid}".encode("utf-8")
+
@@ -0,0 +1,340 @@
+"""
+Prometheus 텍스트 형식 지표 (/metrics).
+
+외부 라이브러리 없이 카운터 / 게이지 / 히스토그램만 직접 구현했다.
+- 값 기록은 잠금 한 번 + 덧셈 몇 번이라 항상 켜 둬도 된다
+- 문자열 만들기(render)는 /metrics 를 긁어 갈 때만 한다
+- 라벨 값 조합별 자식(child)은 처음 한 번만 만들고 dict 로 다시 찾는다
+
+사용하는 곳
+- MetricsMiddleware : 라우트(경로 템플릿)별 요청 지연 히스토그램 + 상태 코드별 요청 수
+- timer / timed / instrument : 저장소, Firestore, 인증 호출 구간 시간
+- gauge(fn=...) : 세션 수, 큐 길이처럼 긁어 갈 때 읽으면 되는 값
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import inspect, math, threading, time
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return repr(v)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, child in list(self._children.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_num(child.value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """fn 을 주면 긁어 갈 때마다 fn() 값을 쓴다 (큐 길이, 세션 수 등)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help)
+        self.fn = fn
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self) -> List[str]:
+        try:
+            value = self.fn() if self.fn is not None else self.value
+        except Exception:
+            return []
+        return self._header() + [f"{self.name} {_num(float(value))}"]
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # 구간별 (누적 아님), 마지막은 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for le, n in zip(list(self.buckets) + [math.inf], counts):
+                cumulative += n
+                le_label = 'le="' + _num(le) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        # 같은 이름을 두 번 만들면 (모듈 재import 등) 처음 것을 그대로 쓴다. 게이지는 fn 만 새것으로.
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+            if isinstance(existing, Gauge) and isinstance(metric, Gauge):
+                existing.fn = metric.fn
+            return existing
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labelnames))
+
+
+def gauge(name: str, help: str, fn: Optional[Callable[[], float]] = None) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, fn))
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+
+# ----- 구간 시간 -----
+OPERATION_SECONDS = histogram(
+    "app_operation_seconds", "Time spent in storage / Firestore / auth calls", ["op"]
+)
+OPERATION_ERRORS = counter("app_operation_errors_total", "Calls that raised", ["op"])
+
+
+@contextmanager
+def timer(op: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        OPERATION_ERRORS.labels(op).inc()
+        raise
+    finally:
+        OPERATION_SECONDS.labels(op).observe(time.perf_counter() - t0)
+
+
+def timed(op: str, fn: Callable) -> Callable:
+    """fn 호출 시간을 op 라벨로 기록하는 래퍼 (async 함수도 가능)."""
+    child = OPERATION_SECONDS.labels(op)
+    errors = OPERATION_ERRORS.labels(op)
+
+    if inspect.iscoroutinefunction(fn):
+        @wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except BaseException:
+                errors.inc()
+                raise
+            finally:
+                child.observe(time.perf_counter() - t0)
+        return async_wrapper
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            errors.inc()
+            raise
+        finally:
+            child.observe(time.perf_counter() - t0)
+    return wrapper
+
+
+class instrument:
+    """
+    객체를 감싸서 공개 메서드 호출마다 "<prefix>.<메서드>" 로 시간을 잰다.
+    (저장소 / 세션 저장소 / 업로드 저장소처럼 메서드가 곧 I/O 인 객체용)
+    """
+
+    def __init__(self, obj: Any, prefix: str):
+        object.__setattr__(self, "_obj", obj)
+        object.__setattr__(self, "_prefix", prefix)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._obj, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        wrapped = timed(f"{self._prefix}.{name}", attr)
+        object.__setattr__(self, name, wrapped)   # 다음부터는 바로 찾도록
+        return wrapped
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._obj, name, value)
+
+
+# ----- HTTP -----
+HTTP_SECONDS = histogram("http_request_duration_seconds", "HTTP request latency by route", ["method", "route"])
+HTTP_REQUESTS = counter("http_requests_total", "HTTP requests by route and status", ["method", "route", "status"])
+
+
+def _route_label(scope) -> str:
+    """
+    라벨용 경로 템플릿. include_router(prefix=...) 로 붙인 라우트는 scope["route"].path 에
+    prefix 가 없으므로(/posts/{post_id}), 실제 경로에서 라우트 정규식이 맞는 꼬리를 찾아
+    그 앞부분을 prefix 로 붙인다 → /community/posts/{post_id}.
+    mount 아래 앱이면 root_path 도 앞에 붙는다.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "other"
+    root = scope.get("root_path", "")
+    path = scope.get("path", "")
+    if root and path.startswith(root):
+        path = path[len(root):]
+    regex = getattr(route, "path_regex", None)
+    if regex is not None:
+        # 뒤에서부터 잘라 보므로 가장 짧은 꼬리(= 가장 긴 prefix)가 먼저 맞는다
+        cut = len(path)
+        while cut >= 0:
+            if regex.match(path[cut:]):
+                return root + path[:cut] + template
+            cut = path.rfind("/", 0, cut)
+    return root + template
+
+
+class MetricsMiddleware:
+    """
+    순수 ASGI 미들웨어. 라벨에는 실제 경로가 아니라 라우트 템플릿(/posts/{post_id})을 써서
+    라벨 종류가 글 수만큼 늘어나지 않게 한다. 라우트가 없는 요청(정적 파일, 404)은 "other".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = _route_label(scope)
+            method = scope["method"]
+            HTTP_SECONDS.labels(method, route).observe(time.perf_counter() - t0)
+            HTTP_REQUESTS.labels(method, route, str(status)).inc()
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,316 @@
+"""
+쓰기 API 입장 제어 (rate limit + 동시 처리 상한).
+
+예전에는 글 작성(수 MB 업로드 포함), 댓글, /events/start, /events/end 를 클라이언트가 원하는 만큼
+빨리 부를 수 있어서, 클라이언트 하나가 워커를 다 잡아먹을 수 있었다. 이제는
+- uid / IP 별 토큰 버킷 : 넘으면 429 + Retry-After
+- 전역 동시 처리 상한    : 넘으면 기다리게 하지 않고 바로 503 + Retry-After
+- AdmissionMiddleware  : IP 제한과 동시 처리 상한을 요청 본문을 읽기 전에 적용 (큰 업로드도 바로 거절)
+  요청 하나가 여러 건인 API(배치)는 본문을 읽은 뒤 나머지 건수만큼 wait(key, cost) 로 더 쓴다
+
+버킷 상태는 키마다 float 하나(GCRA: 버킷이 다시 가득 차는 시각)뿐이라 작고,
+그 시각이 지난 키는 가득 찬 버킷과 같으므로 주기적으로 지운다.
+저장소는 RATE_LIMIT_BACKEND=memory(기본, 워커별) | sqlite(같은 파일을 보는 워커끼리 공유).
+sqlite 는 BEGIN IMMEDIATE 에서 다른 워커를 기다릴 수 있으므로, async 쪽(미들웨어, async 엔드포인트)은
+wait_async / check_async 로 스레드에서 부른다 (이벤트 루프를 막지 않게).
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+import math, os, re, sqlite3, threading, time
+
+from anyio import to_thread
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from .metrics import counter
+
+REJECTED = counter("admission_rejected_total", "Requests turned away by rate / concurrency limits", ["limit"])
+
+
+def parse_rate(spec: str) -> Optional[Tuple[float, int]]:
+    """"20/60" → 60초에 20번 (순간적으로 20번까지 몰아서 가능). 빈 값이나 "0" 이면 제한 없음(None)."""
+    spec = (spec or "").strip()
+    if not spec or spec == "0":
+        return None
+    count, _, seconds = spec.partition("/")
+    burst = int(count)
+    period = float(seconds or 1)
+    if burst <= 0 or period <= 0:
+        return None
+    return period / burst, burst
+
+
+class MemoryBuckets:
+    def __init__(self, clock=time.time, sweep_every: int = 10000):
+        self._clock = clock
+        self._tat: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._sweep_every = sweep_every
+        self._ops = 0
+
+    def take(self, key: str, interval: float, burst: int, cost: int = 1) -> float:
+        """cost 번 쓰고 0 을, 안 되면 다시 시도할 수 있을 때까지 남은 초를 돌려준다 (안 되면 하나도 안 씀)."""
+        now = self._clock()
+        with self._lock:
+            self._ops += 1
+            if self._ops % self._sweep_every == 0:
+                self._sweep_locked(now)
+            tat = max(self._tat.get(key, now), now)
+            new_tat = tat + interval * cost
+            allow_at = new_tat - burst * interval
+            if allow_at > now:
+                return allow_at - now
+            self._tat[key] = new_tat
+            return 0.0
+
+    def _sweep_locked(self, now: float) -> None:
+        for key in [k for k, tat in self._tat.items() if tat <= now]:
+            del self._tat[key]
+
+    def size(self) -> int:
+        return len(self._tat)
+
+
+class SqliteBuckets:
+    """여러 워커가 같은 파일을 보므로 워커 수와 상관없이 한도가 한 번만 적용된다."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rate_limits (
+        key TEXT PRIMARY KEY,
+        tat REAL NOT NULL
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: Path | str, clock=time.time, sweep_every: int = 1000):
+        self.path = str(path)
+        self._clock = clock
+        self._local = threading.local()
+        self._sweep_every = sweep_every
+        self._ops = 0
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, interval: float, burst: int, cost: int = 1) -> float:
+        conn = self._conn()
+        now = self._clock()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            tat = max(row[0] if row else now, now)
+            new_tat = tat + interval * cost
+            allow_at = new_tat - burst * interval
+            if allow_at <= now:
+                conn.execute("INSERT OR REPLACE INTO rate_limits (key, tat) VALUES (?, ?)", (key, new_tat))
+            self._ops += 1
+            if self._ops % self._sweep_every == 0:
+                conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return max(0.0, allow_at - now)
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+_opened: Dict[str, object] = {}
+_opened_lock = threading.Lock()
+
+
+def open_buckets(default_path: Path):
+    """
+    RATE_LIMIT_BACKEND=memory(기본) | sqlite
+    RATE_LIMIT_DB_PATH : sqlite 파일 경로 (워커들이 같은 경로를 보게 할 것)
+    같은 저장소는 프로세스 안에서 한 번만 연다 (게이트웨이에서 여러 라우터가 버킷/연결을 같이 씀).
+    키 앞에 RateLimit 이름이 붙으므로 섞이지 않는다.
+    """
+    kind = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+    if kind == "memory":
+        key = "memory"
+    elif kind == "sqlite":
+        key = str(Path(os.environ.get("RATE_LIMIT_DB_PATH", str(default_path))).resolve())
+    else:
+        raise ValueError(f"unknown RATE_LIMIT_BACKEND: {kind}")
+    with _opened_lock:
+        buckets = _opened.get(key)
+        if buckets is None:
+            buckets = _opened[key] = MemoryBuckets() if kind == "memory" else SqliteBuckets(key)
+    return buckets
+
+
+def _retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+class RateLimit:
+    """이름 하나에 한도 하나. check(key) 는 넘으면 429 HTTPException (async 코드에서는 check_async)."""
+
+    def __init__(self, name: str, spec: str, buckets):
+        self.name = name
+        self.spec = parse_rate(spec)
+        self.buckets = buckets
+        # 메모리 버킷은 락 한 번이라 스레드로 넘기는 비용이 더 크다
+        self.blocking = not isinstance(buckets, MemoryBuckets)
+        self._rejected = REJECTED.labels(name)
+
+    @property
+    def burst(self) -> Optional[int]:
+        """한 번에 쓸 수 있는 최대 횟수 (제한 없으면 None)."""
+        return self.spec[1] if self.spec is not None else None
+
+    def wait(self, key: str, cost: int = 1) -> float:
+        """cost 번 쓰고 0 을, 한도를 넘었으면 다시 시도할 수 있을 때까지 남은 초를 돌려준다."""
+        if self.spec is None or cost <= 0:
+            return 0.0
+        interval, burst = self.spec
+        wait = self.buckets.take(f"{self.name}:{key}", interval, burst, cost)
+        if wait > 0:
+            self._rejected.inc()
+        return wait
+
+    async def wait_async(self, key: str) -> float:
+        """wait() 와 같지만 저장소가 sqlite 면 스레드에서 부른다 (async 코드용)."""
+        if self.spec is None or not self.blocking:
+            return self.wait(key)
+        return await to_thread.run_sync(self.wait, key)
+
+    def check(self, key: str) -> None:
+        self._raise_if_limited(self.wait(key))
+
+    async def check_async(self, key: str) -> None:
+        self._raise_if_limited(await self.wait_async(key))
+
+    @staticmethod
+    def _raise_if_limited(wait: float) -> None:
+        if wait > 0:
+            raise HTTPException(status_code=429, detail="too many requests", headers={"Retry-After": _retry_after(wait)})
+
+
+class ConcurrencyLimit:
+    """프로세스 안에서 동시에 처리 중인 요청 수 상한. 자리가 없으면 기다리지 않고 바로 503."""
+
+    def __init__(self, name: str, limit: int, retry_after: int = 1):
+        self.name = name
+        self.limit = limit
+        self.retry_after = retry_after
+        self.active = 0
+        self._lock = threading.Lock()
+        self._rejected = REJECTED.labels(name)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.limit > 0 and self.active >= self.limit:
+                self._rejected.inc()
+                return False
+            self.active += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        if not self.try_acquire():
+            raise HTTPException(status_code=503, detail=f"{self.name} busy", headers={"Retry-After": str(self.retry_after)})
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class AdmissionRule:
+    def __init__(
+        self,
+        methods: Iterable[str],
+        path: str,
+        *,
+        ip_limit: Optional[RateLimit] = None,
+        concurrency: Optional[ConcurrencyLimit] = None,
+    ):
+        self.methods = {m.upper() for m in methods}
+        self.path = re.compile(path)
+        self.ip_limit = ip_limit
+        self.concurrency = concurrency
+
+    def matches(self, method: str, path: str) -> bool:
+        return method in self.methods and self.path.match(path) is not None
+
+
+def client_ip(request) -> str:
+    """AdmissionMiddleware 가 IP 버킷에 쓴 키 (미들웨어를 안 거쳤으면 연결 주소)."""
+    ip = getattr(request.state, "client_ip", None)
+    if ip is None:
+        ip = request.client.host if request.client else "unknown"
+    return ip
+
+
+class AdmissionMiddleware:
+    """
+    순수 ASGI 미들웨어. 맞는 규칙이 있으면 IP 버킷 → 동시 처리 자리 순서로 확인하고,
+    안 되면 본문을 읽지 않고 바로 429/503 을 보낸다.
+    TRUST_FORWARDED=1 이면 X-Forwarded-For 의 첫 주소를 클라이언트 IP 로 쓴다 (프록시 뒤 배포용).
+    """
+
+    def __init__(self, app, rules: Sequence[AdmissionRule], trust_forwarded: Optional[bool] = None):
+        self.app = app
+        self.rules = list(rules)
+        if trust_forwarded is None:
+            trust_forwarded = os.environ.get("TRUST_FORWARDED", "0") == "1"
+        self.trust_forwarded = trust_forwarded
+
+    def _client_ip(self, scope) -> str:
+        if self.trust_forwarded:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.rules:
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        path = scope["path"]
+        root = scope.get("root_path", "")
+        if root and path.startswith(root):
+            path = path[len(root):]
+        rule = next((r for r in self.rules if r.matches(method, path)), None)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        if rule.ip_limit is not None:
+            ip = self._client_ip(scope)
+            # 엔드포인트가 같은 키로 더 쓸 수 있게 (배치처럼 한 요청에 여러 건인 경우) 남겨 둔다
+            scope.setdefault("state", {})["client_ip"] = ip
+            wait = await rule.ip_limit.wait_async(ip)
+            if wait > 0:
+                await JSONResponse(
+                    {"detail": "too many requests"}, status_code=429, headers={"Retry-After": _retry_after(wait)}
+                )(scope, receive, send)
+                return
+
+        slots = rule.concurrency
+        if slots is not None and not slots.try_acquire():
+            await JSONResponse(
+                {"detail": f"{slots.name} busy"}, status_code=503, headers={"Retry-After": str(slots.retry_after)}
+            )(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if slots is not None:
+                slots.release()